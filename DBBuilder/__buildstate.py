@@ -0,0 +1,59 @@
+from DBBuilder.__fileutils import write_atomic
+import json
+import os
+import pandas as pd
+
+class BuildState ():
+    """
+    State of an incremental acoustic db build, stored in a directory:
+    `db_<version>.parquet` (aggregated db), `counts_<version>.parquet` 
+    (labels count per time bin, long format without zeros) and 
+    `manifest.json` (current version and number of detections already 
+    processed per source file). A new version is only visible once the 
+    manifest is replaced, so an interrupted save keeps the previous state.
+    ## Params
+    path: str
+        directory of the state
+    timezone: tzinfo
+        timezone of dates read from the state
+    """
+
+    def __init__(self, path:str, timezone=None) -> None:
+        self.path = path
+        self.timezone = timezone
+        self.db, self.counts, self.files, self.version = None, None, {}, 0
+        self.load()
+
+    def load (self):
+        path_manifest = os.path.join(self.path, "manifest.json")
+        if not os.path.exists(path_manifest):
+            return self
+        with open(path_manifest) as f:
+            manifest = json.load(f)
+        self.files, self.version = manifest["files"], manifest["version"]
+        self.db = self._read(self._path_version("db"))
+        self.counts = self._read(self._path_version("counts")).set_index(["date", "label"])["count"]
+        return self
+
+    def save (self):
+        os.makedirs(self.path, exist_ok=True)
+        old_paths = [self._path_version(name) for name in ["db", "counts"]]
+        self.version += 1
+        write_atomic(self._path_version("db"), lambda f: self.db.to_parquet(f, index=False))
+        write_atomic(self._path_version("counts"), lambda f: self.counts.rename("count").reset_index().to_parquet(f, index=False))
+        manifest = {"version":self.version, "files":self.files}
+        write_atomic(os.path.join(self.path, "manifest.json"), lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+        for path in old_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        return self
+
+    def _path_version (self, name:str):
+        return os.path.join(self.path, f"{name}_{self.version}.parquet")
+
+    def _read (self, path:str):
+        df = pd.read_parquet(path)
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.DatetimeTZDtype):
+                df[col] = df[col].dt.tz_convert(self.timezone)
+        return df
@@ -1,16 +1,72 @@
 import pandas as pd
+import numpy as np
 from dateutil import tz
 
 class DateReader ():
 
     def __init__(self, timezone:str="UTC") -> None:
         self.timezone_str, self.timezone = timezone, tz.gettz(name=timezone)
-        
+
     def read_date (self, date:any, format:str="%Y-%m-%d %H:%M:%S"):
+        """
+        Read a date in the reader timezone (same rules as `read_dates`: naive 
+        dates are localized, first occurrence of ambiguous wall times and 
+        nonexistent ones shifted forward, tz-aware dates are converted)
+        """
         if type(date)==str:
             date = pd.to_datetime(date, format=format)
         else:
             date = pd.to_datetime(date)
+        if date.tzinfo is None:
+            return date.tz_localize(self.timezone, ambiguous=True, nonexistent="shift_forward")
         if date.tzinfo != self.timezone:
-            date = date.replace(tzinfo=self.timezone)
-        return date
\ No newline at end of file
+            date = date.tz_convert(self.timezone)
+        return date
+
+    def read_dates (self, dates, format:str="%Y-%m-%d %H:%M:%S", ambiguous="dst", nonexistent="shift_forward"):
+        """
+        Read a whole column of dates at once (vectorized version of `read_date`).
+        ## Params
+        dates: pd.Series | np.ndarray | list
+            dates input (str, datetime, Timestamp)
+        format: str
+            date format if dates are strings
+        ambiguous: str | np.ndarray
+            how to localize ambiguous wall times (DST fall back), `"dst"` keeps
+            the first occurrence like `read_date`, other values are passed to
+            `Series.dt.tz_localize`
+        nonexistent: str
+            how to localize nonexistent wall times (DST spring forward), passed
+            to `Series.dt.tz_localize`
+        ## Return
+        dates: pd.Series
+            tz-aware dates in the reader timezone (same index as input if Series).
+            Naive dates are localized, tz-aware dates are converted.
+        """
+        dates = dates if isinstance(dates, pd.Series) else pd.Series(dates)
+        if isinstance(dates.dtype, pd.DatetimeTZDtype):
+            if dates.dt.tz == self.timezone:
+                return dates
+        elif pd.api.types.infer_dtype(dates, skipna=True) == "string":
+            dates = pd.to_datetime(dates, format=format)
+        else:
+            dates = pd.to_datetime(dates)
+        if dates.dt.tz is None:
+            ambiguous = np.ones(len(dates), dtype=bool) if isinstance(ambiguous, str) and ambiguous == "dst" else ambiguous
+            return dates.dt.tz_localize(self.timezone, ambiguous=ambiguous, nonexistent=nonexistent)
+        return dates.dt.tz_convert(self.timezone)
+
+    def floor_dates (self, dates:pd.Series, freq:str):
+        """
+        Floor tz-aware dates on the local wall clock without failing on DST 
+        changes. Sub-daily bins (frequencies up to 1 hour) keep the UTC offset 
+        of each date, so the two occurrences of the repeated hour stay in 
+        distinct bins. Longer bins are localized like `read_dates`.
+        """
+        offset = pd.tseries.frequencies.to_offset(freq)
+        if dates.dt.tz is None:
+            return dates.dt.floor(freq)
+        if isinstance(offset, pd.offsets.Tick) and offset.nanos <= 3600 * 10**9:
+            wall, utc = dates.dt.tz_localize(None), dates.dt.tz_convert(None)
+            return (wall.dt.floor(freq) - (wall - utc)).dt.tz_localize("UTC").dt.tz_convert(dates.dt.tz)
+        return dates.dt.floor(freq, ambiguous=np.ones(len(dates), dtype=bool), nonexistent="shift_forward")
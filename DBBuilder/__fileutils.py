@@ -0,0 +1,41 @@
+import os
+import tempfile
+import pandas as pd
+
+def write_atomic (path:str, write):
+    """
+    Write a file atomically: `write(f)` fills a temporary file of the same
+    directory which then replaces `path`
+    """
+    fd, path_tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(path_tmp, path)
+    except BaseException:
+        os.remove(path_tmp)
+        raise
+
+def read_chunks (path:str, columns:list=None, chunksize:int=1_000_000, skiprows:int=0, dtype=None, **read_csv_kargs):
+    """
+    Read a tabular file by chunks of `chunksize` rows (first `skiprows` data
+    rows skipped): parquet files (expl: `DataCatalog` sidecars) by record
+    batches, excel files at once, other files with `pd.read_csv`
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            if skiprows >= batch.num_rows:
+                skiprows -= batch.num_rows
+                continue
+            chunk = batch.slice(skiprows).to_pandas()
+            skiprows = 0
+            yield chunk if dtype is None else chunk.astype(dtype)
+    elif ext in [".xlsx", ".xls"]:
+        df = pd.read_excel(path, usecols=columns, dtype=dtype, **read_csv_kargs).iloc[skiprows:]
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+    else:
+        yield from pd.read_csv(path, usecols=columns, dtype=dtype, chunksize=chunksize, skiprows=range(1, skiprows + 1), 
+                               **read_csv_kargs)
@@ -1,2 +1,4 @@
 from DBBuilder.astral import Sun, Moon
-from DBBuilder.dbbuilder import DBBuilder
\ No newline at end of file
+from DBBuilder.dbbuilder import DBBuilder
+from DBBuilder.multisite import MultiSiteDBBuilder
+from DBBuilder.__instrumentation import stage_logger
\ No newline at end of file
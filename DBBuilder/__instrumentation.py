@@ -0,0 +1,72 @@
+from contextlib import contextmanager, nullcontext
+import logging
+import time
+import sys
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+def max_rss_mb ():
+    """
+    Peak resident set size of the process (MB, None if not available)
+    """
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 2**20 if sys.platform == "darwin" else maxrss / 2**10 # bytes on macOS, KB on Linux
+
+def stage_logger (logger:logging.Logger=None, level:int=logging.INFO):
+    """
+    Stage callback writing each stage record to a logger (default `DBBuilder` logger)
+    """
+    logger = logger or logging.getLogger("DBBuilder")
+    def log (record:dict):
+        logger.log(level, " ".join(f"{k}={v}" for k, v in record.items()))
+    return log
+
+class Instrumentation ():
+    """
+    Named stage spans of a pipeline. Each span reports a record (`stage`,
+    `wall_s`, `rows_in`, `rows_out`, `peak_rss_delta_mb` and the astral
+    `cache_hits` / `cache_misses` during the stage) to `callback`. Without
+    callback, spans are no-ops.
+    ## Params
+    callback: callable
+        `callback(record:dict)` called at the end of each stage (expl:
+        `stage_logger()`, `list.append`)
+    counters: list
+        objects with a `cache_stats` dict (expl: `Sun`, `Moon`)
+    """
+
+    def __init__(self, callback=None, counters:list=None) -> None:
+        self.callback = callback
+        self.counters = counters if counters is not None else []
+
+    @property
+    def enabled (self):
+        return self.callback is not None
+
+    def span (self, stage:str, rows_in:int=None):
+        """
+        Context manager of a stage, yields the stage record (set `rows_out` in it)
+        """
+        if self.callback is None:
+            return nullcontext({})
+        return self._span(stage=stage, rows_in=rows_in)
+
+    def _cache_stats (self):
+        return [sum(counter.cache_stats[k] for counter in self.counters) for k in ["hits", "misses"]]
+
+    @contextmanager
+    def _span (self, stage:str, rows_in:int=None):
+        record = {"stage":stage, "rows_in":rows_in, "rows_out":None}
+        hits, misses = self._cache_stats()
+        rss = max_rss_mb()
+        t0 = time.perf_counter()
+        yield record
+        record["wall_s"] = time.perf_counter() - t0
+        record["peak_rss_delta_mb"] = max_rss_mb() - rss if rss is not None else None
+        hits_end, misses_end = self._cache_stats()
+        record["cache_hits"], record["cache_misses"] = hits_end - hits, misses_end - misses
+        self.callback(record)
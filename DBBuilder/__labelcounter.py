@@ -0,0 +1,110 @@
+from DBBuilder.__datereader import DateReader
+import pandas as pd
+import numpy as np
+
+def compact_uint_dtype (max_value:int):
+    """
+    Smallest unsigned integer dtype able to store `max_value`
+    """
+    for dtype in [np.uint8, np.uint16, np.uint32]:
+        if max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+class LabelCounter (DateReader):
+    """
+    Running count of labels occurrence per time bin. Detections can be
+    added in chunks of any size (`update`), partial counts are merged by
+    bin and label so a bin split across chunks is counted once. Memory is
+    bounded by the number of (bin, label) pairs, not by the number of
+    detections.
+    ## Params
+    timefreq: str
+        time frequency of bins
+    timezone: str
+        timezone of dates
+    max_buffer: int
+        number of buffered partial count rows before merging them
+    sparse_threshold: float
+        labels present in less than this fraction of bins are returned as 
+        sparse columns by `get_counts` (None to keep all columns dense)
+    """
+
+    def __init__(self, timefreq:str="min", timezone:str="UTC", max_buffer:int=1_000_000, sparse_threshold:float=None) -> None:
+        super().__init__(timezone=timezone)
+        self.timefreq = timefreq
+        self.max_buffer = max_buffer
+        self.sparse_threshold = sparse_threshold
+        self.counts = None
+        self._partials, self._buffer_size = [], 0
+
+    def update (self, dates, labels, format:str="%Y-%m-%d %H:%M:%S"):
+        """
+        Add a chunk of detections (dates and labels)
+        """
+        if len(dates) == 0:
+            return self
+        dates = self.read_dates(pd.Series(dates).reset_index(drop=True), format=format)
+        df = pd.DataFrame({"date":self.floor_dates(dates, self.timefreq), "label":pd.Series(labels, dtype="category").reset_index(drop=True)})
+        return self.add_counts(df.groupby(["date", "label"], sort=False, observed=True).size())
+
+    def update_from_chunks (self, chunks, col_date:str="date", col_label:str="label", format:str="%Y-%m-%d %H:%M:%S"):
+        """
+        Add detections from an iterable of DataFrames (expl: `pd.read_csv(..., chunksize=...)`)
+        """
+        for chunk in chunks:
+            self.update(dates=chunk[col_date], labels=chunk[col_label], format=format)
+        return self
+
+    def add_counts (self, counts:pd.Series):
+        """
+        Add partial counts (Series indexed by date bin and label, expl: `get_raw_counts`
+        of another counter with the same time frequency)
+        """
+        # counts from worker processes carry an unpickled copy of the timezone
+        counts.index = counts.index.set_levels(counts.index.levels[0].tz_convert(self.timezone), level=0)
+        self._partials.append(counts)
+        self._buffer_size += len(counts)
+        if self._buffer_size > self.max_buffer:
+            self._merge()
+        return self
+
+    def get_raw_counts (self):
+        """
+        Counts in long format (Series indexed by date bin and label, labels 
+        are stored once as MultiIndex level values)
+        """
+        self._merge()
+        return self.counts
+
+    def _merge (self):
+        if not self._partials:
+            return
+        partials = self._partials if self.counts is None else [self.counts] + self._partials
+        counts = pd.concat(partials)
+        counts.index = counts.index.set_levels(counts.index.levels[1].astype(str), level="label")
+        counts = counts.groupby(level=["date", "label"]).sum()
+        self.counts = counts.astype(compact_uint_dtype(counts.max()))
+        self._partials, self._buffer_size = [], 0
+
+    def get_counts (self, prefix:str="label_", start=None, end=None):
+        """
+        Counts as a table with one row per bin (complete time grid between
+        first and last detection, or between `start` and `end` if given) and 
+        one column per label. Counts are stored in the smallest sufficient 
+        unsigned integer dtype (sparse for rare labels if `sparse_threshold`).
+        """
+        self._merge()
+        if self.counts is None:
+            return pd.DataFrame(columns=["date"])
+        df_pivot = self.counts.unstack("label", fill_value=0).sort_index().sort_index(axis=1)
+        start = df_pivot.index.min() if start is None else start
+        end = df_pivot.index.max() if end is None else end
+        index_complet = pd.date_range(start=start, end=end, freq=self.timefreq)
+        labels_count = df_pivot.reindex(index_complet, fill_value=0)
+        labels_count.columns.name = None
+        if self.sparse_threshold:
+            density = (labels_count > 0).mean()
+            labels_count = labels_count.astype({label:pd.SparseDtype(labels_count[label].dtype, 0) 
+                                                for label in density.index[density < self.sparse_threshold]})
+        return labels_count.add_prefix(prefix).reset_index(names=["date"])
@@ -1,45 +1,168 @@
 from DBBuilder.__datereader import DateReader
+from DBBuilder.astral.__daystore import DayStore
+from DBBuilder.astral.__ephemeris_cache import EphemerisCache
 from astral import Observer
 import pandas as pd
 import numpy as np
 import datetime
+import weakref
 
 class BaseAstral (DateReader): 
 
     astral_functs:dict 
-    data=pd.DataFrame() 
+    # days computed by `get_day_infos` kept in memory before writing them to the persistent cache
+    cache_flush_days:int = 366
 
-    def __init__(self, latitude:float=48.886, longitude:float=2.333, elevation:float=35, timezone:str="UTC", **kargs) -> None:
+    def __init__(self, latitude:float=48.886, longitude:float=2.333, elevation:float=35, timezone:str="UTC", cache_max_days:int=None, 
+                 cache_dir:str=None, **kargs) -> None:
         self.obs = Observer(latitude=latitude, longitude=longitude, elevation=elevation)
         super().__init__(timezone)
+        self.store = DayStore(timezone=self.timezone, max_days=cache_max_days)
+        self.cache = EphemerisCache(cache_dir=cache_dir, key_params=self.cache_key_params(), timezone=self.timezone) if cache_dir else None
+        self._cached_years, self._unsaved_records = set(), []
+        self.cache_stats = {"hits":0, "misses":0}
+        self._register_flush()
+
+    def __setstate__ (self, state):
+        self.__dict__.update(state)
+        self._register_flush()
+
+    def _register_flush (self):
+        """
+        Write back unsaved day infos when the instance is collected or at exit
+        """
+        if self.cache is not None:
+            weakref.finalize(self, self._flush, self.cache, self._unsaved_records, list(self.astral_functs.keys()))
+
+    @staticmethod
+    def _flush (cache, unsaved_records:list, columns:list):
+        """
+        Write unsaved `(days, infos)` to the persistent cache (in one merge per year)
+        """
+        if not unsaved_records:
+            return
+        frames = []
+        for days, infos in unsaved_records:
+            records = pd.DataFrame(infos, columns=columns).reset_index(drop=True)
+            records.insert(0, "day", pd.DatetimeIndex(days))
+            frames.append(records)
+        unsaved_records.clear()
+        cache.save_records(data=pd.concat(frames, ignore_index=True))
+
+    @property
+    def data (self):
+        """
+        Day infos computed so far (DataFrame indexed by day)
+        """
+        return self.store.to_frame()
     
+    def cache_key_params (self):
+        """
+        Parameters identifying the day infos of this instance (persistent cache key)
+        """
+        return {
+            "class":type(self).__name__,
+            "latitude":self.obs.latitude,
+            "longitude":self.obs.longitude,
+            "elevation":self.obs.elevation,
+            "timezone":self.timezone_str,
+            "astral_functs":sorted(f"{k}:{getattr(f, '__module__', '')}.{getattr(f, '__qualname__', '')}" 
+                                   for k, f in self.astral_functs.items())
+        }
+
+    def load_cache (self, days):
+        """
+        Load in memory the cached years of a set of days (lazy, once per year)
+        """
+        if self.cache is None:
+            return
+        years = set(pd.DatetimeIndex(days).year) - self._cached_years
+        if years:
+            # days computed but not written yet are read back with their year
+            self.save_cache()
+        for year in years:
+            data = self.cache.load_year(year)
+            self._cached_years.add(year)
+            if len(data):
+                self._forget_years(self.store.add_frame(days=data["day"], infos=data.drop(columns="day")))
+
+    def _forget_years (self, evicted):
+        """
+        Years of evicted days are loaded again from the persistent cache on next use
+        """
+        if self.cache is not None and len(evicted):
+            self._cached_years -= set(pd.DatetimeIndex(evicted.view("M8[ns]")).tz_localize("UTC").tz_convert(self.timezone).year)
+
+    def save_cache (self):
+        """
+        Write back new day infos to the persistent cache (`get_days_infos`
+        writes once per call, `get_day_infos` every `cache_flush_days` new
+        days, remaining days are written when the instance is collected or
+        at exit)
+        """
+        if self.cache is not None:
+            self._flush(self.cache, self._unsaved_records, list(self.astral_functs.keys()))
+
     def daily_infos_in_range (self, start, end):
         """
         Compute daily infos in date range 
         """
-        start, end = [self.read_date(d).floor("d") for d in [start, end]]
-        days = pd.date_range(start=start, end=end, freq="d")
-        records = []
-        for day in days:
-            record = self.get_day_infos(date=day)
-            records.append(record)
-        self.add_new_records(data=records)
-        return self.data
+        # local calendar days, localized like `read_dates` (midnight may not exist on DST changes)
+        start, end = [self.read_date(d).tz_localize(None).normalize() for d in [start, end]]
+        days = self.read_dates(pd.Series(pd.date_range(start=start, end=end, freq="d")))
+        return self.get_days_infos(days)
         
     def get_day_infos (self, date, format:str="%Y-%m-%d %H:%M:%S"):
         """
         Get infos of date
         """
         date = self.read_date(date, format=format)
-        day = date.floor("d")
-        day_infos = {"day":day}
-        if day in self.data.index:
-            day_infos.update(self.data.loc[day].to_dict())
+        day = date.floor("d", ambiguous=True, nonexistent="shift_forward")
+        self.load_cache(days=[day])
+        record = self.store.get(day)
+        if record is None:
+            self.cache_stats["misses"] += 1
+            self.add_new_records(days=[day], infos=self._run_astral_functs([day]))
+            if len(self._unsaved_records) >= self.cache_flush_days:
+                self.save_cache()
+            record = self.store.get(day)
         else:
-            for k_funct in self.astral_functs.keys():
-                day_infos[k_funct] = self._run_astral_funct(k_funct, date)
-            self.add_new_records(data=[day_infos])
-        return day_infos
+            self.cache_stats["hits"] += 1
+        return {"day":day, **{k:record.get(k) for k in self.astral_functs.keys()}}
+
+    def get_days_infos (self, days):
+        """
+        Get infos of a set of days. Each distinct day missing from the cache 
+        is computed once and all new records are added in a single insert.
+        ## Params
+        days: array-like of Timestamp
+            days (floored dates) to get infos of
+        ## Return
+        days_infos: pd.DataFrame
+            day infos indexed by day, in the same order as `days`
+        """
+        days = pd.DatetimeIndex(days)
+        keys = days.as_unit("ns").asi8
+        self.load_cache(days=days)
+        positions = self.store.positions(keys)
+        missing = positions < 0
+        n_missing = len(np.unique(keys[missing]))
+        self.cache_stats["hits"] += len(days) - n_missing
+        self.cache_stats["misses"] += n_missing
+        if n_missing:
+            missing_days = days[missing].unique()
+            infos = self._run_astral_functs(missing_days)
+            self.add_new_records(days=missing_days, infos=infos)
+            self.save_cache()
+            positions = self.store.positions(keys)
+        return self.store.take(positions, index=days.rename("day"), columns=list(self.astral_functs.keys()))
+
+    def _run_astral_functs (self, dates:list):
+        """
+        run all astral functions for a set of dates (one record per date, 
+        vectorized backends return a DataFrame with one row per date)
+        """
+        return [{k_funct:self._run_astral_funct(k_funct, date) for k_funct in self.astral_functs.keys()} for date in dates]
 
     def _run_astral_funct(self, functKey:str, date:datetime.datetime):
         """
@@ -47,26 +170,14 @@ class BaseAstral (DateReader):
         """
         return None
     
-    def read_date (self, date:any, format:str="%Y-%m-%d %H:%M:%S"):
-        if type(date)==str:
-            date = pd.to_datetime(date, format=format)
+    def add_new_records (self, days, infos):
+        """
+        Add the infos of new days (DataFrame or list of records, see `_run_astral_functs`)
+        """
+        if isinstance(infos, pd.DataFrame):
+            evicted = self.store.add_frame(days=days, infos=infos)
         else:
-            date = pd.to_datetime(date)
-        if date.tzinfo != self.timezone:
-            date = date.replace(tzinfo=self.timezone)
-        return date
-    
-    def add_new_records (self, data:list):
-        new_data = pd.DataFrame(data)
-        new_data = new_data.set_index("day")
-        self.data = pd.concat([self.data, new_data])
-        self.data.index.duplicated(keep="first")
-        self.data = self.data.sort_index()
-        
-        
-            
-
-    
-        
-        
-
+            evicted = self.store.add_records(data=[{"day":day, **record} for day, record in zip(days, infos)])
+        if self.cache is not None:
+            self._unsaved_records.append((days, infos))
+        self._forget_years(evicted)
@@ -0,0 +1,261 @@
+import pandas as pd
+import numpy as np
+import datetime
+import numbers
+
+# missing datetime (int64 nanoseconds)
+NAT = np.iinfo("i8").min
+
+class DayStore ():
+    """
+    In-memory store of day ephemeris tables keyed by normalized day. Days
+    and infos are kept as column arrays (sorted days and datetimes as int64
+    UTC nanoseconds), so looking up a set of days is one `searchsorted` and
+    a frame of infos is built with one `take` per column. Arrays grow
+    geometrically and new days are inserted in place: appending days in
+    order is amortized O(1), other inserts shift the rows after the first
+    new day (no sort of the store). Duplicates are dropped on insert (first
+    record kept) and, if `max_days` is set, the least recently used days
+    are evicted (days used by the current lookup or insert are kept).
+    ## Params
+    timezone: tzinfo
+        timezone of the stored days (used for the DataFrame views)
+    max_days: int
+        maximum number of days kept in memory (None for unbounded)
+    """
+
+    def __init__(self, timezone=None, max_days:int=None) -> None:
+        self.timezone = timezone
+        self.max_days = max_days
+        self.clear()
+
+    def __len__ (self):
+        return self._n
+
+    def __contains__ (self, day):
+        return bool(self.positions([pd.Timestamp(day).value])[0] >= 0)
+
+    @property
+    def days (self):
+        return self._days[:self._n]
+
+    @property
+    def last_used (self):
+        return self._last_used[:self._n]
+
+    @property
+    def columns (self):
+        return {col:values[:self._n] for col, values in self._columns.items()}
+
+    def positions (self, keys):
+        """
+        Positions of days (int64 UTC nanoseconds) in store (-1 if not in store),
+        found days are marked as used
+        """
+        pos = self._find(keys)
+        self._clock += 1
+        self._last_used[pos[pos >= 0]] = self._clock
+        return pos
+
+    def take (self, positions, index=None, columns:list=None):
+        """
+        Infos at positions of the store (NaN / NaT where position is -1)
+        """
+        positions = np.asarray(positions)
+        found = positions >= 0
+        infos = {}
+        for col in (self._columns if columns is None else columns):
+            values, kind = self._columns.get(col), self.kinds.get(col)
+            if values is None or self._n == 0:
+                infos[col] = np.full(len(positions), np.nan)
+                continue
+            values = values[np.where(found, positions, 0)]
+            if kind == "datetime":
+                values = pd.DatetimeIndex(np.where(found, values, NAT).view("M8[ns]"))
+                infos[col] = values.tz_localize("UTC").tz_convert(self.timezone)
+            else:
+                infos[col] = np.where(found, values, np.nan if kind != "object" else None)
+        return pd.DataFrame(infos, index=index)
+
+    def get (self, day):
+        """
+        Get record of a day (None if not in store)
+        """
+        pos = self.positions([pd.Timestamp(day).value])[0]
+        if pos < 0:
+            return None
+        record = {}
+        for col, values in self._columns.items():
+            value = values[pos]
+            if self.kinds[col] == "datetime":
+                value = pd.NaT if value == NAT else pd.Timestamp(value, tz="UTC").tz_convert(self.timezone)
+            record[col] = value
+        return record
+
+    def add_frame (self, days, infos:pd.DataFrame):
+        """
+        Bulk insert of the infos of a set of days (one row per day). Days
+        already in store are kept as is. Returns the evicted days (int64 UTC
+        nanoseconds).
+        """
+        infos = infos.reset_index(drop=True)
+        return self._add(keys=pd.DatetimeIndex(days).as_unit("ns").asi8, columns={col:self._to_array(infos[col]) for col in infos.columns})
+
+    def add_records (self, data:list):
+        """
+        Bulk insert of day records (dicts with a `"day"` key). Days already
+        in store are kept as is. Returns the evicted days (see `add_frame`).
+        """
+        if not len(data):
+            return np.empty(0, dtype="i8")
+        keys = np.array([pd.Timestamp(record["day"]).value for record in data], dtype="i8")
+        columns = dict.fromkeys(col for record in data for col in record if col != "day")
+        return self._add(keys=keys, columns={col:self._values_to_array([record.get(col) for record in data]) for col in columns})
+
+    def _add (self, keys, columns:dict):
+        """
+        Insert rows of new days (`columns`: column name -> (array, kind) of all `keys`),
+        returns the evicted days
+        """
+        keys = np.asarray(keys, dtype="i8")
+        _, first = np.unique(keys, return_index=True)
+        new = np.zeros(len(keys), dtype=bool)
+        new[first] = True
+        found = self._find(keys)
+        new &= found < 0
+        # days of the insert already in store are used too (not evicted by the insert)
+        self._last_used[found[found >= 0]] = self._clock
+        if not new.any():
+            return np.empty(0, dtype="i8")
+        order = np.argsort(keys[new], kind="stable")
+        new_keys, n_new = keys[new][order], len(order)
+        rows = {"_days":new_keys, "_last_used":np.full(n_new, self._clock)}
+        for col in dict.fromkeys(list(self._columns) + list(columns)):
+            old_kind = self.kinds.get(col)
+            values, new_kind = columns[col] if col in columns else (np.full(len(keys), np.nan), None)
+            kind = old_kind or new_kind
+            if col not in self._columns:
+                self._columns[col] = np.full(len(self._days), np.nan)
+            self._columns[col], self.kinds[col] = self._cast(self._columns[col], old_kind, kind), kind
+            rows[col] = self._cast(values[new][order], new_kind, kind)
+        self._reserve(self._n + n_new)
+        buffers = {"_days":self._days, "_last_used":self._last_used, **self._columns}
+        n, pos = self._n, np.searchsorted(self.days, new_keys)
+        if pos[0] < n and n_new <= 16:
+            # rows after each new day are shifted in place (one slice move per new day, from the end)
+            bounds = np.append(pos, n)
+            for j in reversed(range(n_new)):
+                if bounds[j + 1] > bounds[j]:
+                    for buffer in buffers.values():
+                        buffer[bounds[j] + j + 1:bounds[j + 1] + j + 1] = buffer[bounds[j]:bounds[j + 1]]
+        elif pos[0] < n:
+            # rows after the first new day are moved to their merged positions
+            shifted = np.arange(pos[0], n) + np.searchsorted(new_keys, self._days[pos[0]:n])
+            for buffer in buffers.values():
+                buffer[shifted] = buffer[pos[0]:n].copy()
+        new_pos = pos + np.arange(n_new)
+        for name, buffer in buffers.items():
+            buffer[new_pos] = rows[name]
+        self._n, self._frame = n + n_new, None
+        if self.max_days and self._n > self.max_days:
+            return self._evict(self._n - self.max_days)
+        return np.empty(0, dtype="i8")
+
+    def _evict (self, n_evict:int):
+        """
+        Evict the `n_evict` least recently used days (days of the current lookup are never
+        evicted), returns the evicted days
+        """
+        candidates = np.flatnonzero(self.last_used < self._clock)
+        n_evict = min(n_evict, len(candidates))
+        if n_evict == 0:
+            return np.empty(0, dtype="i8")
+        evicted = candidates[np.argpartition(self.last_used[candidates], n_evict - 1)[:n_evict]]
+        evicted_days = self.days[evicted]
+        keep = np.ones(self._n, dtype=bool)
+        keep[evicted] = False
+        n_keep = self._n - n_evict
+        self._days[:n_keep], self._last_used[:n_keep] = self.days[keep], self.last_used[keep]
+        for values in self._columns.values():
+            values[:n_keep] = values[:self._n][keep]
+        self._n, self._frame = n_keep, None
+        return evicted_days
+
+    def _reserve (self, size:int):
+        """
+        Grow arrays (geometrically) to hold at least `size` days
+        """
+        if size <= len(self._days):
+            return
+        capacity = max(size, 2 * len(self._days), 64)
+        grow = lambda values: np.concatenate([values[:self._n], np.empty(capacity - self._n, dtype=values.dtype)])
+        self._days, self._last_used = grow(self._days), grow(self._last_used)
+        self._columns = {col:grow(values) for col, values in self._columns.items()}
+
+    def clear (self):
+        self._days, self._last_used = np.empty(0, dtype="i8"), np.empty(0, dtype="i8")
+        self._columns, self.kinds = {}, {}
+        self._n = 0
+        self._clock = 0
+        self._frame = None
+
+    def to_frame (self):
+        """
+        DataFrame view of the store (indexed by day, sorted). The view is
+        cached until the store is modified.
+        """
+        if self._frame is None:
+            index = pd.DatetimeIndex(self.days.view("M8[ns]")).tz_localize("UTC").tz_convert(self.timezone).rename("day")
+            self._frame = self.take(np.arange(self._n), index=index)
+        return self._frame
+
+    def _find (self, keys):
+        keys = np.asarray(keys, dtype="i8")
+        days = self.days
+        if len(days) == 0:
+            return np.full(len(keys), -1)
+        pos = np.minimum(np.searchsorted(days, keys), len(days) - 1)
+        return np.where(days[pos] == keys, pos, -1)
+
+    @staticmethod
+    def _to_array (values:pd.Series):
+        """
+        Column array and kind of values (`"datetime"` as int64 UTC nanoseconds,
+        `"float"`, `"object"` or None if all values are missing)
+        """
+        if isinstance(values.dtype, pd.DatetimeTZDtype):
+            return pd.DatetimeIndex(values).tz_convert("UTC").as_unit("ns").asi8, "datetime"
+        if values.isna().all():
+            return np.full(len(values), np.nan), None
+        if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) in ["datetime", "datetime64"]:
+            return pd.DatetimeIndex(pd.to_datetime(values, utc=True)).as_unit("ns").asi8, "datetime"
+        if pd.api.types.is_numeric_dtype(values.dtype):
+            return values.to_numpy(dtype="float64", na_value=np.nan), "float"
+        return values.to_numpy(dtype=object), "object"
+
+    @staticmethod
+    def _values_to_array (values:list):
+        """
+        Column array and kind of a list of scalar values (see `_to_array`)
+        """
+        present = [value for value in values if not pd.isna(value)]
+        if not present:
+            return np.full(len(values), np.nan), None
+        if isinstance(present[0], datetime.datetime):
+            return np.array([NAT if pd.isna(v) else pd.Timestamp(v).value for v in values], dtype="i8"), "datetime"
+        if isinstance(present[0], numbers.Number):
+            return np.array([np.nan if pd.isna(v) else v for v in values], dtype="float64"), "float"
+        return np.array(values, dtype=object), "object"
+
+    @staticmethod
+    def _cast (values, kind:str, target:str):
+        """
+        Cast a column array of kind `kind` (None: all missing) to the kind `target`
+        """
+        if kind == target or target is None:
+            return values
+        if kind is None and target == "datetime":
+            return np.full(len(values), NAT)
+        if kind == "datetime" or target == "datetime":
+            raise ValueError(f"Day infos of kind {kind} can't be stored with infos of kind {target}")
+        return values.astype(object) if target == "object" else values.astype("float64")
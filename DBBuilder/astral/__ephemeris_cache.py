@@ -0,0 +1,62 @@
+from DBBuilder.__fileutils import write_atomic
+import hashlib
+import json
+import os
+import pandas as pd
+
+class EphemerisCache ():
+    """
+    Persistent on-disk cache of day ephemeris tables (one Parquet file per
+    year). Files are stored in a directory named after a hash of the
+    observer parameters and astral functions, so any change of these
+    parameters points to a new (empty) cache.
+    ## Params
+    cache_dir: str
+        root directory of the cache
+    key_params: dict
+        parameters identifying the cache (observer, timezone, functions)
+    timezone: tzinfo
+        timezone of the days read from cache
+    """
+
+    def __init__(self, cache_dir:str, key_params:dict, timezone=None) -> None:
+        self.key_params = key_params
+        self.key = hashlib.sha1(json.dumps(key_params, sort_keys=True).encode()).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, self.key)
+        self.timezone = timezone
+        os.makedirs(self.path, exist_ok=True)
+        path_meta = os.path.join(self.path, "meta.json")
+        if not os.path.exists(path_meta):
+            write_atomic(path_meta, lambda f: f.write(json.dumps(key_params, indent=2).encode()))
+
+    def path_year (self, year:int):
+        return os.path.join(self.path, f"{year}.parquet")
+
+    def load_year (self, year:int):
+        """
+        Load records of a year (DataFrame with a `"day"` column, empty if not cached)
+        """
+        path = self.path_year(year)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=["day"])
+        return self._read(path)
+
+    def save_records (self, data:pd.DataFrame):
+        """
+        Merge new records (DataFrame with a `"day"` column) into the yearly files
+        """
+        if len(data) == 0:
+            return
+        for year, df_year in data.groupby(data["day"].dt.year):
+            path = self.path_year(year)
+            if os.path.exists(path):
+                df_year = pd.concat([self._read(path), df_year])
+            df_year = df_year.drop_duplicates(subset="day", keep="first").sort_values("day")
+            write_atomic(path, lambda f: df_year.to_parquet(f, index=False))
+
+    def _read (self, path:str):
+        df = pd.read_parquet(path)
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.DatetimeTZDtype):
+                df[col] = df[col].dt.tz_convert(self.timezone)
+        return df
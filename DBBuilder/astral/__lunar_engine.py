@@ -0,0 +1,241 @@
+"""
+Vectorized lunar ephemeris (same low-precision formulae as `astral.moon`)
+for arrays of days or timestamps. Phase is the same as `astral.moon.phase`,
+moonrise / moonset are the same as `astral.moon.moonrise` / `moonset` (to
+the minute) and elevation agrees with `astral.moon.elevation` (given UTC
+dates). Days without event give NaT instead of raising. Unlike astral, an
+event at 24:00 UTC is kept (astral raises for the whole day) and an event
+found on another day is never returned.
+"""
+from astral.moon import MOON_APPARENT_RADIUS
+from astral.table4 import table4_u, table4_v, table4_w
+from DBBuilder.astral.__solar_engine import julian_days
+import pandas as pd
+import numpy as np
+
+JD2000 = 2451545.0
+CHUNK_SIZE = 65536
+
+def _table_arrays (table:list):
+    """
+    Table4 rows as arrays: argument multipliers (rows x 12), coefficients,
+    T flags and sine flags
+    """
+    multipliers = np.zeros((len(table), 12))
+    for i, row in enumerate(table):
+        for arg_number, multiplier in row.argument_multiplers.items():
+            multipliers[i, arg_number - 1] = multiplier
+    coefficients = np.array([row.coefficient for row in table], dtype=float)
+    t_flags = np.array([row.t for row in table], dtype=bool)
+    sin_flags = np.array([row.sincos.__name__ == "sin" for row in table], dtype=bool)
+    return multipliers, coefficients, t_flags, sin_flags
+
+TABLES = {name:_table_arrays(table) for name, table in [("u", table4_u), ("v", table4_v), ("w", table4_w)]}
+
+def _revolutions (value):
+    return value - np.trunc(value)
+
+def _arguments (jd2000):
+    """
+    Fundamental arguments (revolutions) of table4, one column per argument number
+    """
+    lm = _revolutions(0.606434 + 0.03660110129 * jd2000)
+    fm = _revolutions(0.259091 + 0.03674819520 * jd2000)
+    zeros = np.zeros_like(jd2000)
+    return np.stack([lm,                                                  # 1 = Lm
+                     _revolutions(0.374897 + 0.03629164709 * jd2000),     # 2 = Gm
+                     fm,                                                  # 3 = Fm
+                     _revolutions(0.827362 + 0.03386319198 * jd2000),     # 4 = D
+                     lm - fm,                                             # 5 = Om
+                     zeros,
+                     _revolutions(0.779072 + 0.00273790931 * jd2000),     # 7 = Ls
+                     _revolutions(0.993126 + 0.00273777850 * jd2000),     # 8 = Gs
+                     zeros, zeros, zeros,
+                     _revolutions(0.505498 + 0.00445046867 * jd2000)],    # 12 = L2
+                    axis=1)
+
+def _table_value (name:str, arguments, T):
+    multipliers, coefficients, t_flags, sin_flags = TABLES[name]
+    angles = (arguments @ multipliers.T) * 2 * np.pi
+    terms = np.where(sin_flags, np.sin(angles), np.cos(angles)) * coefficients
+    return (terms[:, ~t_flags].sum(axis=1) + terms[:, t_flags].sum(axis=1) * T)
+
+def moon_position (jd2000):
+    """
+    Right ascension, declination (radians) and geocentric distance (Earth
+    radii) of the moon, computed by chunks of `CHUNK_SIZE` dates
+    ## Params
+    jd2000: np.ndarray
+        julian days since J2000
+    """
+    jd2000 = np.atleast_1d(np.asarray(jd2000, dtype=float))
+    ra, dec, distance = [np.empty(len(jd2000)) for _ in range(3)]
+    for start in range(0, len(jd2000), CHUNK_SIZE):
+        chunk = slice(start, start + CHUNK_SIZE)
+        arguments = _arguments(jd2000[chunk])
+        T = jd2000[chunk] / 36525 + 1
+        u, v, w = [_table_value(name, arguments, T) for name in ["u", "v", "w"]]
+        ra[chunk] = np.arcsin(w / np.sqrt(u - v * v)) + arguments[:, 0] * 2 * np.pi
+        dec[chunk] = np.arcsin(v / np.sqrt(u))
+        distance[chunk] = 60.40974 * np.sqrt(u)
+    return ra, dec, distance
+
+def _naive_days (days):
+    """
+    Local calendar days of dates (naive, midnight)
+    """
+    days = pd.DatetimeIndex(days)
+    return (days.tz_localize(None) if days.tz is not None else days).normalize()
+
+def _naive_utc (dates):
+    dates = pd.DatetimeIndex(dates)
+    return dates.tz_convert("UTC").tz_localize(None) if dates.tz is not None else dates
+
+def _elongation (days):
+    """
+    Elongation of the moon (degrees) at 00:00 of each local day, as `astral.moon.phase`
+    """
+    jd = _naive_days(days).to_julian_date().values
+    dt = (jd - 2382148) ** 2 / (41048480 * 86400)
+    t = (jd + dt - JD2000) / 36525
+    d = np.radians((297.85 + 445267.1115 * t - 0.0016300 * t**2 + t**3 / 545868) % 360.0)
+    m = np.radians((357.53 + 35999.0503 * t) % 360.0)
+    m1 = np.radians((134.96 + 477198.8676 * t + 0.0089970 * t**2 + t**3 / 69699) % 360.0)
+    elong = np.degrees(d) + 6.29 * np.sin(m1) - 2.10 * np.sin(m) + 1.27 * np.sin(2 * d - m1) + 0.66 * np.sin(2 * d)
+    return elong % 360.0
+
+def moon_phase (days):
+    """
+    Moon phase of days (0 new moon, 7 first quarter, 14 full moon, 21 last quarter)
+    """
+    phase = (np.trunc(_elongation(days)) + 6.43) / 360 * 28
+    return np.where(phase >= 28.0, phase - 28.0, phase)
+
+def moon_illumination (days):
+    """
+    Illuminated fraction of the moon disc of days (0 new moon, 1 full moon)
+    """
+    return (1 - np.cos(np.radians(_elongation(days)))) / 2
+
+def lmst (jd2000, longitude:float):
+    """
+    Local mean sidereal time (degrees)
+    """
+    t0 = jd2000 / 36525
+    return (280.46061837 + 360.98564736629 * jd2000 + 0.000387933 * t0**2 + t0**3 / 38710000) % 360 + longitude
+
+def moon_elevation (dates, latitude:float, longitude:float):
+    """
+    Elevation of the moon (degrees above the horizon) at each date
+    ## Params
+    dates: DatetimeIndex
+        dates (UTC if naive)
+    """
+    jd2000 = julian_days(_naive_utc(dates)) - JD2000
+    ra, dec, _ = moon_position(jd2000)
+    hour_angle = np.radians(lmst(jd2000, longitude)) - ra
+    lat = np.radians(latitude)
+    x = -np.cos(hour_angle) * np.cos(dec) * np.sin(lat) + np.sin(dec) * np.cos(lat)
+    y = -np.sin(hour_angle) * np.cos(dec)
+    z = np.cos(hour_angle) * np.cos(dec) * np.cos(lat) + np.sin(dec) * np.sin(lat)
+    return np.degrees(np.arctan2(z, np.sqrt(x * x + y * y)))
+
+def _interpolate (f0, f1, f2, p:float):
+    a = f1 - f0
+    b = f2 - f1 - a
+    return f0 + p * (2 * a + b * (2 * p - 1))
+
+def riseset (dates, latitude:float, longitude:float):
+    """
+    Moonrise and moonset of UTC days (as `astral.moon.riseset`): the moon
+    altitude is followed hour by hour for all days at once and horizon
+    crossings are interpolated.
+    ## Params
+    dates: DatetimeIndex
+        naive days (midnight)
+    ## Return
+    rise, set: np.ndarray
+        minutes after 00:00 UTC (NaN if no event this day)
+    """
+    jd2000 = dates.to_julian_date().values - JD2000
+    mst = np.radians(lmst(jd2000, longitude))
+    ra, dec, distance = zip(*[moon_position(jd2000 + interval * 0.5) for interval in range(3)])
+    ra = list(ra)
+    for interval in range(1, 3):
+        ra[interval] = np.where(ra[interval] <= ra[interval - 1], ra[interval] + 2 * np.pi, ra[interval])
+    k1 = np.radians(15 * 1.0027379097096138907193594760917)
+    sl, cl = np.sin(np.radians(latitude)), np.cos(np.radians(latitude))
+    # moon apparent radius + parallax correction
+    z = np.cos(np.radians(90 + MOON_APPARENT_RADIUS - (41.685 / distance[1])))
+    altitude = lambda d, h: sl * np.sin(d) + cl * np.cos(d) * np.cos(h) - z
+    ra0, dec0 = ra[0], dec[0]
+    rise, set = np.full(len(jd2000), np.nan), np.full(len(jd2000), np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for hour in range(24):
+            ph = (hour + 1) / 24
+            ra2, dec2 = _interpolate(*ra, ph), _interpolate(*dec, ph)
+            ra2 = np.where(ra2 < ra0, ra2 + 2 * np.pi, ra2)
+            hour_angle0 = mst - ra0 + hour * k1
+            hour_angle2 = mst - ra2 + hour * k1 + k1
+            if hour == 0:
+                alt0 = altitude(dec0, hour_angle0)
+            alt2 = altitude(dec2, hour_angle2)
+            alt1 = altitude((dec2 + dec0) / 2, (hour_angle2 + hour_angle0) / 2)
+            a = 2 * alt2 - 4 * alt1 + 2 * alt0
+            b = 4 * alt1 - 3 * alt0 - alt2
+            discriminant = b * b - 4 * a * alt0
+            crossing = (np.sign(alt0) != np.sign(alt2)) & (discriminant >= 0)
+            sq = np.sqrt(np.where(crossing, discriminant, 0))
+            e = (-b + sq) / (2 * a)
+            e = np.where((e > 1) | (e < 0), (-b - sq) / (2 * a), e)
+            time = hour + e + 1 / 120
+            event = np.trunc(time) * 60 + np.trunc((time - np.trunc(time)) * 60)
+            # keep the event closest to the query hour (same rules as astral)
+            query = hour * 60
+            for is_event, times, others in [(crossing & (alt0 < 0) & (alt2 > 0), rise, set),
+                                            (crossing & (alt0 > 0) & (alt2 < 0), set, rise)]:
+                tq, eq = times - query, event - query
+                oq = np.where(np.isnan(others), 0, others - query)
+                update = np.isnan(times) | ((np.sign(tq) == np.sign(eq)) & (np.abs(tq) > np.abs(eq)))
+                update |= (np.sign(tq) != np.sign(eq)) & ~np.isnan(others) & (np.sign(tq) == np.sign(oq))
+                times[is_event & update] = event[is_event & update]
+            ra0, dec0, alt0 = ra2, dec2, alt2
+    return rise, set
+
+def _to_datetimes (dates, minutes):
+    return (dates + pd.to_timedelta(minutes, unit="min")).tz_localize("UTC")
+
+def moon_events (days, latitude:float, longitude:float, timezone=None):
+    """
+    Moonrise and moonset of an array of local days in one pass.
+    ## Params
+    days: DatetimeIndex
+        days to compute (local days if tz-aware)
+    latitude, longitude: float
+        observer position (degrees)
+    timezone: tzinfo
+        timezone of outputs (default: timezone of `days`, UTC if naive)
+    ## Return
+    events: pd.DataFrame
+        one row per day (indexed by `days`), `moonrise` and `moonset` columns
+    """
+    days = pd.DatetimeIndex(days)
+    timezone = timezone if timezone is not None else (days.tz or "UTC")
+    dates = _naive_days(days)
+    events = {}
+    for name, minutes in zip(["moonrise", "moonset"], riseset(dates, latitude, longitude)):
+        # same day search as astral: no event on the UTC day raises (NaT), an event
+        # on another local day is searched on the next/previous UTC day
+        result = _to_datetimes(dates, minutes).tz_convert(timezone)
+        shift = (result.tz_localize(None).normalize() - dates).days.values
+        redo = ~np.isnan(shift) & (shift != 0)
+        if redo.any():
+            dates_redo = dates[redo] + pd.to_timedelta(-np.sign(shift[redo]), unit="d")
+            minutes_redo = riseset(dates_redo, latitude, longitude)[name == "moonset"]
+            result_redo = _to_datetimes(dates_redo, minutes_redo).tz_convert(timezone)
+            same_day = (result_redo.tz_localize(None).normalize() == dates[redo])
+            values = result.values.copy()
+            values[redo] = np.where(same_day, result_redo.values, np.datetime64("NaT"))
+            result = pd.DatetimeIndex(values).tz_localize("UTC").tz_convert(timezone)
+        events[name] = result
+    return pd.DataFrame(events, index=days)
@@ -0,0 +1,208 @@
+"""
+Vectorized solar events (NOAA / Meeus formulas, same as `astral.sun`) for
+arrays of days. Results agree with `astral.sun` within 1 second (noon and
+midnight are truncated to the second like astral, other events are
+computed to the microsecond). Days without event (high latitudes) give NaT
+instead of raising. Midnight is always the one of the requested day:
+`astral.sun.midnight` steps a tz-aware day back by 24 hours when midnight
+falls before 00:00 UTC, so after a 23 hours day (spring-forward DST
+change, expl: Europe/Paris east of Greenwich) it returns the midnight of
+the previous day.
+"""
+from astral.sun import SUN_APPARENT_RADIUS, adjust_to_horizon, adjust_to_obscuring_feature, refraction_at_zenith
+import pandas as pd
+import numpy as np
+
+def julianday_to_juliancentury (jd):
+    return (jd - 2451545.0) / 36525.0
+
+def geom_mean_long_sun (jc):
+    return (280.46646 + jc * (36000.76983 + 0.0003032 * jc)) % 360.0
+
+def geom_mean_anomaly_sun (jc):
+    return 357.52911 + jc * (35999.05029 - 0.0001537 * jc)
+
+def eccentric_location_earth_orbit (jc):
+    return 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+
+def sun_eq_of_center (jc):
+    mrad = np.radians(geom_mean_anomaly_sun(jc))
+    return (np.sin(mrad) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+            + np.sin(2 * mrad) * (0.019993 - 0.000101 * jc)
+            + np.sin(3 * mrad) * 0.000289)
+
+def sun_apparent_long (jc):
+    omega = 125.04 - 1934.136 * jc
+    return geom_mean_long_sun(jc) + sun_eq_of_center(jc) - 0.00569 - 0.00478 * np.sin(np.radians(omega))
+
+def obliquity_correction (jc):
+    seconds = 21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))
+    e0 = 23.0 + (26.0 + (seconds / 60.0)) / 60.0
+    omega = 125.04 - 1934.136 * jc
+    return e0 + 0.00256 * np.cos(np.radians(omega))
+
+def sun_declination (jc):
+    sint = np.sin(np.radians(obliquity_correction(jc))) * np.sin(np.radians(sun_apparent_long(jc)))
+    return np.degrees(np.arcsin(sint))
+
+def eq_of_time (jc):
+    """
+    Equation of time (in minutes)
+    """
+    l0 = np.radians(geom_mean_long_sun(jc))
+    e = eccentric_location_earth_orbit(jc)
+    m = np.radians(geom_mean_anomaly_sun(jc))
+    y = np.tan(np.radians(obliquity_correction(jc)) / 2.0) ** 2
+    etime = (y * np.sin(2.0 * l0) - 2.0 * e * np.sin(m) + 4.0 * e * y * np.sin(m) * np.cos(2.0 * l0)
+             - 0.5 * y * y * np.sin(4.0 * l0) - 1.25 * e * e * np.sin(2.0 * m))
+    return np.degrees(etime) * 4.0
+
+def time_of_transit (jd, latitude:float, longitude:float, zenith:float, rising:bool):
+    """
+    Time (in minutes after 00:00 UTC of each day) when the sun transits the
+    zenith, NaN if the zenith is never reached.
+    """
+    latitude = np.clip(latitude, -89.8, 89.8)
+    lat = np.radians(latitude)
+    adjustment, time_utc = 0.0, 0.0
+    with np.errstate(invalid="ignore"):
+        for _ in range(2):
+            jc = julianday_to_juliancentury(jd + adjustment)
+            decl = np.radians(sun_declination(jc))
+            h = (np.cos(np.radians(zenith)) - np.sin(lat) * np.sin(decl)) / (np.cos(lat) * np.cos(decl))
+            hour_angle = np.arccos(h) if rising else -np.arccos(h)
+            offset = (-longitude - np.degrees(hour_angle)) * 4.0 - eq_of_time(jc)
+            offset = np.where(offset < -720.0, offset + 1440, offset)
+            time_utc = 720.0 + offset
+            adjustment = time_utc / 1440.0
+    return time_utc
+
+def _truncated_seconds (time_utc_hours):
+    """
+    Hours to seconds, truncating hour/minute/second like astral noon/midnight
+    """
+    hour = np.trunc(time_utc_hours)
+    minute = np.trunc((time_utc_hours - hour) * 60)
+    second = np.trunc(((time_utc_hours - hour) * 60 - minute) * 60)
+    return hour * 3600 + minute * 60 + second
+
+def _to_datetimes (dates_utc, seconds):
+    """
+    Naive UTC days + seconds (float, NaN allowed) to UTC DatetimeIndex (microsecond resolution)
+    """
+    us = np.round(np.asarray(seconds, dtype=float) * 1e6)
+    delta = pd.to_timedelta(np.where(np.isnan(us), np.nan, us), unit="us")
+    return (dates_utc + delta).tz_localize("UTC")
+
+def solar_events (days, latitude:float, longitude:float, elevation=0.0, timezone=None):
+    """
+    Compute sunrise, sunset, dawn, dusk (civil), noon and midnight for an
+    array of days in one pass.
+    ## Params
+    days: DatetimeIndex
+        days to compute (local days if tz-aware)
+    latitude, longitude: float
+        observer position (degrees)
+    elevation: float | tuple
+        observer elevation (same convention as `astral.Observer`)
+    timezone: tzinfo
+        timezone of outputs (default: timezone of `days`, UTC if naive)
+    ## Return
+    events: pd.DataFrame
+        one row per day (indexed by `days`) and one column per event
+    """
+    days = pd.DatetimeIndex(days)
+    timezone = timezone if timezone is not None else (days.tz or "UTC")
+    dates = (days.tz_localize(None) if days.tz is not None else days).normalize()
+    jd = dates.to_julian_date().values
+    if isinstance(elevation, tuple):
+        adjustment_for_elevation = adjust_to_obscuring_feature(elevation)
+    elif elevation > 0.0:
+        adjustment_for_elevation = adjust_to_horizon(float(elevation))
+    else:
+        adjustment_for_elevation = 0.0
+    events = {}
+    for name, zenith, rising in [("sunset", 90.0 + SUN_APPARENT_RADIUS, False), ("dusk", 96.0, False),
+                                 ("sunrise", 90.0 + SUN_APPARENT_RADIUS, True), ("dawn", 96.0, True)]:
+        zenith = zenith + adjustment_for_elevation
+        zenith = zenith + refraction_at_zenith(zenith)
+        # same day search as astral: compute on the local date, else on the next/previous date
+        result = _to_datetimes(dates, time_of_transit(jd, latitude, longitude, zenith, rising) * 60).tz_convert(timezone)
+        shift = (result.tz_localize(None).normalize() - dates).days.values
+        redo = ~np.isnan(shift) & (shift != 0)
+        if redo.any():
+            delta = -np.sign(shift[redo])
+            dates_redo = dates[redo] + pd.to_timedelta(delta, unit="d")
+            result_redo = _to_datetimes(dates_redo, time_of_transit(jd[redo] + delta, latitude, longitude, zenith, rising) * 60).tz_convert(timezone)
+            same_day = (result_redo.tz_localize(None).normalize() == dates[redo])
+            values = result.values.copy()
+            values[redo] = np.where(same_day, result_redo.values, np.datetime64("NaT"))
+            result = pd.DatetimeIndex(values).tz_localize("UTC").tz_convert(timezone)
+        events[name] = result
+    jc = julianday_to_juliancentury(jd)
+    events["noon"] = _to_datetimes(dates, _truncated_seconds((720.0 - 4 * longitude - eq_of_time(jc)) / 60.0)).tz_convert(timezone)
+    jc = julianday_to_juliancentury(jd + 1.0 - longitude / 360.0)
+    events["midnight"] = _to_datetimes(dates, _truncated_seconds((-longitude * 4.0 - eq_of_time(jc)) / 60.0)).tz_convert(timezone)
+    return pd.DataFrame(events, index=days)
+
+def julian_days (dates):
+    """
+    Julian days of naive (UTC) dates
+    """
+    return dates.asi8 / 86400e9 + 2440587.5
+
+def refraction_correction (elevation):
+    """
+    Atmospheric refraction (degrees) of the sun at elevations (degrees), as `astral.refraction_at_zenith`
+    """
+    te = np.tan(np.radians(elevation))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correction = np.where(elevation > 5.0, 58.1 / te - 0.07 / te**3 + 0.000086 / te**5,
+                              np.where(elevation > -0.575, 1735.0 + elevation * (-518.2 + elevation * (103.4 + elevation * (-12.79 + elevation * 0.711))),
+                                       -20.774 / te))
+    return np.where(elevation >= 85.0, 0.0, correction / 3600.0)
+
+def solar_angles (dates, latitude:float, longitude:float, with_refraction:bool=True, dtype="float64", chunk_size:int=2**18):
+    """
+    Elevation and azimuth of the sun for an array of dates in one pass
+    (same formulas as `astral.sun.elevation` / `azimuth`), computed by
+    chunks so temporaries stay small.
+    ## Params
+    dates: DatetimeIndex
+        dates (UTC if naive)
+    latitude, longitude: float
+        observer position (degrees)
+    with_refraction: bool
+        correct the elevation for atmospheric refraction
+    dtype: str
+        dtype of outputs (expl: `"float32"` for large tables)
+    ## Return
+    elevation, azimuth: np.ndarray
+        degrees above the horizon, degrees clockwise from North
+    """
+    dates = pd.DatetimeIndex(dates)
+    dates = dates.tz_convert("UTC").tz_localize(None) if dates.tz is not None else dates
+    latitude = np.clip(latitude, -89.8, 89.8)
+    cl, sl = np.cos(np.radians(latitude)), np.sin(np.radians(latitude))
+    elevation, azimuth = np.empty(len(dates), dtype=dtype), np.empty(len(dates), dtype=dtype)
+    for start in range(0, len(dates), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        jd = julian_days(dates[chunk])
+        jc = julianday_to_juliancentury(jd)
+        decl = np.radians(sun_declination(jc))
+        # true solar time (minutes) from the UTC time of day (exact nanoseconds, the
+        # fraction of the julian day loses about 1e-7 degree of hour angle)
+        minutes = dates[chunk].asi8 % (86400 * 10**9) / 60e9
+        hour_angle = np.radians((minutes + eq_of_time(jc) + 4.0 * longitude) % 1440.0 / 4.0 - 180.0)
+        csz = np.clip(cl * np.cos(decl) * np.cos(hour_angle) + sl * np.sin(decl), -1.0, 1.0)
+        zenith = np.degrees(np.arccos(csz))
+        az_denom = cl * np.sin(np.radians(zenith))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            az = 180.0 - np.degrees(np.arccos(np.clip((sl * csz - np.sin(decl)) / az_denom, -1.0, 1.0)))
+        az = np.where(hour_angle > 0.0, -az, az)
+        az = np.where(np.abs(az_denom) > 0.001, az, 180.0 if latitude > 0.0 else 0.0)
+        azimuth[chunk] = az % 360.0
+        if with_refraction:
+            zenith = zenith - refraction_correction(90.0 - zenith)
+        elevation[chunk] = 90.0 - zenith
+    return elevation, azimuth
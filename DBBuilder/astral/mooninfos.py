@@ -1,5 +1,7 @@
 from astral import Observer, moon
 from DBBuilder.astral.__base_astral import BaseAstral
+from DBBuilder.astral import __lunar_engine as lunar_engine
+import pandas as pd
 import datetime
 
 class Moon (BaseAstral):
@@ -8,9 +10,49 @@ class Moon (BaseAstral):
         "moon_phase":moon.phase
     }
 
-    def __init__(self, latitude: float = 48.886, longitude: float = 2.333, elevation: float = 35, timezone: str = "UTC", **kargs) -> None:
+    lunar_functs:dict={
+        "moon_phase":moon.phase,
+        "moon_illumination":lunar_engine.moon_illumination,
+        "moonrise":moon.moonrise,
+        "moonset":moon.moonset
+    }
+
+    backends:list=["astral", "numpy"]
+
+    def __init__(self, latitude: float = 48.886, longitude: float = 2.333, elevation: float = 35, timezone: str = "UTC",
+                 backend:str="astral", moon_functs:list=None, moon_altitude:bool=False, **kargs) -> None:
+        """
+        ## Params
+
+        backend: str
+
+            engine used to compute day infos: `"astral"` (one `astral.moon` call
+            per day and info) or `"numpy"` (vectorized over all missing days at
+            once, see `DBBuilder.astral.__lunar_engine`).
+
+        moon_functs: list
+
+            day infos to compute among `lunar_functs` (`"moon_phase"`,
+            `"moon_illumination"`, `"moonrise"`, `"moonset"`), default `["moon_phase"]`.
+
+        moon_altitude: bool
+
+            add the moon altitude (degrees above the horizon) of each date.
+        """
+        if not backend in self.backends:
+            raise ValueError(f"Unknown backend '{backend}', must be in {self.backends}")
+        if moon_functs is not None:
+            unknown = set(moon_functs) - set(self.lunar_functs)
+            if unknown:
+                raise ValueError(f"Unknown moon functs {sorted(unknown)}, must be in {list(self.lunar_functs)}")
+            self.astral_functs = {k:self.lunar_functs[k] for k in moon_functs}
+        self.backend = backend
+        self.moon_altitude = moon_altitude
         super().__init__(latitude, longitude, elevation, timezone, **kargs)
 
+    def cache_key_params (self):
+        return {**super().cache_key_params(), "backend":self.backend}
+
     def get_infos(self, date, format:str="%Y-%m-%d %H:%M:%S"):
         date = self.read_date(date, format=format)
         day_infos = self.get_day_infos(date, format=format)
@@ -19,8 +61,50 @@ class Moon (BaseAstral):
             **day_infos
         }
         del moon_infos["day"]
+        if self.moon_altitude:
+            moon_infos["moon_altitude"] = self.get_altitudes(pd.Series([date]))[0]
+        return moon_infos
+
+    def get_infos_batch (self, dates, format:str="%Y-%m-%d %H:%M:%S"):
+        """
+        Get moon informations for a whole set of dates at once (same
+        informations as `get_infos`), computed once per distinct day.
+        """
+        dates = self.read_dates(dates, format=format).reset_index(drop=True)
+        codes, uniq_days = pd.factorize(self.floor_dates(dates, "d"))
+        day_infos = self.get_days_infos(uniq_days).take(codes).reset_index(drop=True)
+        moon_infos = pd.concat([dates.rename("date"), day_infos], axis=1)
+        if self.moon_altitude:
+            moon_infos["moon_altitude"] = self.get_altitudes(dates)
         return moon_infos
 
+    def get_altitudes (self, dates:pd.Series):
+        """
+        Moon altitude (degrees above the horizon) of tz-aware dates
+        """
+        if self.backend == "numpy":
+            return lunar_engine.moon_elevation(dates, latitude=self.obs.latitude, longitude=self.obs.longitude)
+        # astral reads the wall time of dates, so dates are given in UTC
+        return [moon.elevation(self.obs, date.to_pydatetime()) for date in dates.dt.tz_convert("UTC")]
+
+    def _run_astral_functs (self, dates:list):
+        """
+        run moon functions for a set of dates
+        """
+        if self.backend == "numpy":
+            days = pd.DatetimeIndex(self.floor_dates(self.read_dates(dates), "d"))
+            infos = pd.DataFrame(index=days)
+            if "moon_phase" in self.astral_functs:
+                infos["moon_phase"] = lunar_engine.moon_phase(days)
+            if "moon_illumination" in self.astral_functs:
+                infos["moon_illumination"] = lunar_engine.moon_illumination(days)
+            if "moonrise" in self.astral_functs or "moonset" in self.astral_functs:
+                events = lunar_engine.moon_events(days, latitude=self.obs.latitude, longitude=self.obs.longitude,
+                                                  timezone=self.timezone)
+                infos = infos.join(events)
+            return infos[list(self.astral_functs.keys())]
+        return super()._run_astral_functs(dates)
+
     def _run_astral_funct(self, functKey:str, date:datetime.datetime):
         """
         run moon function
@@ -28,7 +112,12 @@ class Moon (BaseAstral):
         funct = self.astral_functs[functKey]
         if functKey == "moon_phase":
             return funct(date)
-        else:
-            return funct(date, tzinfo=self.timezone)
+        elif functKey == "moon_illumination":
+            return funct([date])[0]
+        try:
+            date = funct(self.obs, date, tzinfo=self.timezone)
+        except ValueError: # no event this day
+            return pd.NaT
+        return pd.NaT if date is None else self.read_date(date=date)
 
 
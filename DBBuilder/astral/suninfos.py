@@ -1,7 +1,9 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 from DBBuilder.astral.__base_astral import BaseAstral
+from DBBuilder.astral.__solar_engine import solar_events, solar_angles
 from astral import sun
 import pandas as pd
+import numpy as np
 
 class Sun (BaseAstral):
     
@@ -14,10 +16,39 @@ class Sun (BaseAstral):
         "midnight":sun.midnight
     }
     
-    def __init__(self, latitude: float = 48.886, longitude: float = 2.333, elevation: float = 35, timeAroundTW:float=5400.0, timezone: str = "UTC", **kargs) -> None:
+    backends:list=["astral", "numpy"]
+    
+    def __init__(self, latitude: float = 48.886, longitude: float = 2.333, elevation: float = 35, timeAroundTW:float=5400.0, timezone: str = "UTC", 
+                 backend:str="astral", solar_angles:bool=False, angles_dtype:str="float64", **kargs) -> None:
+        """
+        ## Params
+
+        backend: str
+
+            engine used to compute day events: `"astral"` (one `astral.sun` call 
+            per day and event) or `"numpy"` (vectorized NOAA formulas over all 
+            missing days at once, see `DBBuilder.astral.__solar_engine`).
+
+        solar_angles: bool
+
+            add the sun elevation and azimuth of each date (`sun_elevation`, 
+            `sun_azimuth`, see `get_solar_angles`).
+
+        angles_dtype: str
+
+            dtype of solar angles (`"float32"` halves the size of large tables).
+        """
+        if not backend in self.backends:
+            raise ValueError(f"Unknown backend '{backend}', must be in {self.backends}")
+        self.backend = backend
+        self.solar_angles = solar_angles
+        self.angles_dtype = angles_dtype
         super().__init__(latitude, longitude, elevation, timezone, **kargs)
         self.timeAroundTW = timeAroundTW
 
+    def cache_key_params (self):
+        return {**super().cache_key_params(), "backend":self.backend}
+
     def get_infos (self, date, format:str="%Y-%m-%d %H:%M:%S"):
         """
         Get suncycle informations for a given date `Y-m-d H:M:S`. 
@@ -51,16 +82,10 @@ class Sun (BaseAstral):
             + day informations [``]        
         """
         date = self.read_date(date, format=format)
-        day = date.floor("d")
-        suncycle_type = "night"
         # suncycle infos
         day_infos = self.get_day_infos(date=date, format=format) 
         tw_infos = self.get_twilight_infos(date=date, format=format)
-        suncycle_type = self.get_suncycle_type(date=date, tw_infos=tw_infos,
-                                          format=format)
-        suncycle_day = day 
-        if suncycle_type == "night" and tw_infos["dist_tw_setting"] < 0:
-            suncycle_day -= timedelta(days=1)
+        suncycle_type, suncycle_day = self.get_suncycle(date=date, format=format)
         sun_infos={
             "date":date,
             "suncycle_type":suncycle_type,
@@ -69,8 +94,170 @@ class Sun (BaseAstral):
             **day_infos
         }
         del sun_infos["day"]
+        if self.solar_angles:
+            sun_infos.update(self.get_solar_angles(pd.Series([date])).iloc[0].to_dict())
         return sun_infos
-        
+
+    def get_infos_batch (self, dates, format:str="%Y-%m-%d %H:%M:%S", solar_angles:bool=None):
+        """
+        Get suncycle informations for a whole set of dates at once (same
+        informations as `get_infos`). Day informations are computed once
+        per distinct day then broadcasted to all dates, suncycles are found 
+        by a binary search in the suncycle boundaries of these days (see 
+        `get_suncycle_boundaries`).
+        ## Params
+
+        dates: pd.Series | np.ndarray | list
+
+            dates input.
+
+        format: str
+
+            date format if to read dates if type string.
+
+        solar_angles: bool
+
+            add solar angles of each date (default `self.solar_angles`).
+
+        ## Return
+
+        suncycle_infos: pd.DataFrame
+
+            suncycle informations (one row per input date, see `get_infos`)
+        """
+        dates = self.read_dates(dates, format=format).reset_index(drop=True)
+        codes, uniq_days = pd.factorize(self.floor_dates(dates, "d"), sort=True)
+        day_infos = self.get_days_infos(uniq_days)
+        # suncycle type and day (one binary search over all days boundaries)
+        boundaries, types, suncycle_days = self.get_suncycle_boundaries(day_infos)
+        idx = np.searchsorted(boundaries, dates.values.view("i8"), side="right") - 1
+        suncycle_type = types[idx]
+        suncycle_day = pd.Series(suncycle_days[idx], name="suncycle_day")
+        # twilight infos (per distinct day)
+        mid_tw_rising, mid_tw_setting = self.get_twilight_mids(day_infos)
+        mid_tw_rising, mid_tw_setting = [s.take(codes).reset_index(drop=True) for s in [mid_tw_rising, mid_tw_setting]]
+        sun_infos = pd.DataFrame({
+            "date":dates,
+            "suncycle_type":suncycle_type,
+            "suncycle_day":suncycle_day,
+            "mid_tw_rising":mid_tw_rising,
+            "mid_tw_seting":mid_tw_setting,
+            "dist_tw_rising":(dates - mid_tw_rising).dt.total_seconds(),
+            "dist_tw_setting":(dates - mid_tw_setting).dt.total_seconds()
+        })
+        day_infos = day_infos.take(codes).reset_index(drop=True)
+        sun_infos = pd.concat([sun_infos, day_infos], axis=1)
+        if self.solar_angles if solar_angles is None else solar_angles:
+            sun_infos = pd.concat([sun_infos, self.get_solar_angles(dates)], axis=1)
+        return sun_infos
+
+    def get_solar_angles (self, dates, format:str="%Y-%m-%d %H:%M:%S"):
+        """
+        Sun elevation (degrees above the horizon, with refraction) and azimuth 
+        (degrees clockwise from North) of each date, computed for all dates 
+        at once whatever the backend (same formulas as `astral.sun.elevation` 
+        and `astral.sun.azimuth`).
+        ## Return
+        angles: pd.DataFrame
+            `sun_elevation` and `sun_azimuth` columns (`angles_dtype`), one row per date
+        """
+        dates = self.read_dates(dates, format=format)
+        elevation, azimuth = solar_angles(dates.values, latitude=self.obs.latitude, longitude=self.obs.longitude, 
+                                          dtype=self.angles_dtype)
+        return pd.DataFrame({"sun_elevation":elevation, "sun_azimuth":azimuth})
+
+    def get_twilight_mids (self, day_infos:pd.DataFrame):
+        """
+        Middles of the rising (dawn/sunrise) and setting (sunset/dusk) twilight 
+        zones of a set of days. When one event of a zone does not occur 
+        (high latitudes), the other one is used, NaT if none occurs.
+        ## Params
+
+        day_infos: pd.DataFrame
+
+            day informations (output of `get_days_infos`)
+
+        ## Return
+
+        mid_tw_rising, mid_tw_setting: pd.Series
+        """
+        dawn, sunrise, sunset, dusk = [pd.to_datetime(day_infos[k], utc=True).dt.tz_convert(self.timezone) 
+                                       for k in ["dawn", "sunrise", "sunset", "dusk"]]
+        mid_tw_rising = (dawn + (sunrise - dawn)/2).fillna(sunrise).fillna(dawn)
+        mid_tw_setting = (sunset + (dusk - sunset)/2).fillna(sunset).fillna(dusk)
+        return mid_tw_rising, mid_tw_setting
+
+    def get_suncycle_boundaries (self, day_infos:pd.DataFrame):
+        """
+        Sorted boundaries of the suncycle segments (rising, daylight, setting, 
+        night) of a set of days, as one monotonic array: any date of these 
+        days is labelled by a binary search (`np.searchsorted(boundaries, date, 
+        side="right") - 1`). Segments follow `get_suncycle_type` rules (twilight 
+        zones of `timeAroundTW` seconds around twilight middles, rising first) and
+        night before the rising twilight belongs to the previous day. Each day is 
+        cut at its own midnights, so dates are labelled with the events of their day.
+        When the setting comes before the rising in a day, the sun is up before the 
+        setting and after the rising (daylight).
+
+        At high latitudes, a missing twilight middle means the sun did not rise 
+        (or set) this day: with only a setting the day is daylight until setting, 
+        with only a rising the day is daylight after rising, with none the day is 
+        daylight (polar day) or night (polar night, belonging to the day itself) 
+        depending on the sun elevation at noon. Days without sunrise and sunset 
+        but with civil twilights have rising and setting zones and no daylight 
+        if the sun stays below the horizon.
+        ## Params
+
+        day_infos: pd.DataFrame
+
+            day informations indexed by sorted distinct days (output of `get_days_infos`)
+
+        ## Return
+
+        boundaries: np.ndarray
+
+            segment starts (int64 UTC nanoseconds, sorted)
+
+        types: np.ndarray
+
+            suncycle type of each segment
+
+        suncycle_days: pd.DatetimeIndex
+
+            suncycle day of each segment
+        """
+        days = pd.DatetimeIndex(day_infos.index)
+        day_start = days.asi8
+        day_end = pd.DatetimeIndex(self.read_dates(days.tz_localize(None) + pd.Timedelta(days=1))).asi8
+        mid_tw_rising, mid_tw_setting = [s.values.view("i8").copy() for s in self.get_twilight_mids(day_infos)]
+        # missing twilight: sun risen before the day or setting after it
+        no_rising, no_setting = [mid == np.iinfo(np.int64).min for mid in [mid_tw_rising, mid_tw_setting]]
+        before, after = day_start - 2*86400*10**9, day_end + 2*86400*10**9
+        # no sunrise and sunset: polar day or night (civil twilights may still occur)
+        no_sun = (day_infos["sunrise"].isna() & day_infos["sunset"].isna()).values
+        polar_night = np.zeros(len(days), dtype=bool)
+        if no_sun.any():
+            noons = pd.to_datetime(day_infos["noon"], utc=True)[no_sun]
+            polar_night[no_sun] = [sun.elevation(self.obs, noon) < 0 for noon in noons]
+        mid_tw_rising = np.where(no_rising, np.where(polar_night, after, before), mid_tw_rising)
+        mid_tw_setting = np.where(no_setting, np.where(polar_night, before, after), mid_tw_setting)
+        # change points of the suncycle rules in each day
+        W = int(round(self.timeAroundTW * 1e9))
+        starts = np.stack([day_start, mid_tw_rising - W, mid_tw_rising + W + 1, mid_tw_setting - W, mid_tw_setting + W + 1, 
+                           mid_tw_rising + 1, mid_tw_setting], axis=1)
+        starts = np.sort(np.clip(starts, day_start[:, None], day_end[:, None]), axis=1)
+        # rules evaluated at each segment start (constant until next change point)
+        dist_tw_rising, dist_tw_setting = starts - mid_tw_rising[:, None], starts - mid_tw_setting[:, None]
+        rising_first = (mid_tw_rising < mid_tw_setting)[:, None]
+        daylight = np.where(rising_first, (dist_tw_rising > 0) & (dist_tw_setting < 0), (dist_tw_rising > 0) | (dist_tw_setting < 0))
+        daylight &= ~polar_night[:, None]
+        types = np.select(condlist=[np.abs(dist_tw_rising) <= W, np.abs(dist_tw_setting) <= W, daylight],
+                          choicelist=["rising", "setting", "daylight"], default="night")
+        previous_day = ((types == "night") & (dist_tw_rising < 0) & (dist_tw_setting < 0)).ravel()
+        local_days = days.tz_localize(None).values.repeat(starts.shape[1]) - previous_day * np.timedelta64(1, "D")
+        suncycle_days = pd.DatetimeIndex(self.read_dates(local_days))
+        return starts.ravel(), types.ravel(), suncycle_days
+
     def get_suncycle_type (self, date, tw_infos:dict=None, format:str="%Y-%m-%d %H:%M:%S"):
         """
         Get suncycle type
@@ -96,17 +283,31 @@ class Sun (BaseAstral):
         """
         date = self.read_date(date, format=format)
         isTWinfos = type(tw_infos) == dict and not False in [k in tw_infos.keys() for k in ["dist_tw_rising", "dist_tw_setting"]]
-        tw_infos = self.get_twilight_infos(date=date, format=format) if not isTWinfos else tw_infos
+        if not isTWinfos:
+            return self.get_suncycle(date=date, format=format)[0]
         dist_tw_rising, dist_tw_setting = tw_infos["dist_tw_rising"], tw_infos["dist_tw_setting"]
         suncycle="night"
         if abs(dist_tw_rising) <= self.timeAroundTW:
             suncycle="rising"
         elif abs(dist_tw_setting) <= self.timeAroundTW:
             suncycle="setting"
-        elif dist_tw_rising > 0 and dist_tw_setting < 0:
+        elif dist_tw_rising > dist_tw_setting and dist_tw_rising > 0 and dist_tw_setting < 0:
             suncycle="daylight"
+        elif dist_tw_rising < dist_tw_setting and (dist_tw_rising > 0 or dist_tw_setting < 0):
+            suncycle="daylight" # setting before rising (high latitudes): sun is up before setting and after rising
         return suncycle
 
+    def get_suncycle (self, date, format:str="%Y-%m-%d %H:%M:%S"):
+        """
+        Get suncycle type and suncycle day of a date (binary search in the 
+        suncycle boundaries of its day, see `get_suncycle_boundaries`)
+        """
+        date = self.read_date(date, format=format)
+        day = date.floor("d", ambiguous=True, nonexistent="shift_forward")
+        boundaries, types, suncycle_days = self.get_suncycle_boundaries(self.get_days_infos([day]))
+        idx = np.searchsorted(boundaries, date.value, side="right") - 1
+        return types[idx], suncycle_days[idx]
+
     def get_twilight_infos (self, date:datetime, format:str="%Y-%m-%d %H:%M:%S"):
         """
         Get ditance of date to twilight zones. This zone is respectively 
@@ -139,10 +340,7 @@ class Sun (BaseAstral):
         """
         date = self.read_date(date, format=format)
         day_infos = self.get_day_infos(date=date, format=format)
-        keys_tw = ["sunrise", "dawn", "sunset", "dusk"]
-        sunrise, dawn, sunset, dusk = [day_infos[k] for k in keys_tw]
-        mid_tw_rising = dawn + (sunrise - dawn)/2
-        mid_tw_setting = sunset + (dusk - sunset)/2
+        mid_tw_rising, mid_tw_setting = [mid.iloc[0] for mid in self.get_twilight_mids(pd.DataFrame([day_infos]))]
         dist_tw_rising = date - mid_tw_rising
         dist_tw_setting = date - mid_tw_setting
         tw_infos={
@@ -153,11 +351,25 @@ class Sun (BaseAstral):
         }
         return tw_infos
 
+    def _run_astral_functs (self, dates:list):
+        """
+        run sun functions for a set of dates
+        """
+        if self.backend == "numpy":
+            days = pd.DatetimeIndex(self.floor_dates(self.read_dates(dates), "d"))
+            events = solar_events(days=days, latitude=self.obs.latitude, longitude=self.obs.longitude, 
+                                  elevation=self.obs.elevation, timezone=self.timezone)
+            return events[list(self.astral_functs.keys())]
+        return super()._run_astral_functs(dates)
+
     def _run_astral_funct(self, functKey:str, date:datetime):
         """
         run sun function
         """
         funct = self.astral_functs[functKey]
-        date = funct(self.obs, date, tzinfo=self.timezone)
+        try:
+            date = funct(self.obs, date, tzinfo=self.timezone)
+        except ValueError: # no event this day (high latitudes)
+            return pd.NaT
         date = self.read_date(date=date)
         return date
\ No newline at end of file
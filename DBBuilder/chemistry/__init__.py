@@ -0,0 +1 @@
+from DBBuilder.chemistry.waterchemistry import WaterChemistry
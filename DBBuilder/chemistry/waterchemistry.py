@@ -0,0 +1,171 @@
+from DBBuilder.__datereader import DateReader
+from DBBuilder.__fileutils import read_chunks
+import pandas as pd
+import numpy as np
+import glob
+
+class WaterChemistry (DateReader):
+    """
+    Water chemistry series of a site resampled on the aggregation grid
+    `timefreq` and joined to acoustic dbs. Continuous probes (high frequency,
+    multi-year files, expl: `./data/bougival/chimie continue/`) are read by
+    chunks and reduced to one row per time bin, point samples (sparse, expl:
+    `./data/bougival/chimie ponctuelle/`) are kept per bin and carried
+    forward up to a tolerance. Sources are joined to aggregated rows with a
+    sorted as-of join, so no minute grid is built.
+    ## Params
+    timezone: str
+        timezone of dates (naive dates of files are read in this timezone
+        unless the source timezone is given)
+    timefreq: str
+        time frequency of resampling (expl: `DBBuilder.timefreq`)
+    catalog: DataCatalog
+        catalog of raw data (files are read from their Parquet sidecars)
+    """
+
+    aggs:list=["mean", "min", "max", "count"]
+
+    def __init__(self, timezone:str="UTC", timefreq="h", catalog=None) -> None:
+        super().__init__(timezone=timezone)
+        self.timefreq = timefreq
+        self.catalog = catalog
+        self.sources = {}
+
+    def add_continuous (self, files, name:str="probe", col_date:str="date", columns:list=None, aggs:list=["mean"],
+                        tolerance:str=None, chunksize:int=1_000_000, format:str=None, timezone:str=None, **read_csv_kargs):
+        """
+        Add continuous probe files (one value per probe period)
+        ## Params
+        files: list | str
+            list of csv / excel paths or glob pattern
+        name: str
+            name of the source (prefix of its columns in joined dbs)
+        col_date: str
+            column name of measure dates
+        columns: list
+            measured parameters to keep (default all other columns)
+        aggs: list
+            aggregations of each parameter by time bin (in `WaterChemistry.aggs`)
+        tolerance: str
+            maximum distance to the last measured bin of a joined row (None: same bin only)
+        chunksize: int
+            number of rows read at once
+        format: str
+            date format (inferred if None)
+        timezone: str
+            timezone of naive dates of files (default `timezone`)
+        **read_csv_kargs:
+            other `pd.read_csv` parameters (expl: `sep=";"`, `decimal=","`, `encoding="latin-1"`)
+        """
+        table = self.read_resampled(files, col_date=col_date, columns=columns, aggs=aggs, chunksize=chunksize, format=format,
+                                    timezone=timezone, **read_csv_kargs)
+        return self.add_source(name=name, table=table, tolerance=tolerance)
+
+    def add_samples (self, files, name:str="sample", col_date:str="date", columns:list=None, aggs:list=["mean"],
+                     tolerance:str="7D", chunksize:int=1_000_000, format:str=None, timezone:str=None, **read_csv_kargs):
+        """
+        Add point sample files (lab analyses at sparse dates). Values of a
+        sample are carried forward to rows up to `tolerance` after it (see
+        `add_continuous` for parameters).
+        """
+        table = self.read_resampled(files, col_date=col_date, columns=columns, aggs=aggs, chunksize=chunksize, format=format,
+                                    timezone=timezone, **read_csv_kargs)
+        return self.add_source(name=name, table=table, tolerance=tolerance)
+
+    def add_source (self, name:str, table:pd.DataFrame, tolerance:str=None):
+        """
+        Add a resampled source (output of `resample`, one row per time bin)
+        """
+        self.sources[name] = {"table":table, "tolerance":tolerance}
+        return self
+
+    def read_resampled (self, files, col_date:str="date", columns:list=None, aggs:list=["mean"], chunksize:int=1_000_000,
+                        format:str=None, timezone:str=None, **read_csv_kargs):
+        """
+        Read files by chunks and resample them on `timefreq`. Each chunk is
+        reduced to partial aggregates by bin (bins split between chunks or
+        files are merged), so memory is bounded by the number of bins.
+        ## Return
+        table: pd.DataFrame
+            `date` (bin start) and `<parameter>_<agg>` columns, sorted by date
+        """
+        files = sorted(glob.glob(files, recursive=True)) if isinstance(files, str) else list(files)
+        usecols = None if columns is None else [col_date] + list(columns)
+        partials = []
+        for path in files:
+            path = self.catalog.sidecar(path) if self.catalog is not None else path
+            for chunk in read_chunks(path, columns=usecols, chunksize=chunksize, **read_csv_kargs):
+                partials.append(self._partials(chunk, col_date=col_date, columns=columns, format=format, timezone=timezone, 
+                                               decimal=read_csv_kargs.get("decimal", ".")))
+        return self._combine(partials, aggs=aggs)
+
+    def resample (self, df:pd.DataFrame, col_date:str="date", columns:list=None, aggs:list=["mean"], format:str=None,
+                  timezone:str=None):
+        """
+        Resample measures of a dataframe on `timefreq` (see `read_resampled`)
+        """
+        return self._combine([self._partials(df, col_date=col_date, columns=columns, format=format, timezone=timezone)], aggs=aggs)
+
+    def _partials (self, df:pd.DataFrame, col_date:str="date", columns:list=None, format:str=None, timezone:str=None, 
+                   decimal:str="."):
+        """
+        Sums, counts, minima and maxima of measures by time bin (non numeric
+        values, expl: `"n.d."` or `"<LQ"` in lab analyses, count as missing)
+        """
+        columns = [c for c in df.columns if c != col_date] if columns is None else list(columns)
+        dates = self.read_dates((DateReader(timezone) if timezone else self).read_dates(df[col_date], format=format))
+        bins = self.floor_dates(dates, self.timefreq).rename("date")
+        to_numeric = lambda col: pd.to_numeric(col.str.replace(decimal, ".", regex=False) if col.dtype == object else col, errors="coerce")
+        values = df[columns].apply(to_numeric)
+        grouped = values.groupby(bins)
+        return pd.concat({"sum":grouped.sum(), "count":grouped.count(), "min":grouped.min(), "max":grouped.max()}, axis=1)
+
+    def _combine (self, partials:list, aggs:list=["mean"]):
+        """
+        Merge partial aggregates and compute the aggregations of each bin
+        """
+        unknown = set(aggs) - set(self.aggs)
+        if unknown:
+            raise ValueError(f"Unknown aggregations {sorted(unknown)}, must be in {self.aggs}")
+        if not partials:
+            return pd.DataFrame(columns=["date"])
+        partials = pd.concat(partials)
+        grouped = {stat:partials[stat].groupby(level=0) for stat in ["sum", "count", "min", "max"]}
+        count = grouped["count"].sum()
+        stats = {
+            "mean":lambda: grouped["sum"].sum() / count.where(count > 0),
+            "min":lambda: grouped["min"].min(),
+            "max":lambda: grouped["max"].max(),
+            "count":lambda: count
+        }
+        table = pd.concat({agg:stats[agg]() for agg in aggs}, axis=1)
+        table.columns = [f"{col}_{agg}" for agg, col in table.columns]
+        table = table[sorted(table.columns)]
+        table.index = pd.DatetimeIndex(table.index).tz_convert(self.timezone).rename("date")
+        return table[count.max(axis=1).values > 0].reset_index()
+
+    def join (self, df:pd.DataFrame, col_date:str="date_", sources:list=None):
+        """
+        Attach sources to each row with a sorted as-of join on the time bin
+        (`date_<source>` is the bin of the matched measures, columns are
+        prefixed by the source name)
+        ## Params
+        df: pd.DataFrame
+            dataframe sorted by `col_date` (expl: output of `DBBuilder.create_acoustic_db`)
+        col_date: str
+            column name of date values
+        sources: list
+            names of the sources to join (default all)
+        """
+        if len(df) == 0:
+            return df
+        for name in (self.sources if sources is None else sources):
+            source = self.sources[name]
+            table = source["table"].rename(columns=lambda c: f"{c}_{name}" if c == "date" else f"{name}_{c}")
+            if len(table) == 0:
+                df = df.assign(**{c:np.nan for c in table.columns})
+                continue
+            table[f"date_{name}"] = table[f"date_{name}"].dt.tz_convert(df[col_date].dt.tz)
+            df = pd.merge_asof(df, table, left_on=col_date, right_on=f"date_{name}", direction="backward",
+                               tolerance=pd.Timedelta(source["tolerance"] or 0))
+        return df
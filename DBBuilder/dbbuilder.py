@@ -1,35 +1,409 @@
 from DBBuilder.__datereader import DateReader
+from DBBuilder.__labelcounter import LabelCounter, compact_uint_dtype
+from DBBuilder.__buildstate import BuildState
+from DBBuilder.__fileutils import read_chunks
+from DBBuilder.__instrumentation import Instrumentation
 from DBBuilder import Sun, Moon
-from DBBuilder.meteo import OpenMeteo
+from DBBuilder.meteo import OpenMeteo, add_rain_history
+from DBBuilder.chemistry import WaterChemistry
+from DBBuilder.storage.datacatalog import write_sidecar
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 import numpy as np
 import pandas as pd
-from dateutil import tz
-from IPython.display import display
+import glob
+import os
 
 class DBBuilder (DateReader):
 
     timefreq_to_count_occ:str="min"
+    count_sparse_threshold:float=None
+    meteo_tolerance:str="1h"
+    meteo_direction:str="backward"
+    rain_thresholds:list=None
+    rain_windows:list=["24h", "72h", "7D"]
+    rain_lookback:str="30D"
+    aggregation_mode:str="grid"
+    empty_buckets:bool=False
 
-    def __init__(self, latitude:float=48.886, longitude:float=2.333, elevation:float=35, timezone:str="UTC", timefreq="h", **kargs) -> None:
+    def __init__(self, latitude:float=48.886, longitude:float=2.333, elevation:float=35, timezone:str="UTC", timefreq="h", 
+                 add_meteo:bool=False, add_moon:bool=False, add_solar_angles:bool=False, meteo_store_dir:str=None, 
+                 meteo_cache_path:str=None, on_stage=None, catalog=None, meteo=None, **kargs) -> None:
+        """
+        ## Params
+        add_moon: bool
+            add moon infos (`Moon` day infos, `moon_functs` / `moon_altitude` 
+            in kargs) at the middle of each aggregated row
+        add_solar_angles: bool
+            add the sun elevation and azimuth (`angles_dtype` in kargs) at 
+            the middle of each aggregated row
+        meteo_store_dir: str
+            directory of the local meteo chunk store (see `OpenMeteo`)
+        meteo_cache_path: str
+            path of the meteo HTTP cache, opened on the first meteo request
+        on_stage: callable
+            `on_stage(record:dict)` called at the end of each stage of the build 
+            with its wall time, rows in/out, peak RSS delta and astral cache hits/misses 
+            (expl: `DBBuilder.stage_logger()`, None to disable instrumentation)
+        meteo: MeteoProvider
+            provider of hourly meteo (default `OpenMeteo` of the site, expl: 
+            `MeteoMerge([RainGauge(...), OpenMeteo(...)])` to prefer local rain gauges)
+        catalog: DataCatalog
+            catalog of raw data, input files (detections, chemistry) are read from 
+            their Parquet sidecars with the read options of the catalog (see 
+            `DBBuilder.storage.DataCatalog`)
+
+        Water chemistry sources added to `chemistry` (see `WaterChemistry.add_continuous`
+        and `add_samples`) are joined to aggregated rows.
+        """
         self.sun = Sun(latitude=latitude, longitude=longitude, elevation=elevation, timezone=timezone, **kargs)
         self.moon = Moon(latitude=latitude, longitude=longitude, elevation=elevation, timezone=timezone, **kargs)
-        self.meteo = OpenMeteo(latitude=latitude, longitude=longitude, timezone=timezone)
+        self.meteo = meteo if meteo is not None else OpenMeteo(latitude=latitude, longitude=longitude, timezone=timezone, 
+                                                               store_dir=meteo_store_dir, cache_path=meteo_cache_path)
+        self.catalog = catalog
+        self.chemistry = WaterChemistry(timezone=timezone, timefreq=timefreq, catalog=catalog)
         self.timefreq = timefreq
+        self.add_meteo = add_meteo
+        self.add_moon = add_moon
+        self.add_solar_angles = add_solar_angles
+        self.instrumentation = Instrumentation(callback=on_stage, counters=[self.sun, self.moon])
         super().__init__(timezone=timezone)
         
     def create_acoustic_db (self, dates:np.ndarray, labels:np.ndarray, format:str="%Y-%m-%d %H:%M:%S"):
+        """
+        Create acoustic db from detections (dates and labels). With `aggregation_mode` 
+        `"grid"`, counts are computed on a complete time grid (`timefreq_to_count_occ`) 
+        with sun infos of each bin then aggregated, with `"events"` detections 
+        are directly tagged with their bucket (see `create_acoustic_db_from_raw_counts`).
+        """
         # 1) Count labels occurence over time  
-        labels_count = self.count_labels_occurence(dates=dates, labels=labels, timefreq=self.timefreq_to_count_occ, format=format)
+        with self.instrumentation.span("count", rows_in=len(dates)) as span:
+            counter = self.make_label_counter(timefreq=self.timefreq_to_count_occ)
+            counter.update(dates=dates, labels=labels, format=format)
+            counts = self._counter_counts(counter)
+            span["rows_out"] = 0 if counts is None else len(counts)
+        return self._create_acoustic_db_from_counter_counts(counts=counts, format=format)
+
+    def create_acoustic_db_from_csv (self, path:str, col_date:str="date", col_label:str="label", chunksize:int=1_000_000, 
+                                     format:str="%Y-%m-%d %H:%M:%S", **read_csv_kargs):
+        """
+        Create acoustic db from a detection file (expl: YOLO report) read by 
+        chunks, so peak memory is bounded by the number of time bins and not 
+        by the number of detections.
+        ## Params
+        path: str
+            path of csv file
+        col_date, col_label: str
+            column names of detection dates and labels
+        chunksize: int
+            number of detections read at once
+        """
+        with self.instrumentation.span("count") as span:
+            chunks = read_chunks(self.input_path(path), columns=[col_date, col_label], dtype={col_date:str, col_label:str}, 
+                                 chunksize=chunksize, **read_csv_kargs)
+            counter = self.make_label_counter(timefreq=self.timefreq_to_count_occ)
+            counter.update_from_chunks(chunks=chunks, col_date=col_date, col_label=col_label, format=format)
+            counts = self._counter_counts(counter)
+            span["rows_out"] = 0 if counts is None else len(counts)
+        return self._create_acoustic_db_from_counter_counts(counts=counts, format=format)
+
+    def create_acoustic_db_from_files (self, files, workers:int=None, col_date:str="date", col_label:str="label", 
+                                       chunksize:int=1_000_000, format:str="%Y-%m-%d %H:%M:%S", **read_csv_kargs):
+        """
+        Create acoustic db from several detection files (expl: all YOLO reports of a 
+        deployment). Files are read and counted in parallel (one task per file), 
+        partial counts are merged (label sets may differ between files) then astral 
+        infos and aggregation are computed once on the merged counts.
+        ## Params
+        files: list | str
+            list of csv paths or glob pattern
+        workers: int
+            number of worker processes (default: number of cpus, 1 to run in the current process)
+        """
+        files = sorted(glob.glob(files, recursive=True)) if isinstance(files, str) else list(files)
+        # catalog sidecars are converted by the workers, the manifest is updated here once
+        tasks = [self.catalog.sidecar_task(path) for path in files] if self.catalog is not None else None
+        count_file = partial(count_file_labels, timefreq=self.timefreq_to_count_occ, timezone=self.timezone_str, col_date=col_date, 
+                             col_label=col_label, chunksize=chunksize, format=format, **read_csv_kargs)
+        counter = self.make_label_counter(timefreq=self.timefreq_to_count_occ)
+        with self.instrumentation.span("count", rows_in=len(files)) as span:
+            with (ProcessPoolExecutor(max_workers=workers) if workers != 1 else nullcontext()) as executor:
+                sources = tasks if tasks is not None else files
+                partials = executor.map(count_file, sources) if executor else map(count_file, sources)
+                for counts in partials:
+                    if counts is not None:
+                        counter.add_counts(counts)
+            if tasks is not None:
+                self.catalog.commit_sidecars(tasks)
+            counts = self._counter_counts(counter)
+            span["rows_out"] = 0 if counts is None else len(counts)
+        return self._create_acoustic_db_from_counter_counts(counts=counts, format=format)
+
+    def input_path (self, path:str):
+        """
+        Path to read an input file from (its catalog sidecar if the builder has a catalog)
+        """
+        return self.catalog.sidecar(path) if self.catalog is not None else path
+
+    def _counter_counts (self, counter:LabelCounter):
+        """
+        Counts of a filled counter for the pipeline of `aggregation_mode` 
+        (long format for `"events"`, complete grid for `"grid"`)
+        """
+        return counter.get_raw_counts() if self.aggregation_mode == "events" else counter.get_counts()
+
+    def _create_acoustic_db_from_counter_counts (self, counts, format:str="%Y-%m-%d %H:%M:%S"):
+        """
+        Create acoustic db from `_counter_counts` output
+        """
+        if self.aggregation_mode == "events":
+            return self.create_acoustic_db_from_raw_counts(raw_counts=counts, empty_buckets=self.empty_buckets)
+        return self.create_acoustic_db_from_counts(labels_count=counts, format=format)
+
+    def update_acoustic_db (self, files, state_dir:str, col_date:str="date", col_label:str="label", 
+                            chunksize:int=1_000_000, format:str="%Y-%m-%d %H:%M:%S", **read_csv_kargs):
+        """
+        Incremental build of the acoustic db. The previous db, its labels count
+        and the number of detections processed per file are kept in `state_dir`.
+        Only new detections (new files or rows appended to known files) are 
+        counted, and only the aggregated rows from the first affected time bin 
+        (first new detection or last previous time bin) are recomputed.
+        ## Params
+        files: list | str
+            list of csv paths or glob pattern
+        state_dir: str
+            directory of the build state (see `BuildState`)
+        ## Return
+        db: pd.DataFrame
+            updated acoustic db (same as `create_acoustic_db` on all detections)
+        """
+        files = sorted(glob.glob(files, recursive=True)) if isinstance(files, str) else list(files)
+        state = BuildState(path=state_dir, timezone=self.timezone)
+        counter = self.make_label_counter(timefreq=self.timefreq_to_count_occ)
+        # 1) Count new detections only
+        for path in files:
+            key, n_done = os.path.abspath(path), state.files.get(os.path.abspath(path), 0)
+            chunks = read_chunks(self.input_path(path), columns=[col_date, col_label], dtype={col_date:str, col_label:str}, 
+                                 chunksize=chunksize, skiprows=n_done, **read_csv_kargs)
+            for chunk in chunks:
+                counter.update(dates=chunk[col_date], labels=chunk[col_label], format=format)
+                n_done += len(chunk)
+            state.files[key] = n_done
+        new_counts = counter.get_raw_counts()
+        if new_counts is None:
+            return state.db
+        # 2) Window to recompute (from first affected aggregation bin)
+        new_dates = new_counts.index.get_level_values("date")
+        start, end = new_dates.min(), new_dates.max()
+        if state.counts is not None:
+            old_dates = state.counts.index.get_level_values("date")
+            start = self.floor_dates(pd.Series([start, old_dates.max()]), self.timefreq).min()
+            end = max(end, old_dates.max())
+            counter.add_counts(state.counts[old_dates >= start])
+            all_counts = pd.concat([state.counts, new_counts]).groupby(level=["date", "label"]).sum()
+            grid_start = max(start, min(old_dates.min(), new_dates.min()))
+        else:
+            all_counts, grid_start = new_counts, start
+        labels_count = counter.get_counts(start=grid_start, end=end)
+        db_window = self.create_acoustic_db_from_counts(labels_count=labels_count, format=format)
+        # 3) Merge with previous db
+        if state.db is not None:
+            db = pd.concat([state.db[state.db["date_"] < start], db_window], ignore_index=True)
+            label_cols = sorted(c for c in db.columns if c.startswith("label_"))
+            db[label_cols] = db[label_cols].fillna(0)
+            db = db.astype({col:compact_uint_dtype(db[col].max()) for col in label_cols})
+            other_cols = [c for c in db_window.columns if c not in label_cols and c not in ["date_", "suncycle_type_", "suncycle_day_"]]
+            db = db[["date_", "suncycle_type_", "suncycle_day_"] + label_cols + other_cols]
+        else:
+            db = db_window
+        state.db, state.counts = db, all_counts
+        state.save()
+        return db
+
+    def create_acoustic_db_from_counts (self, labels_count:pd.DataFrame, format:str="%Y-%m-%d %H:%M:%S"):
+        """
+        Create acoustic db from labels count over time (output of `count_labels_occurence`)
+        """
+        instr = self.instrumentation
         # 2) Find astral informations
         ## 2.1) Sun informations
-        df_sun = pd.DataFrame(labels_count.date.apply(self.sun.get_infos, format=format).to_list())
-        ## 2.2) Moon informations
-        df_moon = pd.DataFrame(labels_count.date.apply(self.moon.get_infos, format=format).to_list())
-        astral_infos = pd.merge(df_sun, df_moon, on="date")
-        labels_count = pd.merge(labels_count, astral_infos, on="date")
+        with instr.span("sun_infos", rows_in=len(labels_count)) as span:
+            df_sun = self.sun.get_infos_batch(labels_count.date, format=format, solar_angles=False)
+            span["rows_out"] = len(df_sun)
+        ## (rows are aligned with labels_count dates)
+        with instr.span("astral_merge", rows_in=len(labels_count)) as span:
+            labels_count = pd.concat([labels_count, df_sun.drop(columns="date")], axis=1)
+            span["rows_out"] = len(labels_count)
         # 3) Agregation by suncycles
-        labels_count_aggBy = self.agregate_count_by(df=labels_count, timefreq=self.timefreq, format=format)
+        with instr.span("aggregate", rows_in=len(labels_count)) as span:
+            labels_count_aggBy = self.agregate_count_by(df=labels_count, timefreq=self.timefreq, format=format)
+            span["rows_out"] = len(labels_count_aggBy)
+        ## 3.1) Moon informations and solar angles (on aggregated rows)
+        if self.add_moon:
+            with instr.span("moon_infos", rows_in=len(labels_count_aggBy)) as span:
+                labels_count_aggBy = self.add_moon_infos(df=labels_count_aggBy)
+                span["rows_out"] = len(labels_count_aggBy)
+        if self.add_solar_angles:
+            with instr.span("solar_angles", rows_in=len(labels_count_aggBy)) as span:
+                labels_count_aggBy = self.add_solar_angles_infos(df=labels_count_aggBy)
+                span["rows_out"] = len(labels_count_aggBy)
+        ## 3.2) Water chemistry (joined on aggregated rows)
+        if self.chemistry.sources:
+            with instr.span("chemistry", rows_in=len(labels_count_aggBy)) as span:
+                labels_count_aggBy = self.chemistry.join(df=labels_count_aggBy, col_date="date_")
+                span["rows_out"] = len(labels_count_aggBy)
+        # 4) Meteo informations (joined on aggregated rows)
+        if self.add_meteo:
+            with instr.span("meteo", rows_in=len(labels_count_aggBy)) as span:
+                labels_count_aggBy = self.add_meteo_infos(df=labels_count_aggBy, col_date="date_")
+                span["rows_out"] = len(labels_count_aggBy)
         return labels_count_aggBy 
+
+    def create_acoustic_db_from_raw_counts (self, raw_counts:pd.Series, empty_buckets:bool=False):
+        """
+        Create acoustic db from counts in long format (`LabelCounter.get_raw_counts`) 
+        without the complete time grid: each counted bin is tagged with its bucket 
+        (aggregation bin `timefreq` x suncycle segment, found by binary search in the 
+        suncycle boundaries) and counts are summed by bucket. Buckets extents 
+        (`date_min`, `date_max`) are computed from the cuts of the grid by bins and 
+        suncycle segments, so the cost scales with detections and buckets instead of 
+        grid bins x labels. Output is the same as the grid pipeline (without empty 
+        buckets unless `empty_buckets`).
+        ## Params
+        raw_counts: pd.Series
+            counts indexed by date bin (`timefreq_to_count_occ`) and label
+        empty_buckets: bool
+            keep buckets without detections (between first and last detection)
+        """
+        instr = self.instrumentation
+        label_cols = [] if raw_counts is None else [f"label_{l}_sum" for l in sorted(raw_counts.index.levels[1])]
+        if raw_counts is None or len(raw_counts) == 0:
+            return pd.DataFrame(columns=["date_", "suncycle_type_", "suncycle_day_"] + label_cols + ["date_min", "date_max"])
+        dates = raw_counts.index.get_level_values("date")
+        start, end = dates.min(), dates.max()
+        step = pd.tseries.frequencies.to_offset(self.timefreq_to_count_occ).nanos
+        # 1) suncycle segments of the covered days
+        with instr.span("sun_infos", rows_in=len(raw_counts)) as span:
+            day_infos = self.sun.daily_infos_in_range(start, end)
+            boundaries, types, suncycle_days = self.sun.get_suncycle_boundaries(day_infos)
+            span["rows_out"] = len(boundaries)
+        with instr.span("aggregate", rows_in=len(raw_counts)) as span:
+            # 2) buckets: cuts of the grid [start, end] by aggregation bins and suncycle segments
+            grid_start, grid_end = start.value, end.value + step
+            cuts = np.unique(np.concatenate([[grid_start, grid_end], boundaries, self._bins_starts(start, end).asi8]))
+            cuts = cuts[(cuts >= grid_start) & (cuts <= grid_end)]
+            firsts = grid_start - (grid_start - cuts[:-1]) // step * step
+            lasts = grid_start - (grid_start - cuts[1:]) // step * step - step
+            firsts, lasts = firsts[firsts <= lasts], lasts[firsts <= lasts]
+            buckets = self._tag_buckets(firsts, boundaries, types, suncycle_days)
+            buckets = buckets.assign(date_min=firsts, date_max=lasts).groupby(["date_", "suncycle_type_", "suncycle_day_"], sort=True)\
+                             .agg(date_min=("date_min", "min"), date_max=("date_max", "max"))
+            # 3) counts by bucket (each distinct grid bin tagged once)
+            codes, uniq_dates = pd.factorize(dates)
+            tags = self._tag_buckets(uniq_dates.asi8, boundaries, types, suncycle_days).take(codes)
+            tags["label"] = raw_counts.index.get_level_values("label")
+            counts = pd.Series(raw_counts.values, index=pd.MultiIndex.from_frame(tags))\
+                       .groupby(level=["date_", "suncycle_type_", "suncycle_day_", "label"]).sum()\
+                       .unstack("label", fill_value=0)
+            counts.columns = [f"label_{l}_sum" for l in counts.columns]
+            db = buckets.join(counts[label_cols], how="left" if empty_buckets else "inner").fillna(0)
+            db = db.astype({col:compact_uint_dtype(db[col].max() if len(db) else 0) for col in label_cols})
+            db = db[label_cols + ["date_min", "date_max"]].reset_index()
+            for col in ["date_", "suncycle_day_", "date_min", "date_max"]:
+                db[col] = pd.to_datetime(db[col], utc=True).dt.tz_convert(self.timezone)
+            span["rows_out"] = len(db)
+        ## 3.1) Moon informations and solar angles (on aggregated rows)
+        if self.add_moon:
+            with instr.span("moon_infos", rows_in=len(db)) as span:
+                db = self.add_moon_infos(df=db)
+                span["rows_out"] = len(db)
+        if self.add_solar_angles:
+            with instr.span("solar_angles", rows_in=len(db)) as span:
+                db = self.add_solar_angles_infos(df=db)
+                span["rows_out"] = len(db)
+        ## 3.2) Water chemistry (joined on aggregated rows)
+        if self.chemistry.sources:
+            with instr.span("chemistry", rows_in=len(db)) as span:
+                db = self.chemistry.join(df=db, col_date="date_")
+                span["rows_out"] = len(db)
+        # 4) Meteo informations (joined on aggregated rows)
+        if self.add_meteo:
+            with instr.span("meteo", rows_in=len(db)) as span:
+                db = self.add_meteo_infos(df=db, col_date="date_")
+                span["rows_out"] = len(db)
+        return db
+
+    def _bins_starts (self, start, end):
+        """
+        Starts of aggregation bins (`timefreq`) between two dates
+        """
+        offset = pd.tseries.frequencies.to_offset(self.timefreq)
+        first = self.floor_dates(pd.Series([start]), self.timefreq).iloc[0]
+        if isinstance(offset, pd.offsets.Tick) and offset.nanos <= 3600 * 10**9:
+            return pd.date_range(first, end, freq=offset)
+        return pd.DatetimeIndex(self.read_dates(pd.date_range(first.tz_localize(None), end.tz_localize(None), freq=offset)))
+
+    def _tag_buckets (self, dates:np.ndarray, boundaries:np.ndarray, types:np.ndarray, suncycle_days:pd.DatetimeIndex):
+        """
+        Bucket (aggregation bin, suncycle type and day) of dates (int64 UTC nanoseconds)
+        """
+        idx = np.searchsorted(boundaries, dates, side="right") - 1
+        bins = self.floor_dates(pd.Series(pd.to_datetime(dates, utc=True)).dt.tz_convert(self.timezone), self.timefreq)
+        return pd.DataFrame({"date_":bins.values.view("i8"), "suncycle_type_":types[idx], "suncycle_day_":suncycle_days.asi8[idx]})
+
+    def add_moon_infos (self, df:pd.DataFrame, col_date_min:str="date_min", col_date_max:str="date_max"):
+        """
+        Add moon infos (see `Moon.get_infos_batch`) of the middle of each 
+        aggregated row (between its first and last counted dates)
+        """
+        if len(df) == 0:
+            return df
+        dates = df[col_date_min] + (df[col_date_max] - df[col_date_min]) / 2
+        df_moon = self.moon.get_infos_batch(dates.reset_index(drop=True)).drop(columns="date")
+        return pd.concat([df.reset_index(drop=True), df_moon], axis=1)
+
+    def add_solar_angles_infos (self, df:pd.DataFrame, col_date_min:str="date_min", col_date_max:str="date_max"):
+        """
+        Add solar angles (see `Sun.get_solar_angles`) of the middle of each 
+        aggregated row (between its first and last counted dates)
+        """
+        if len(df) == 0:
+            return df
+        dates = df[col_date_min] + (df[col_date_max] - df[col_date_min]) / 2
+        return pd.concat([df.reset_index(drop=True), self.sun.get_solar_angles(dates.reset_index(drop=True))], axis=1)
+
+    def add_meteo_infos (self, df:pd.DataFrame, col_date:str="date_", tolerance:str=None, direction:str=None):
+        """
+        Attach hourly meteo (variables of the `meteo` provider) to each row with a 
+        sorted as-of join. Only the span covered by `df` is fetched (plus 
+        `rain_lookback` if `rain_thresholds` is set, to add rain history 
+        features, see `DBBuilder.meteo.rain_history`).
+        ## Params
+        df: pd.DataFrame
+            dataframe sorted by `col_date` (expl: output of `agregate_count_by`)
+        col_date: str
+            column name of date values
+        tolerance: str
+            maximum distance between a row and its meteo record (default `meteo_tolerance`)
+        direction: str
+            `"backward"`, `"forward"` or `"nearest"` (default `meteo_direction`)
+        ## Return
+        df: pd.DataFrame
+            input with meteo columns (`date_meteo` is the date of the matched record)
+        """
+        if len(df) == 0:
+            return df
+        date_start = df[col_date].min()
+        if self.rain_thresholds:
+            date_start = date_start - max(pd.Timedelta(self.rain_lookback), *[pd.Timedelta(w) for w in self.rain_windows])
+        meteo = self.meteo.get_meteo(date_start=date_start, date_end=df[col_date].max())
+        if self.rain_thresholds:
+            meteo = add_rain_history(meteo, thresholds=self.rain_thresholds, windows=self.rain_windows, col_rain="rain", col_date="date")
+        meteo = meteo.assign(date=meteo["date"].dt.tz_convert(df[col_date].dt.tz))
+        meteo = meteo.rename(columns={"date":"date_meteo"})
+        return pd.merge_asof(df, meteo, left_on=col_date, right_on="date_meteo", 
+                             tolerance=pd.Timedelta(tolerance or self.meteo_tolerance), direction=direction or self.meteo_direction)
     
     def agregate_count_by (self, df:pd.DataFrame, traget_cols:list=None, col_date:str="date", grpBy=["suncycle_type", "suncycle_day"], 
                               timefreq="h", format="%Y-%m-%d %H:%M:%S", traget_prefix:str="label"):
@@ -54,28 +428,68 @@ class DBBuilder (DateReader):
         aggreg: pd.DataFrame
             results of aggregation
         """
-        df[col_date] = df[col_date].apply(self.read_date, format=format)
+        df[col_date] = self.read_dates(df[col_date], format=format)
         traget_cols = [c for c in df.columns if c.startswith(traget_prefix)] if not traget_cols else traget_cols
-        grpby_params = [df[col_date].dt.floor(timefreq)] + grpBy 
+        grpby_params = [self.floor_dates(df[col_date], timefreq)] + grpBy 
 
-        agg_params = {k:"sum" for k in traget_cols}
-        agg_params.update({col_date: ['min', 'max']})
-        aggreg = df.groupby(grpby_params).agg(agg_params).reset_index()
+        grouped = df.groupby(grpby_params)
+        aggreg = grouped.agg({col_date: ['min', 'max']})
+        # integer counts are summed with bincount over group codes (sparse columns 
+        # only visit their non zero values) and kept in a compact unsigned dtype
+        codes, n_groups = grouped.ngroup().values, len(aggreg)
+        sums = {}
+        for col in traget_cols:
+            values = df[col].array
+            if isinstance(values, pd.arrays.SparseArray):
+                col_sums = np.bincount(codes[values.sp_index.indices], weights=values.sp_values, minlength=n_groups)
+            else:
+                col_sums = np.bincount(codes, weights=np.asarray(values), minlength=n_groups)
+            is_count = pd.api.types.is_integer_dtype(values.dtype.subtype if isinstance(values, pd.arrays.SparseArray) else values.dtype)
+            sums[(col, "sum")] = col_sums.astype(compact_uint_dtype(col_sums.max() if n_groups else 0)) if is_count else col_sums
+        aggreg = pd.concat([pd.DataFrame(sums, index=aggreg.index), aggreg], axis=1).reset_index()
         aggreg.columns = ['_'.join(col) for col in aggreg.columns.values]
         return aggreg
 
+    def make_label_counter (self, timefreq="min"):
+        """
+        Labels counter in builder timezone (rare labels stored as sparse 
+        columns if `count_sparse_threshold` is set)
+        """
+        return LabelCounter(timefreq=timefreq, timezone=self.timezone_str, sparse_threshold=self.count_sparse_threshold)
+
     def count_labels_occurence (self, dates:np.ndarray, labels:np.ndarray, timefreq="min", prefix:str="label_", format="%Y-%m-%d %H:%M:%S"):
         """
         Count labels occurrence in a time frequency from a list of dates and labels
         """
-        df = pd.DataFrame({"date":dates, "label":labels})
-        df.date = df.date.apply(self.read_date, format=format)
-        df_grouped = df.groupby([pd.Grouper(key='date', freq=timefreq), 'label']).size().reset_index(name='count')
-        df_pivot = df_grouped.pivot_table(index='date', columns='label', values='count', fill_value=0)
-        index_complet = pd.date_range(start=df_pivot.index.min(), end=df_pivot.index.max(), freq=timefreq)
-        labels_count = df_pivot.reindex(index_complet, fill_value=0)
-        labels_count = labels_count.add_prefix(prefix).reset_index(names=["date"])
-        # labels_count.columns = [f"label_{col}" if col != 'date' else col for col in labels_count.columns]
-        return labels_count
+        counter = self.make_label_counter(timefreq=timefreq)
+        counter.update(dates=dates, labels=labels, format=format)
+        return counter.get_counts(prefix=prefix)
 
+    def count_labels_occurence_chunked (self, chunks, col_date:str="date", col_label:str="label", timefreq="min", 
+                                        prefix:str="label_", format="%Y-%m-%d %H:%M:%S"):
+        """
+        Count labels occurrence in a time frequency from an iterable of detection
+        DataFrames (expl: `pd.read_csv(..., chunksize=...)`), keeping only running
+        counts per time bin and label in memory
+        """
+        counter = self.make_label_counter(timefreq=timefreq)
+        counter.update_from_chunks(chunks=chunks, col_date=col_date, col_label=col_label, format=format)
+        return counter.get_counts(prefix=prefix)
 
+def count_file_labels (path, timefreq:str="min", timezone:str="UTC", col_date:str="date", col_label:str="label", 
+                       chunksize:int=1_000_000, format:str="%Y-%m-%d %H:%M:%S", **read_csv_kargs):
+    """
+    Count labels occurrence of a detection file (long format counts, see 
+    `LabelCounter.get_raw_counts`). Module level to be run in worker processes.
+    ## Params
+    path: str | dict
+        csv path or sidecar task of a catalog (`DataCatalog.sidecar_task`, 
+        the sidecar is converted first if needed)
+    """
+    if isinstance(path, dict):
+        path = write_sidecar(path) if path["convert"] else path["sidecar"]
+    chunks = read_chunks(path, columns=[col_date, col_label], dtype={col_date:str, col_label:str}, 
+                         chunksize=chunksize, **read_csv_kargs)
+    counter = LabelCounter(timefreq=timefreq, timezone=timezone)
+    counter.update_from_chunks(chunks=chunks, col_date=col_date, col_label=col_label, format=format)
+    return counter.get_raw_counts()
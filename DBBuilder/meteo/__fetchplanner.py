@@ -0,0 +1,100 @@
+from DBBuilder.__fileutils import write_atomic
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+import pandas as pd
+
+def local_day (date):
+    """
+    Local calendar day of a date (naive midnight) and its timezone
+    """
+    date = pd.Timestamp(date)
+    return (date.tz_localize(None) if date.tz is not None else date).normalize(), date.tz
+
+def local_midnight (day, tz):
+    """
+    Midnight of a naive calendar day in `tz` (first occurrence if ambiguous,
+    shifted forward if nonexistent)
+    """
+    return day.tz_localize(tz, ambiguous=True, nonexistent="shift_forward") if tz is not None else day
+
+class FetchPlanner ():
+    """
+    Fetch planner of hourly meteo data. Requested ranges are split into
+    fixed chunks (calendar months by default), chunks already fetched are
+    served from a local Parquet store and only missing chunks are fetched
+    (concurrently) then stitched together.
+    ## Params
+    fetch: callable
+        `fetch(chunk_start, chunk_end)` returning the hourly DataFrame (with a
+        `"date"` column) of the days `[chunk_start, chunk_end]`
+    store_dir: str
+        directory of the local chunk store
+    key_params: dict
+        parameters identifying the data (location, timezone, variables)
+    timezone: tzinfo
+        timezone of dates
+    chunk_freq: str
+        frequency of chunk starts (pandas offset alias, default month start)
+    max_workers: int
+        maximum number of concurrent fetches
+    min_age_days: int
+        chunks ending less than `min_age_days` ago are not stored (the
+        archive is not complete yet for recent days)
+    """
+
+    def __init__(self, fetch, store_dir:str, key_params:dict, timezone=None, chunk_freq:str="MS", max_workers:int=4,
+                 min_age_days:int=7) -> None:
+        self.fetch = fetch
+        self.key = hashlib.sha1(json.dumps(key_params, sort_keys=True).encode()).hexdigest()[:16]
+        self.path = os.path.join(store_dir, self.key)
+        self.timezone = timezone
+        self.chunk_freq = chunk_freq
+        self.max_workers = max_workers
+        self.min_age_days = min_age_days
+
+    def plan (self, date_start, date_end):
+        """
+        Chunks `(chunk_start, chunk_end)` (inclusive days) covering `[date_start, date_end]`
+        """
+        (day_start, tz), (day_end, _) = local_day(date_start), local_day(date_end)
+        offset = pd.tseries.frequencies.to_offset(self.chunk_freq)
+        # calendar days (naive), chunk bounds are the local midnights of their first and last days
+        starts = pd.date_range(start=offset.rollback(day_start), end=day_end, freq=offset)
+        return [(local_midnight(start, tz), local_midnight(start + offset - pd.Timedelta(days=1), tz)) for start in starts]
+
+    def get (self, date_start, date_end):
+        """
+        Hourly data of the days `[date_start, date_end]`
+        """
+        chunks = self.plan(date_start, date_end)
+        frames = {chunk:self._load(chunk) for chunk in chunks}
+        missing = [chunk for chunk, df in frames.items() if df is None]
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for chunk, df in zip(missing, executor.map(lambda c: self.fetch(*c), missing)):
+                    frames[chunk] = df
+                    self._save(chunk, df)
+        df = pd.concat([frames[chunk] for chunk in chunks], ignore_index=True)
+        (day_start, tz), (day_end, _) = local_day(date_start), local_day(date_end)
+        day_start, day_end = local_midnight(day_start, tz), local_midnight(day_end + pd.Timedelta(days=1), tz)
+        df = df[(df["date"] >= day_start) & (df["date"] < day_end)]
+        return df.drop_duplicates(subset="date").sort_values("date").reset_index(drop=True)
+
+    def _path_chunk (self, chunk):
+        return os.path.join(self.path, f"{chunk[0].strftime('%Y%m%d')}_{chunk[1].strftime('%Y%m%d')}.parquet")
+
+    def _load (self, chunk):
+        path = self._path_chunk(chunk)
+        if not os.path.exists(path):
+            return None
+        df = pd.read_parquet(path)
+        df["date"] = df["date"].dt.tz_convert(self.timezone)
+        return df
+
+    def _save (self, chunk, df:pd.DataFrame):
+        if chunk[1] >= local_midnight(*local_day(pd.Timestamp.now(tz=chunk[1].tz))) - pd.Timedelta(days=self.min_age_days):
+            return
+        os.makedirs(self.path, exist_ok=True)
+        write_atomic(self._path_chunk(chunk), lambda f: df.to_parquet(f, index=False))
@@ -1 +1,4 @@
-from DBBuilder.meteo.openmeteo import OpenMeteo
\ No newline at end of file
+from DBBuilder.meteo.provider import MeteoProvider, MeteoMerge
+from DBBuilder.meteo.openmeteo import OpenMeteo
+from DBBuilder.meteo.raingauge import RainGauge
+from DBBuilder.meteo.rainhistory import rain_history, add_rain_history
@@ -1,28 +1,53 @@
-import openmeteo_requests
-
-import requests_cache
 import pandas as pd
-from retry_requests import retry
 import numpy as np
 import datetime
-from dateutil import tz
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from DBBuilder.meteo.__fetchplanner import FetchPlanner
+from DBBuilder.meteo.provider import MeteoProvider
 
-class OpenMeteo ():
+class OpenMeteo (MeteoProvider):
 
-    cache_session = requests_cache.CachedSession('.cache', expire_after = -1)
-    retry_session = retry(cache_session, retries = 5, backoff_factor = 0.2)
-    openmeteo = openmeteo_requests.Client(session = retry_session)
+    cache_path = ".cache"
     url = "https://archive-api.open-meteo.com/v1/archive"
     hourly = ["temperature_2m", "relative_humidity_2m", "precipitation", 
               "rain", "cloud_cover", "et0_fao_evapotranspiration", 
               "soil_temperature_0_to_7cm", "soil_moisture_0_to_7cm"]
+    _clients = {}
+    _clients_lock = threading.Lock()
 
-    def __init__(self, latitude:float=48.886, longitude:float=2.333, timezone:str="UTC") -> None:
+    def __init__(self, latitude:float=48.886, longitude:float=2.333, timezone:str="UTC", store_dir:str=None, 
+                 chunk_freq:str="MS", max_workers:int=4, cache_path:str=None) -> None:
+        """
+        ## Params
+        store_dir: str
+            directory of the local chunk store (None to request the exact range each time)
+        chunk_freq: str
+            requests are aligned on chunks of this frequency (default calendar months)
+        max_workers: int
+            maximum number of concurrent chunk requests
+        cache_path: str
+            path of the HTTP cache (default `OpenMeteo.cache_path`)
+        """
         self.latitude = latitude
         self.longitude = longitude
-        self.timezone_str, self.timezone = timezone, tz.gettz(timezone)
+        self.cache_path = cache_path or self.cache_path
+        super().__init__(timezone=timezone)
+        self.planner = None
+        if store_dir:
+            key_params = {"url":self.url, "latitude":latitude, "longitude":longitude, "timezone":timezone, "hourly":self.hourly}
+            self.planner = FetchPlanner(fetch=self._request_api, store_dir=store_dir, key_params=key_params, timezone=self.timezone, 
+                                        chunk_freq=chunk_freq, max_workers=max_workers)
+
+    @property
+    def variables (self):
+        return self.hourly
 
     def get_meteo (self, date_start, date_end, format="%Y-%m-%d %H:%M:%S"):
+        if self.planner is not None:
+            return self.planner.get(date_start=self.read_date(date_start, format=format), 
+                                    date_end=self.read_date(date_end, format=format))
         return self._request_api(date_start=date_start, date_end=date_end, format=format)
 
     def _request_api (self, date_start, date_end, format="%Y-%m-%d %H:%M:%S"):
@@ -31,31 +56,99 @@ class OpenMeteo ():
         params = {
             "latitude": self.latitude,
             "longitude": self.longitude,
-            "start_date": date_start.strftime("%Y-%m%d 00:00:00"),
-            "end_date": date_end.strftime("%Y-%m%d 00:00:00"),
+            "start_date": date_start.strftime("%Y-%m-%d"),
+            "end_date": date_end.strftime("%Y-%m-%d"),
             "hourly": self.hourly,
             "timezone": self.timezone_str
         }
-        responses = self.openmeteo.weather_api(self.url, params=params)
-        response = responses[0]
+        responses = self.get_client(self.cache_path).weather_api(self.url, params=params)
+        return self._response_to_frame(responses[0])
+
+    def _response_to_frame (self, response):
+        """
+        Hourly data of an API response as a DataFrame
+        """
         hourly = response.Hourly()
         hourly_data = {"date": pd.date_range(
-            start = pd.to_datetime(hourly.Time(), unit = "s"),
-            end = pd.to_datetime(hourly.TimeEnd(), unit = "s"),
+            start = pd.to_datetime(hourly.Time(), unit = "s", utc = True),
+            end = pd.to_datetime(hourly.TimeEnd(), unit = "s", utc = True),
             freq = pd.Timedelta(seconds = hourly.Interval()),
-            inclusive = "left",
-            tz=self.timezone
-        )}
-        for i in range(len(params["hourly"])):
-            hourly_data[params["hourly"][i]] = hourly.Variables(i).ValuesAsNumpy()
+            inclusive = "left"
+        ).tz_convert(self.timezone)}
+        for i in range(len(self.hourly)):
+            hourly_data[self.hourly[i]] = hourly.Variables(i).ValuesAsNumpy()
         hourly_dataframe = pd.DataFrame(data = hourly_data)
         return hourly_dataframe
 
-    def read_date (self, date:any, format:str="%Y-%m-%d %H:%M:%S"):
-        if type(date)==str:
-            date = pd.to_datetime(date, format=format)
-        else:
-            date = pd.to_datetime(date)
-        if date.tzinfo != self.timezone:
-            date = date.replace(tzinfo=self.timezone)
-        return date
\ No newline at end of file
+    @classmethod
+    def get_client (cls, cache_path:str=None):
+        """
+        open-meteo client (HTTP cache and retries), created on first use 
+        and shared by all instances using the same cache path
+        """
+        cache_path = cache_path or cls.cache_path
+        with cls._clients_lock:
+            if cache_path not in cls._clients:
+                import openmeteo_requests
+                import requests_cache
+                from retry_requests import retry
+                cache_session = requests_cache.CachedSession(cache_path, expire_after = -1)
+                retry_session = retry(cache_session, retries = 5, backoff_factor = 0.2)
+                cls._clients[cache_path] = openmeteo_requests.Client(session = retry_session)
+            return cls._clients[cache_path]
+
+    @classmethod
+    def get_meteo_sites (cls, sites:dict, date_start, date_end, timezone:str="UTC", batch_size:int=50, max_workers:int=4, 
+                         retries:int=3, backoff:float=1.0, cache_path:str=None, format="%Y-%m-%d %H:%M:%S"):
+        """
+        Get meteo of several sites with one API call per batch of sites (the 
+        archive API accepts lists of coordinates).
+        ## Params
+        sites: dict
+            site name -> (latitude, longitude)
+        date_start, date_end: str | Timestamp
+            days range (inclusive)
+        batch_size: int
+            number of sites per request
+        max_workers: int
+            maximum number of concurrent batch requests
+        retries: int
+            number of attempts of a failed batch (on top of the HTTP retries of the session)
+        backoff: float
+            base waiting time (in seconds) between attempts, doubled at each attempt
+        cache_path: str
+            path of the HTTP cache (default `OpenMeteo.cache_path`)
+        ## Return
+        meteo: pd.DataFrame
+            hourly meteo in long format (one row per site and date)
+        """
+        reader = cls(timezone=timezone)
+        date_start, date_end = [reader.read_date(d, format=format).strftime("%Y-%m-%d") for d in [date_start, date_end]]
+        names = list(sites.keys())
+        batches = [names[i:i+batch_size] for i in range(0, len(names), batch_size)]
+        client = cls.get_client(cache_path)
+
+        def request_batch (batch):
+            params = {
+                "latitude": [sites[name][0] for name in batch],
+                "longitude": [sites[name][1] for name in batch],
+                "start_date": date_start,
+                "end_date": date_end,
+                "hourly": cls.hourly,
+                "timezone": timezone
+            }
+            for attempt in range(retries):
+                try:
+                    responses = client.weather_api(cls.url, params=params)
+                    break
+                except Exception:
+                    if attempt == retries - 1:
+                        raise
+                    time.sleep(backoff * 2**attempt)
+            return pd.concat([reader._response_to_frame(response).assign(site=name) for name, response in zip(batch, responses)], 
+                             ignore_index=True)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(request_batch, batches))
+        meteo = pd.concat(frames, ignore_index=True)
+        return meteo[["site"] + [c for c in meteo.columns if c != "site"]]
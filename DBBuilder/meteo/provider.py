@@ -0,0 +1,91 @@
+from DBBuilder.__datereader import DateReader
+from abc import ABC, abstractmethod
+import pandas as pd
+import numpy as np
+import warnings
+
+class MeteoProvider (DateReader, ABC):
+    """
+    Source of hourly meteo (expl: `OpenMeteo`, `RainGauge`, `MeteoMerge`).
+    Providers return a DataFrame with a tz-aware `date` column (one row per
+    hour of the days of the requested range) and one column per variable
+    of `variables`, NaN where the provider has no data.
+    """
+
+    variables:list = []
+
+    @abstractmethod
+    def get_meteo (self, date_start, date_end, format="%Y-%m-%d %H:%M:%S"):
+        """
+        Hourly meteo of the days from `date_start` to `date_end` (inclusive)
+        """
+
+    def hours (self, date_start, date_end, format="%Y-%m-%d %H:%M:%S"):
+        """
+        Hours of the days from `date_start` to `date_end` (inclusive)
+        """
+        day_start, day_end = [self.read_date(d, format=format).tz_localize(None).normalize() for d in [date_start, date_end]]
+        # local midnights (a day lasts 23 or 25 hours on DST changes)
+        start, end = [d.tz_localize(self.timezone, ambiguous=True, nonexistent="shift_forward")
+                      for d in [day_start, day_end + pd.Timedelta(days=1)]]
+        return pd.date_range(start, end, freq="h", inclusive="left")
+
+class MeteoMerge (MeteoProvider):
+    """
+    Merge of meteo providers by priority (expl: `[RainGauge(...), OpenMeteo(...)]`
+    to prefer local rain gauges and fall back to the API). Each value comes
+    from the first provider which has it, a provider is only requested for
+    the hours where wanted variables are still missing (no request when
+    preferred providers cover the range).
+    ## Params
+    providers: list
+        meteo providers, in order of priority
+    variables: list
+        variables to get (default all variables of providers)
+    timezone: str
+        timezone of dates
+    strict: bool
+        raise errors of fallback providers (else a warning is emitted and
+        their hours stay missing, expl: offline processing node)
+    add_source: bool
+        add a `<variable>_source` column (name of the provider class of
+        each value) for variables given by several providers
+    """
+
+    def __init__(self, providers:list, variables:list=None, timezone:str="UTC", strict:bool=False, add_source:bool=True) -> None:
+        super().__init__(timezone=timezone)
+        self.providers = providers
+        self.variables = variables if variables is not None else list(dict.fromkeys(v for p in providers for v in p.variables))
+        self.strict = strict
+        self.add_source = add_source
+
+    def get_meteo (self, date_start, date_end, format="%Y-%m-%d %H:%M:%S"):
+        hours = self.hours(date_start, date_end, format=format)
+        meteo = pd.DataFrame({"date":hours})
+        sources = {}
+        for i, provider in enumerate(self.providers):
+            wanted = [v for v in provider.variables if v in self.variables]
+            missing = meteo.reindex(columns=wanted).isna().any(axis=1).values if wanted else np.zeros(len(hours), dtype=bool)
+            if not missing.any():
+                continue
+            try:
+                start, end = [d.tz_convert(provider.timezone) for d in [hours[missing][0], hours[missing][-1]]]
+                data = provider.get_meteo(date_start=start, date_end=end)
+            except Exception as e:
+                if self.strict or i == 0:
+                    raise
+                warnings.warn(f"{type(provider).__name__} meteo not available ({e}), missing hours are kept")
+                continue
+            data = data.assign(date=data["date"].dt.tz_convert(self.timezone)).drop_duplicates("date").set_index("date")
+            data = data.reindex(hours)[wanted]
+            for v in wanted:
+                values = meteo[v].values if v in meteo else np.full(len(hours), np.nan)
+                fill = pd.isna(values) & data[v].notna().values
+                meteo[v] = np.where(fill, data[v].values, values)
+                sources.setdefault(v, np.full(len(hours), None, dtype=object))[fill] = type(provider).__name__
+        meteo = meteo.reindex(columns=["date"] + self.variables)
+        if self.add_source:
+            for v, source in sources.items():
+                if sum(v in p.variables for p in self.providers) > 1:
+                    meteo[f"{v}_source"] = pd.Categorical(source)
+        return meteo
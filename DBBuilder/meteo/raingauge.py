@@ -0,0 +1,114 @@
+from DBBuilder.__datereader import DateReader
+from DBBuilder.__fileutils import read_chunks
+from DBBuilder.meteo.provider import MeteoProvider
+import pandas as pd
+import numpy as np
+import glob
+
+class RainGauge (MeteoProvider):
+    """
+    Local rain gauge provider (expl: `data/bougival/meteo/pluies/pluviometre*.csv`).
+    Records (bucket tips or periodic amounts, at irregular dates) are read
+    once with typed columns and summed by hour (`rain` column). Hours between
+    the first and last record without record count as dry, except in gaps
+    longer than `max_gap` (gauge outage) and outside records, which are
+    missing (NaN, so `MeteoMerge` can fall back to another provider).
+    ## Params
+    files: list | str
+        list of csv paths or glob pattern (records of one gauge)
+    timezone: str
+        timezone of dates
+    col_date, col_rain: str
+        column names of record dates and rain amounts (mm)
+    format: str
+        date format (inferred if None)
+    source_timezone: str
+        timezone of naive dates of files (default `timezone`)
+    max_gap: str
+        longest period without record still counted as dry (None: no limit)
+    catalog: DataCatalog
+        catalog of raw data (files are read from their Parquet sidecars)
+    **read_csv_kargs:
+        other `pd.read_csv` parameters (default `encoding="latin-1"`, `sep=";"`)
+    """
+
+    variables:list = ["rain"]
+
+    def __init__(self, files, timezone:str="UTC", col_date:str="date", col_rain:str="rain", format:str=None,
+                 source_timezone:str=None, max_gap:str=None, catalog=None, chunksize:int=1_000_000, **read_csv_kargs) -> None:
+        super().__init__(timezone=timezone)
+        self.files = sorted(glob.glob(files, recursive=True)) if isinstance(files, str) else list(files)
+        self.col_date, self.col_rain = col_date, col_rain
+        self.format = format
+        self.source_timezone = source_timezone
+        self.max_gap = max_gap
+        self.catalog = catalog
+        self.chunksize = chunksize
+        self.read_csv_kargs = {"encoding":"latin-1", "sep":";", **read_csv_kargs}
+        self._hourly = None
+
+    def read_records (self):
+        """
+        Records of all files (`date`, `rain`), sorted by date. Records
+        repeated across files (overlapping exports) are kept once, as many
+        times as in the file where they are the most repeated (records
+        repeated in a single file are kept).
+        """
+        reader = DateReader(self.source_timezone) if self.source_timezone else self
+        decimal = self.read_csv_kargs.get("decimal", ".")
+        frames = []
+        for i, path in enumerate(self.files):
+            # raw files: dates kept as strings and parsed at once with `format` (sidecars are already typed)
+            path, dtype = (self.catalog.sidecar(path), None) if self.catalog is not None else (path, {self.col_date:str})
+            for chunk in read_chunks(path, columns=[self.col_date, self.col_rain], chunksize=self.chunksize, dtype=dtype, 
+                                     **self.read_csv_kargs):
+                rain = chunk[self.col_rain]
+                rain = rain.str.replace(decimal, ".", regex=False) if rain.dtype == object else rain
+                frames.append(pd.DataFrame({"file":i, "raw":chunk[self.col_date].values,
+                                            "date":self.read_dates(reader.read_dates(chunk[self.col_date], format=self.format)).values,
+                                            "rain":pd.to_numeric(rain, errors="coerce").values}))
+        if not frames:
+            return pd.DataFrame({"date":pd.Series(dtype=f"datetime64[ns, {self.timezone_str}]"), "rain":pd.Series(dtype=float)})
+        # duplicates on the raw dates (dates shifted out of the DST gap may collide), the
+        # n-th repeat of a record in a file is the same record as the n-th in another file
+        records = pd.concat(frames, ignore_index=True)
+        records["repeat"] = records.groupby(["file", "raw", "rain"], dropna=False).cumcount()
+        records = records.drop_duplicates(["raw", "rain", "repeat"]).drop(columns=["file", "raw", "repeat"]).dropna(subset=["date"])
+        return records.sort_values("date", kind="stable").reset_index(drop=True)
+
+    @property
+    def hourly (self):
+        """
+        Hourly rain totals over the records period (read once)
+        """
+        if self._hourly is None:
+            self._hourly = self.resample_hourly(self.read_records())
+        return self._hourly
+
+    def resample_hourly (self, records:pd.DataFrame):
+        """
+        Sum records by hour (one `bincount` over hour indexes), hours in gaps
+        longer than `max_gap` are missing
+        """
+        if len(records) == 0:
+            return pd.DataFrame({"date":records["date"], "rain":records["rain"]})
+        hour_ns = 3600 * 10**9
+        t = records["date"].values.view("i8")
+        first = self.floor_dates(records["date"].iloc[:1], "h").values.view("i8")[0]
+        idx = (t - first) // hour_ns
+        rain = np.bincount(idx, weights=np.nan_to_num(records["rain"].values), minlength=idx[-1] + 1)
+        if self.max_gap is not None:
+            # hours strictly between two records farther apart than max_gap
+            gaps = np.flatnonzero(np.diff(t) > pd.Timedelta(self.max_gap).value)
+            cover = np.zeros(len(rain) + 1, dtype=int)
+            np.add.at(cover, idx[gaps] + 1, 1)
+            np.add.at(cover, idx[gaps + 1], -1)
+            rain[np.cumsum(cover)[:-1] > 0] = np.nan
+        dates = pd.to_datetime(first + np.arange(len(rain)) * hour_ns, utc=True).tz_convert(self.timezone)
+        return pd.DataFrame({"date":dates, "rain":rain})
+
+    def get_meteo (self, date_start, date_end, format="%Y-%m-%d %H:%M:%S"):
+        hours = self.hours(date_start, date_end, format=format)
+        hourly = self.hourly
+        rain = hourly.set_index("date")["rain"].reindex(hours)
+        return pd.DataFrame({"date":hours, "rain":rain.values})
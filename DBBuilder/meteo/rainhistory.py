@@ -0,0 +1,66 @@
+import pandas as pd
+import numpy as np
+
+def rain_history (dates, rain, thresholds:list=[4.0], windows:list=["24h"]):
+    """
+    Rain history features of a sorted hourly series, in one pass per
+    threshold (`searchsorted` on rainy dates) and per window (cumulative
+    sums), O(n log n) overall.
+    ## Params
+    dates: pd.Series | DatetimeIndex
+        dates of rain values (sorted ascending)
+    rain: pd.Series | np.ndarray
+        rain amount of each date (NaN counted as 0)
+    thresholds: list
+        minimal amounts of a rain event
+    windows: list
+        rolling windows (pandas timedelta strings) of rain totals, a window
+        covers `(date - window, date]`
+    ## Return
+    features: pd.DataFrame
+        one row per date, for each threshold `thr`: `hours_since_rain_<thr>`
+        (hours since the last rain >= thr, NaN if none) and `last_rain_<thr>`
+        (its amount), for each window `w`: `rain_sum_<w>`
+    """
+    dates = pd.DatetimeIndex(dates)
+    t = dates.asi8
+    rain = np.nan_to_num(np.asarray(rain, dtype=float))
+    features = {}
+    for threshold in thresholds:
+        idx_rain = np.flatnonzero(rain >= threshold)
+        pos = np.searchsorted(t[idx_rain], t, side="right") - 1
+        found = pos >= 0
+        idx_last = idx_rain[np.where(found, pos, 0)] if len(idx_rain) else np.zeros(len(t), dtype=int)
+        features[f"hours_since_rain_{threshold:g}"] = np.where(found, (t - t[idx_last]) / 3.6e12, np.nan)
+        features[f"last_rain_{threshold:g}"] = np.where(found, rain[idx_last], np.nan)
+    cumsum = np.concatenate([[0.0], np.cumsum(rain)])
+    for window in windows:
+        start = np.searchsorted(t, t - pd.Timedelta(window).value, side="right")
+        features[f"rain_sum_{window}"] = cumsum[1:] - cumsum[start]
+    return pd.DataFrame(features)
+
+def add_rain_history (df:pd.DataFrame, thresholds:list=[4.0], windows:list=["24h"], col_rain:str="rain", col_date:str="date"):
+    """
+    Add rain history features (see `rain_history`) to an hourly meteo
+    dataframe (expl: output of `OpenMeteo.get_meteo`), replaces
+    `find_last_rain`.
+    ## Params
+    df: pd.DataFrame
+        hourly meteo
+    thresholds: list
+        minimal amounts of a rain event
+    windows: list
+        rolling windows of rain totals
+    col_rain: str
+        column name of rain values
+    col_date: str
+        column name of date values
+    ## Return
+    df: pd.DataFrame
+        meteo sorted by date with rain history columns
+    """
+    if not df[col_date].is_monotonic_increasing:
+        df = df.sort_values(col_date)
+    df = df.reset_index(drop=True)
+    features = rain_history(dates=df[col_date], rain=df[col_rain], thresholds=thresholds, windows=windows)
+    return pd.concat([df, features], axis=1)
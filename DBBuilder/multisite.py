@@ -0,0 +1,154 @@
+from DBBuilder.__datereader import DateReader
+from DBBuilder.__labelcounter import compact_uint_dtype
+from DBBuilder.dbbuilder import DBBuilder
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import pandas as pd
+
+def build_sites (builder:DBBuilder, method:str, tasks:list):
+    """
+    Run a build method of `builder` for several sites sharing its observer
+    (module level function so it can be sent to worker processes).
+    ## Return
+    builder: DBBuilder
+        builder with its in-memory caches filled
+    dbs: dict
+        acoustic db of each site
+    """
+    dbs = {site:getattr(builder, method)(**kargs) for site, kargs in tasks}
+    return builder, dbs
+
+class MultiSiteDBBuilder (DateReader):
+    """
+    Build acoustic databases for several sites (expl: hydrophones of a
+    deployment) into one combined db with a `site` column. Sites sharing an
+    observer (latitude, longitude, elevation, timezone) share one `DBBuilder`,
+    so ephemeris and meteo are computed once for them. Observers are built in
+    parallel, persistent caches (`cache_dir`, `meteo_store_dir`) are keyed by
+    observer so they are shared across sites and runs.
+    ## Params
+    sites: dict
+        site registry, name -> {"latitude", "longitude", "elevation", "timezone"}
+    timezone: str
+        timezone of dates in the combined db
+    timefreq: str
+        time frequency of aggregation
+    workers: int
+        number of worker processes (default: number of cpus, 1 to run in the current process)
+    **kargs:
+        other `DBBuilder` parameters (expl: `cache_dir`, `add_meteo`, `meteo_store_dir`)
+    """
+
+    def __init__(self, sites:dict, timezone:str="UTC", timefreq="h", workers:int=None, **kargs) -> None:
+        super().__init__(timezone=timezone)
+        self.sites = {name:dict(site) for name, site in sites.items()}
+        self.timefreq = timefreq
+        self.workers = workers
+        self.kargs = kargs
+        self.builders = {}
+
+    def observer_key (self, site:str):
+        """
+        Observer of a site (sites with the same key share their builder)
+        """
+        params = self.sites[site]
+        return (params["latitude"], params["longitude"], params.get("elevation", 0), params.get("timezone", "UTC"))
+
+    def get_builder (self, site:str):
+        """
+        `DBBuilder` of a site (one per observer)
+        """
+        key = self.observer_key(site)
+        if key not in self.builders:
+            latitude, longitude, elevation, timezone = key
+            self.builders[key] = DBBuilder(latitude=latitude, longitude=longitude, elevation=elevation, timezone=timezone,
+                                           timefreq=self.timefreq, **self.kargs)
+        return self.builders[key]
+
+    def create_acoustic_db (self, df:pd.DataFrame, col_site:str="site", col_date:str="date", col_label:str="label",
+                            format:str="%Y-%m-%d %H:%M:%S"):
+        """
+        Create the combined acoustic db from detections tagged with a site
+        ## Params
+        df: pd.DataFrame
+            detections with site, date and label columns
+        ## Return
+        db: pd.DataFrame
+            combined acoustic db (one `DBBuilder.create_acoustic_db` per site)
+        """
+        tasks = {site:{"dates":detections[col_date].values, "labels":detections[col_label].values, "format":format}
+                 for site, detections in df.groupby(col_site, sort=True)}
+        return self.run(method="create_acoustic_db", tasks=tasks)
+
+    def create_acoustic_db_from_files (self, files:dict, col_date:str="date", col_label:str="label",
+                                       chunksize:int=1_000_000, format:str="%Y-%m-%d %H:%M:%S", **read_csv_kargs):
+        """
+        Create the combined acoustic db from the detection files of each site
+        ## Params
+        files: dict
+            site -> list of csv paths or glob pattern
+        """
+        # files of a site are read in parallel unless observers already run in worker processes
+        n_observers = len({self.observer_key(site) for site in files if site in self.sites})
+        file_workers = 1 if self.parallel_observers(n_observers) else self.workers
+        tasks = {site:dict(files=site_files, workers=file_workers, col_date=col_date, col_label=col_label,
+                           chunksize=chunksize, format=format, **read_csv_kargs) for site, site_files in files.items()}
+        return self.run(method="create_acoustic_db_from_files", tasks=tasks)
+
+    def parallel_observers (self, n_observers:int):
+        """
+        Whether observers are built in worker processes (more than one observer and `workers != 1`)
+        """
+        return self.workers != 1 and n_observers > 1
+
+    def run (self, method:str, tasks:dict):
+        """
+        Run a `DBBuilder` build method per site (grouped by observer, observers
+        in parallel) and combine the results.
+        ## Params
+        method: str
+            name of the `DBBuilder` method
+        tasks: dict
+            site -> method parameters
+        """
+        unknown = set(tasks) - set(self.sites)
+        if unknown:
+            raise KeyError(f"Unknown sites: {sorted(unknown)}")
+        groups = {}
+        for site in sorted(tasks):
+            groups.setdefault(self.observer_key(site), []).append((site, tasks[site]))
+        dbs = {}
+        with (ProcessPoolExecutor(max_workers=self.workers) if self.parallel_observers(len(groups)) else nullcontext()) as executor:
+            args = [[self.get_builder(group[0][0]) for group in groups.values()], [method]*len(groups), list(groups.values())]
+            results = executor.map(build_sites, *args) if executor else map(build_sites, *args)
+            for key, (builder, site_dbs) in zip(groups, results):
+                self.builders[key] = builder
+                dbs.update(site_dbs)
+        return self.combine(dbs)
+
+    def combine (self, dbs:dict):
+        """
+        Concatenate site dbs. Dates are converted to the builder timezone,
+        except `suncycle_day_` which is kept as the (naive) local day of the
+        site. Labels missing from a site are counted as 0.
+        """
+        frames = []
+        for site in sorted(dbs):
+            db = dbs[site].copy()
+            for col in db.columns:
+                if col == "suncycle_day_":
+                    db[col] = db[col].dt.tz_localize(None)
+                elif isinstance(db[col].dtype, pd.DatetimeTZDtype):
+                    db[col] = db[col].dt.tz_convert(self.timezone)
+            db.insert(0, "site", site)
+            frames.append(db)
+        if not frames:
+            return pd.DataFrame(columns=["site"])
+        db = pd.concat(frames, ignore_index=True)
+        label_cols = sorted(c for c in db.columns if c.startswith("label_"))
+        db[label_cols] = db[label_cols].fillna(0)
+        db = db.astype({col:compact_uint_dtype(db[col].max()) for col in label_cols})
+        other_cols = [c for c in db.columns if c not in label_cols and c not in ["site", "date_", "suncycle_type_", "suncycle_day_"]]
+        db = db[["site", "date_", "suncycle_type_", "suncycle_day_"] + label_cols + other_cols]
+        db["site"] = db["site"].astype("category")
+        return db
@@ -0,0 +1,2 @@
+from DBBuilder.storage.acousticstore import AcousticStore
+from DBBuilder.storage.datacatalog import DataCatalog
@@ -0,0 +1,118 @@
+from DBBuilder.__datereader import DateReader
+from DBBuilder.__labelcounter import compact_uint_dtype
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pandas as pd
+import os
+
+class AcousticStore (DateReader):
+    """
+    Parquet storage of acoustic dbs partitioned by site, year and month
+    (hive layout `<root>/<table>/site=<site>/year=<year>/month=<month>/`).
+    Reads push date range, suncycle type and label filters down to pyarrow,
+    so only matching partitions, row groups and columns are read.
+    ## Params
+    root: str
+        root directory of the store
+    timezone: str
+        timezone of dates (used for year/month partitions and reading)
+    max_rows_per_group: int
+        maximum number of rows of a parquet row group
+    """
+
+    tables:dict={
+        "db":{"date":"date_", "suncycle_type":"suncycle_type_", "label":"label_{}_sum"},
+        "labels_count":{"date":"date", "suncycle_type":"suncycle_type", "label":"label_{}"}
+    }
+    partitioning = pa.schema([("site", pa.string()), ("year", pa.int32()), ("month", pa.int32())])
+
+    def __init__(self, root:str, timezone:str="UTC", max_rows_per_group:int=100_000) -> None:
+        super().__init__(timezone=timezone)
+        self.root = root
+        self.max_rows_per_group = max_rows_per_group
+
+    def write (self, df:pd.DataFrame, site:str="bougival", table:str="db"):
+        """
+        Write a db (output of `DBBuilder.create_acoustic_db`) or a minute level
+        labels count table. Partitions (site, year, month) present in `df` are
+        replaced, others are kept.
+        """
+        col_date = self.tables[table]["date"]
+        df = df.sort_values(col_date, kind="stable")
+        dates = self.read_dates(df[col_date])
+        df = df.assign(**{col_date:dates, "site":site, "year":dates.dt.year.astype("int32"), "month":dates.dt.month.astype("int32")})
+        col_type = self.tables[table]["suncycle_type"]
+        if col_type in df.columns:
+            df[col_type] = df[col_type].astype("category")
+        ds.write_dataset(pa.Table.from_pandas(df, preserve_index=False), base_dir=os.path.join(self.root, table), format="parquet",
+                         partitioning=ds.partitioning(self.partitioning, flavor="hive"), existing_data_behavior="delete_matching",
+                         basename_template="part-{i}.parquet", max_rows_per_group=self.max_rows_per_group, 
+                         min_rows_per_group=min(self.max_rows_per_group, len(df)) or None)
+
+    def read (self, site:str=None, start=None, end=None, suncycle_types:list=None, labels:list=None, table:str="db", 
+              format:str="%Y-%m-%d %H:%M:%S"):
+        """
+        Read a db with filters pushed down to the parquet scan
+        ## Params
+        site: str
+            site to read (all sites if None)
+        start, end: str | Timestamp
+            date range `[start, end)` (open ended if None)
+        suncycle_types: list
+            suncycle types to read (expl: `["setting"]`)
+        labels: list
+            labels to read (expl: `["fish"]`, all label columns if None)
+        table: str
+            `"db"` or `"labels_count"`
+        ## Return
+        df: pd.DataFrame
+        """
+        infos = self.tables[table]
+        dataset = self.dataset(table)
+        filters = []
+        if site is not None:
+            filters.append(ds.field("site") == site)
+        date_type = dataset.schema.field(infos["date"]).type
+        for date, is_start in [(start, True), (end, False)]:
+            if date is None:
+                continue
+            date = self.read_date(date, format=format)
+            scalar = pa.scalar(date.tz_convert("UTC").to_pydatetime(), type=pa.timestamp("us", tz="UTC")).cast(date_type)
+            ym, field_ym = date.year*12 + date.month, ds.field("year")*12 + ds.field("month")
+            filters += [field_ym >= ym, ds.field(infos["date"]) >= scalar] if is_start else [field_ym <= ym, ds.field(infos["date"]) < scalar]
+        if suncycle_types is not None:
+            filters.append(ds.field(infos["suncycle_type"]).isin(list(suncycle_types)))
+        columns = None
+        if labels is not None:
+            label_cols = [infos["label"].format(label) for label in labels]
+            columns = [c for c in dataset.schema.names if not c.startswith("label_") or c in label_cols]
+        expression = None
+        for f in filters:
+            expression = f if expression is None else expression & f
+        df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.DatetimeTZDtype):
+                df[col] = df[col].dt.tz_convert(self.timezone)
+        # labels missing from a site are counted as 0, counts compacted on the values read
+        label_cols = [c for c in df.columns if c.startswith("label_")]
+        if label_cols:
+            df[label_cols] = df[label_cols].fillna(0)
+            df = df.astype({col:compact_uint_dtype(df[col].max() if len(df) else 0) for col in label_cols})
+            others = [c for c in df.columns if c not in label_cols]
+            first = df.columns.get_loc(label_cols[0])
+            df = df[others[:first] + sorted(label_cols) + others[first:]]
+        return df.drop(columns=["year", "month"]).sort_values(infos["date"], kind="stable").reset_index(drop=True)
+
+    def dataset (self, table:str="db"):
+        """
+        Dataset of a table with the schema unified over its files (sites are
+        written with their own label columns and compact count dtypes, counts
+        are read with the widest dtype)
+        """
+        path, partitioning = os.path.join(self.root, table), ds.partitioning(self.partitioning, flavor="hive")
+        dataset = ds.dataset(path, format="parquet", partitioning=partitioning)
+        schemas = [fragment.physical_schema for fragment in dataset.get_fragments()]
+        if len(schemas) <= 1:
+            return dataset
+        schema = pa.unify_schemas(schemas + [self.partitioning], promote_options="permissive")
+        return ds.dataset(path, format="parquet", partitioning=partitioning, schema=schema)
@@ -0,0 +1,233 @@
+from DBBuilder.__fileutils import write_atomic, read_chunks
+from fnmatch import fnmatchcase
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pandas as pd
+import hashlib
+import glob
+import json
+import os
+
+def file_hash (path:str, block_size:int=2**20):
+    """
+    Content hash of a file (blake2b, read by blocks)
+    """
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def match_path (key:str, pattern:str):
+    """
+    Match a `/` separated path with a glob pattern segment by segment (`*`,
+    `?` and `[...]` do not cross `/`, `**` matches any number of segments)
+    """
+    return _match_segments(key.split("/"), pattern.split("/"))
+
+def _match_segments (parts:list, patterns:list):
+    if not patterns:
+        return not parts
+    if patterns[0] == "**":
+        return any(_match_segments(parts[i:], patterns[1:]) for i in range(len(parts) + 1))
+    return bool(parts) and fnmatchcase(parts[0], patterns[0]) and _match_segments(parts[1:], patterns[1:])
+
+def write_sidecar (task:dict):
+    """
+    Convert a source to its Parquet sidecar (task of `DataCatalog.sidecar_task`).
+    Module level to be run in worker processes, the manifest is updated by
+    the catalog (`DataCatalog.commit_sidecars`).
+    """
+    os.makedirs(os.path.dirname(task["sidecar"]), exist_ok=True)
+    write_atomic(task["sidecar"], lambda f: _convert(task["source"], f, task["read_options"], task["chunksize"]))
+    return task["sidecar"]
+
+def _convert (path:str, f, options:dict, chunksize:int=1_000_000):
+    """
+    Convert a source to Parquet by chunks (schema of the first chunk,
+    columns without value in it are typed as strings)
+    """
+    writer, schema = None, None
+    try:
+        for chunk in read_chunks(path, chunksize=chunksize, **options):
+            chunk = chunk.apply(lambda col: col.where(col.isna(), col.astype(str))
+                                if col.dtype == object and pd.api.types.infer_dtype(col, skipna=True) not in ["string", "empty"] else col)
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema])
+                writer = pq.ParquetWriter(f, schema)
+            try:
+                table = table.cast(schema)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                raise ValueError(f"Column types of {path} change between chunks, set `dtype` in its read options") from e
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError(f"No data in {path}")
+
+class DataCatalog ():
+    """
+    Catalog of the raw data files of a directory (expl: `./data`). The
+    manifest (`<catalog_dir>/manifest.json`) records path, size, mtime and
+    content hash of each source, and read options by path pattern (expl:
+    `encoding="latin-1", sep=";"` for rain gauge exports). The first read
+    of a source converts it to a typed Parquet sidecar, later reads are
+    served from the sidecar until the source changes (size or mtime change
+    with a new content hash) or its read options change.
+    ## Params
+    root: str
+        directory of raw data
+    catalog_dir: str
+        directory of the manifest and sidecars (default `<root>/.catalog`)
+    patterns: list
+        glob patterns (relative to root) of sources
+    chunksize: int
+        number of rows converted at once (csv sources)
+    """
+
+    def __init__(self, root:str="./data", catalog_dir:str=None, patterns:list=["**/*.csv", "**/*.xlsx", "**/*.xls"],
+                 chunksize:int=1_000_000) -> None:
+        self.root = root
+        self.catalog_dir = catalog_dir or os.path.join(root, ".catalog")
+        self.patterns = patterns
+        self.chunksize = chunksize
+        self.sources, self.read_options = {}, {}
+        self.load()
+
+    @property
+    def path_manifest (self):
+        return os.path.join(self.catalog_dir, "manifest.json")
+
+    def load (self):
+        if os.path.exists(self.path_manifest):
+            with open(self.path_manifest) as f:
+                manifest = json.load(f)
+            self.sources, self.read_options = manifest["sources"], manifest["read_options"]
+        return self
+
+    def save (self):
+        os.makedirs(self.catalog_dir, exist_ok=True)
+        manifest = {"sources":self.sources, "read_options":self.read_options}
+        write_atomic(self.path_manifest, lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+        return self
+
+    def key (self, path:str):
+        """
+        Key of a source in the manifest (path relative to root, absolute path if outside)
+        """
+        path = os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+        return os.path.abspath(os.path.join(self.root, path)) if path.startswith("..") else path.replace(os.sep, "/")
+
+    def path (self, key:str):
+        return key if os.path.isabs(key) else os.path.join(self.root, key)
+
+    def scan (self):
+        """
+        Register sources of root (new and changed files are hashed, removed
+        files and their sidecars are dropped)
+        """
+        paths = sorted(set(path for pattern in self.patterns for path in glob.glob(os.path.join(self.root, pattern), recursive=True)
+                           if not os.path.abspath(path).startswith(os.path.abspath(self.catalog_dir))))
+        keys = [self.key(path) for path in paths]
+        for key in set(self.sources) - set(keys):
+            self._remove_sidecar(self.sources.pop(key))
+        for key in keys:
+            self._stat(key)
+        return self.save()
+
+    def glob (self, pattern:str):
+        """
+        Paths of registered sources matching a glob pattern (relative to root,
+        see `match_path`)
+        """
+        return [self.path(key) for key in sorted(self.sources) if match_path(key, pattern)]
+
+    def set_read_options (self, pattern:str, **options):
+        """
+        Read options (`pd.read_csv` / `pd.read_excel` parameters) of sources
+        matching a pattern relative to root (later patterns override earlier
+        ones). Sidecars of these sources are converted again on next read.
+        """
+        self.read_options[pattern] = json.loads(json.dumps(options))
+        return self.save()
+
+    def get_read_options (self, key:str):
+        options = {}
+        for pattern, pattern_options in self.read_options.items():
+            if match_path(key, pattern):
+                options.update(pattern_options)
+        return options
+
+    def to_frame (self):
+        """
+        Registered sources (one row per source)
+        """
+        return pd.DataFrame.from_dict(self.sources, orient="index").rename_axis("path").reset_index()
+
+    def sidecar (self, path:str):
+        """
+        Path of the up to date Parquet sidecar of a source (converted if needed)
+        """
+        task = self.sidecar_task(path)
+        if task["convert"]:
+            write_sidecar(task)
+            self.commit_sidecars([task])
+        return task["sidecar"]
+
+    def sidecar_task (self, path:str):
+        """
+        Sidecar of a source and whether it must be converted (expl: to convert
+        sources in worker processes with `write_sidecar`, then record them
+        with `commit_sidecars`)
+        ## Return
+        task: dict
+            `key`, `source` path, `sidecar` path, `read_options`, `chunksize`
+            and `convert` (sidecar missing or out of date)
+        """
+        key = self.key(path)
+        entry, changed = self._stat(key)
+        options = self.get_read_options(key)
+        path_sidecar = os.path.join(self.catalog_dir, "sidecars", f"{hashlib.blake2b(key.encode(), digest_size=10).hexdigest()}.parquet")
+        convert = changed or entry.get("sidecar") is None or entry.get("read_options") != options or not os.path.exists(path_sidecar)
+        return {"key":key, "source":self.path(key), "sidecar":path_sidecar, "read_options":options, "chunksize":self.chunksize,
+                "convert":convert}
+
+    def commit_sidecars (self, tasks:list):
+        """
+        Record converted sidecars in the manifest (saved once)
+        """
+        tasks = [task for task in tasks if task["convert"]]
+        for task in tasks:
+            self.sources[task["key"]].update(read_options=task["read_options"], 
+                                             sidecar=os.path.relpath(task["sidecar"], self.catalog_dir))
+        if tasks:
+            self.save()
+        return self
+
+    def read (self, path:str, columns:list=None):
+        """
+        Read a source (from its sidecar)
+        """
+        return pd.read_parquet(self.sidecar(path), columns=columns)
+
+    def _stat (self, key:str):
+        """
+        Update the manifest entry of a source, the content is hashed only if
+        size or mtime changed. Returns the entry and if the content changed.
+        """
+        stat = os.stat(self.path(key))
+        entry = self.sources.setdefault(key, {})
+        if entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime_ns:
+            return entry, False
+        content_hash = file_hash(self.path(key))
+        changed = entry.get("hash") != content_hash
+        entry.update(size=stat.st_size, mtime=stat.st_mtime_ns, hash=content_hash)
+        if changed:
+            entry.pop("sidecar", None)
+        return entry, changed
+
+    def _remove_sidecar (self, entry:dict):
+        if entry.get("sidecar") and os.path.exists(os.path.join(self.catalog_dir, entry["sidecar"])):
+            os.remove(os.path.join(self.catalog_dir, entry["sidecar"]))
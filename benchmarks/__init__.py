@@ -0,0 +1 @@
+from benchmarks.generators import generate_detections, write_detections_csv
@@ -0,0 +1,30 @@
+"""
+Compare two benchmark results (JSON written by `benchmarks.run`)
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+def load (path:str):
+    with open(path) as f:
+        data = json.load(f)
+    key = lambda r: (r["benchmark"], str(r.get("span", r.get("n_days"))))
+    return data["environment"], {key(r):r for r in data["results"]}
+
+def main (argv=None):
+    parser = argparse.ArgumentParser(description="Compare DBBuilder benchmark results")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args(argv)
+    (env_before, before), (env_after, after) = load(args.before), load(args.after)
+    print(f"before: {env_before.get('commit')}  after: {env_after.get('commit')}")
+    for key in [k for k in before if k in after]:
+        b, a = before[key], after[key]
+        line = f"{key[0]:35s} {key[1]:>6s} {b['time_s']:10.4f} s -> {a['time_s']:10.4f} s ({a['time_s'] / b['time_s']:5.2f}x)"
+        if b.get("peak_mb") and a.get("peak_mb"):
+            line += f"  {b['peak_mb']:8.1f} MB -> {a['peak_mb']:8.1f} MB"
+        print(line)
+
+if __name__ == "__main__":
+    main()
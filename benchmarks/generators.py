@@ -0,0 +1,56 @@
+import pandas as pd
+import numpy as np
+
+def generate_detections (span:str="1D", rate:float=120.0, n_labels:int=5, start:str="2023-01-01", 
+                         format:str="%Y-%m-%d %H:%M:%S", seed:int=0):
+    """
+    Synthetic YOLO-style detection report: detections follow a Poisson 
+    process with a daily cycle (more detections at night), labels follow a 
+    Zipf-like distribution (a few frequent labels, a tail of rare ones).
+    ## Params
+    span: str
+        time span of the report (pandas timedelta, expl: "1D", "365D", "1825D")
+    rate: float
+        mean number of detections per hour
+    n_labels: int
+        number of distinct labels
+    start: str
+        first day of the report
+    format: str
+        date format of the `date` column (None to keep timestamps)
+    seed: int
+        random seed
+    ## Return
+    df: pd.DataFrame
+        detections sorted by date with `date`, `label` and `confidence` columns
+    """
+    rng = np.random.default_rng(seed)
+    span_s = int(pd.Timedelta(span).total_seconds())
+    n = rng.poisson(rate * span_s / 3600)
+    # daily cycle: accept with probability depending on the hour of day
+    seconds = rng.integers(0, span_s, size=int(n * 1.5))
+    accept = rng.random(len(seconds)) < 0.5 + 0.5 * np.cos(2 * np.pi * (seconds % 86400) / 86400) ** 2
+    seconds = np.sort(seconds[accept][:n])
+    weights = 1 / np.arange(1, n_labels + 1)
+    labels = np.array([f"label{i}" for i in range(n_labels)])[rng.choice(n_labels, size=len(seconds), p=weights / weights.sum())]
+    dates = pd.Timestamp(start) + pd.to_timedelta(seconds, unit="s")
+    return pd.DataFrame({
+        "date":dates.strftime(format) if format else dates,
+        "label":labels,
+        "confidence":rng.uniform(0.25, 1.0, size=len(seconds)).round(3)
+    })
+
+def write_detections_csv (path:str, n_files:int=1, **kargs):
+    """
+    Write a synthetic report split into `n_files` csv files (expl: one YOLO 
+    report per recording), `kargs` are passed to `generate_detections`
+    ## Return
+    paths: list
+        paths of written files
+    """
+    df = generate_detections(**kargs)
+    paths = []
+    for i, part in enumerate(np.array_split(np.arange(len(df)), n_files)):
+        paths.append(f"{path}_{i}.csv" if n_files > 1 else f"{path}.csv")
+        df.iloc[part].to_csv(paths[-1], index=False)
+    return paths
@@ -0,0 +1,162 @@
+"""
+Benchmarks of the DBBuilder pipeline on synthetic detections. Each stage
+of `create_acoustic_db` is timed (best of `repeat` runs) and memory
+profiled (peak of traced allocations, separate run) on its own, results
+are written as JSON to compare runs across commits (`benchmarks.compare`),
+by default in the temporary directory (out of the source tree).
+
+    python -m benchmarks.run --spans 1D 30D 365D 1825D --rate 120 --output /tmp/bench.json
+"""
+from benchmarks.generators import generate_detections
+from DBBuilder import DBBuilder
+from DBBuilder.astral import Sun
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+def measure (funct, setup=None, repeat:int=3, memory:bool=True):
+    """
+    Time `funct(*setup())` (setup is not timed) and measure its peak memory
+    ## Return
+    result: dict
+        `time_s` (best run), `times_s` (all runs) and `peak_mb` (None if not measured)
+    """
+    setup = setup or (lambda: ())
+    times = []
+    for _ in range(repeat):
+        args = setup()
+        t0 = time.perf_counter()
+        funct(*args)
+        times.append(time.perf_counter() - t0)
+    peak = None
+    if memory:
+        args = setup()
+        tracemalloc.start()
+        funct(*args)
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return {"time_s":min(times), "times_s":times, "peak_mb":peak}
+
+def bench_pipeline (span:str, rate:float=120.0, n_labels:int=5, timezone:str="Europe/Paris", repeat:int=3, memory:bool=True, **kargs):
+    """
+    Benchmark each stage of `DBBuilder.create_acoustic_db` (astral stages
+    run on a new builder, so with a cold day cache)
+    """
+    detections = generate_detections(span=span, rate=rate, n_labels=n_labels)
+    dates, labels = detections["date"].values, detections["label"].values
+    new_builder = lambda: DBBuilder(timezone=timezone, **kargs)
+    builder = new_builder()
+    labels_count = builder.count_labels_occurence(dates=dates, labels=labels, timefreq=builder.timefreq_to_count_occ)
+    df_sun = builder.sun.get_infos_batch(labels_count.date)
+    df_moon = builder.moon.get_infos_batch(labels_count.date)
+    df = pd.concat([labels_count, df_sun.drop(columns="date"), df_moon.drop(columns="date")], axis=1)
+    stages = {
+        "count_labels_occurence":(lambda b: b.count_labels_occurence(dates=dates, labels=labels, timefreq=b.timefreq_to_count_occ),
+                                  len(detections), len(labels_count)),
+        "sun_infos":(lambda b: b.sun.get_infos_batch(labels_count.date), len(labels_count), len(df_sun)),
+        "moon_infos":(lambda b: b.moon.get_infos_batch(labels_count.date), len(labels_count), len(df_moon)),
+        "solar_angles":(lambda b: b.sun.get_solar_angles(labels_count.date), len(labels_count), len(labels_count)),
+        "agregate_count_by":(lambda b: b.agregate_count_by(df=df, timefreq=b.timefreq), len(df), None),
+        "create_acoustic_db":(lambda b: b.create_acoustic_db(dates=dates, labels=labels), len(detections), None),
+        "create_acoustic_db_events":(lambda b: b.create_acoustic_db_from_raw_counts(
+                                         b.make_label_counter(timefreq=b.timefreq_to_count_occ).update(dates=dates, labels=labels).get_raw_counts()),
+                                     len(detections), None),
+    }
+    results = []
+    for stage, (funct, rows_in, rows_out) in stages.items():
+        result = measure(funct, setup=lambda: (new_builder(),), repeat=repeat, memory=memory)
+        rows_out = rows_out if rows_out is not None else len(funct(new_builder()))
+        results.append({"benchmark":f"pipeline.{stage}", "span":span, "rate":rate, "n_labels":n_labels,
+                        "rows_in":rows_in, "rows_out":rows_out, **result})
+    return results
+
+def bench_day_infos (n_days:int=365, timezone:str="Europe/Paris", repeat:int=3, **kargs):
+    """
+    Micro benchmarks of `BaseAstral.get_day_infos` (per call) on cache misses
+    (new `Sun`) and hits (days already computed), and of the batch lookup
+    `get_days_infos`
+    """
+    dates = list(pd.date_range("2023-01-01 12:00", periods=n_days, freq="D", tz=timezone))
+    days = pd.DatetimeIndex(dates).floor("d")
+    def get_each (sun):
+        for date in dates:
+            sun.get_day_infos(date)
+    def warm_sun ():
+        sun = Sun(timezone=timezone, **kargs)
+        get_each(sun)
+        return (sun,)
+    results = []
+    for name, funct, setup in [("get_day_infos.miss", get_each, lambda: (Sun(timezone=timezone, **kargs),)),
+                               ("get_day_infos.hit", get_each, warm_sun),
+                               ("get_days_infos.miss", lambda sun: sun.get_days_infos(days), lambda: (Sun(timezone=timezone, **kargs),)),
+                               ("get_days_infos.hit", lambda sun: sun.get_days_infos(days), warm_sun)]:
+        result = measure(funct, setup=setup, repeat=repeat, memory=False)
+        results.append({"benchmark":f"astral.{name}", "n_days":n_days, "us_per_day":result["time_s"] / n_days * 1e6, **result})
+    return results
+
+def bench_import (module:str="DBBuilder", repeat:int=3, lazy_modules:list=["openmeteo_requests", "requests_cache", "retry_requests", "IPython"]):
+    """
+    Import time of `module` in a new interpreter (what short-lived worker
+    processes pay), and heavy optional modules loaded by the import
+    """
+    code = f"import sys, time; t0 = time.perf_counter(); import {module}; print(time.perf_counter() - t0); " \
+           f"print(','.join(m for m in {lazy_modules!r} if m in sys.modules))"
+    times, loaded = [], []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split("\n")
+        times.append(float(out[0]))
+        loaded = [m for m in out[1].split(",") if m]
+    return [{"benchmark":f"import.{module}", "time_s":min(times), "times_s":times, "peak_mb":None, "loaded":loaded}]
+
+def environment ():
+    """
+    Description of the run (commit, versions, machine)
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit":commit, "date":datetime.datetime.now().isoformat(timespec="seconds"), "python":platform.python_version(),
+            "numpy":np.__version__, "pandas":pd.__version__, "machine":platform.machine(), "processor":platform.processor()}
+
+def main (argv=None):
+    parser = argparse.ArgumentParser(description="DBBuilder benchmarks")
+    parser.add_argument("--spans", nargs="+", default=["1D", "30D", "365D"], help="spans of synthetic reports (up to 1825D)")
+    parser.add_argument("--rate", type=float, default=120.0, help="detections per hour")
+    parser.add_argument("--n-labels", type=int, default=5, help="number of labels")
+    parser.add_argument("--n-days", type=int, default=365, help="days of get_day_infos micro benchmarks")
+    parser.add_argument("--timezone", default="Europe/Paris")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip memory profiling")
+    parser.add_argument("--output", default=os.path.join(tempfile.gettempdir(), "dbbuilder_bench.json"),
+                        help="path of the JSON results")
+    parser.add_argument("--import-budget", type=float, default=None, help="fail if importing DBBuilder takes longer (seconds)")
+    args = parser.parse_args(argv)
+    results = bench_import(repeat=args.repeat)
+    for span in args.spans:
+        results += bench_pipeline(span=span, rate=args.rate, n_labels=args.n_labels, timezone=args.timezone,
+                                  repeat=args.repeat, memory=not args.no_memory)
+    results += bench_day_infos(n_days=args.n_days, timezone=args.timezone, repeat=args.repeat)
+    for result in results:
+        key = result.get("span", result.get("n_days", ""))
+        peak = f"{result['peak_mb']:9.1f} MB" if result.get("peak_mb") is not None else ""
+        print(f"{result['benchmark']:35s} {key!s:>6s} {result['time_s']:10.4f} s {peak}")
+    with open(args.output, "w") as f:
+        json.dump({"environment":environment(), "results":results}, f, indent=1)
+    print(f"results written to {args.output}")
+    if args.import_budget is not None and (results[0]["time_s"] > args.import_budget or results[0]["loaded"]):
+        sys.exit(f"import budget exceeded: {results[0]['time_s']:.3f} s (budget {args.import_budget} s), "
+                 f"eagerly loaded: {results[0]['loaded']}")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 from DBBuilder import DBBuilder
-import glob
-import pandas as pd
+from DBBuilder.storage import AcousticStore, DataCatalog
 
-dbbuilder = DBBuilder()
-files = glob.glob("./data/bougival/acoustique/acoustique SENSEA/yolo/*.csv", recursive=True)
-df = pd.read_csv(files[0])
-db = dbbuilder.create_acoustic_db(dates=df.date, labels=df.label)
+if __name__ == "__main__":
+    catalog = DataCatalog(root="./data").scan()
+    catalog.set_read_options("bougival/meteo/pluies/pluviometre*.csv", encoding="latin-1", sep=";")
+    catalog.set_read_options("bougival/meteo/pluies/pluvioSIAPP*.csv", sep=";")
+    catalog.set_read_options("bougival/meteo/pluies/openmeteo*.csv", sep=";")
+    dbbuilder = DBBuilder(catalog=catalog)
+    files = catalog.glob("bougival/acoustique/acoustique SENSEA/yolo/*.csv")
+    db = dbbuilder.create_acoustic_db_from_files(files)
+    AcousticStore(root="./data/db", timezone=dbbuilder.timezone_str).write(db, site="bougival")
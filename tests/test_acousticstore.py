@@ -0,0 +1,46 @@
+"""
+Partitioned Parquet store of acoustic dbs (`AcousticStore`)
+"""
+from DBBuilder import DBBuilder
+from DBBuilder.storage import AcousticStore
+import pandas as pd
+import numpy as np
+import pytest
+
+def acoustic_db (labels:list, n:int, start:str="2023-05-01 10:00"):
+    dates = pd.Series(pd.date_range(start, periods=n, freq="7s").strftime("%Y-%m-%d %H:%M:%S"))
+    return DBBuilder(timezone="Europe/Paris").create_acoustic_db(dates, np.resize(labels, n))
+
+@pytest.fixture
+def sites ():
+    # site a: small counts (uint8), site b: an extra label and counts over 255 (uint16)
+    return {"a":acoustic_db(["fish", "boat"], 400), "b":acoustic_db(["fish"] * 5 + ["eel"], 6000)}
+
+@pytest.fixture
+def store (sites, tmp_path):
+    store = AcousticStore(str(tmp_path), timezone="Europe/Paris")
+    for site, db in sites.items():
+        store.write(db, site=site)
+    return store
+
+def check_site (df:pd.DataFrame, db:pd.DataFrame):
+    for col in db.columns:
+        values = df[col].astype(str) if col == "suncycle_type_" else df[col]
+        assert (values.values == db[col].values).all(), col
+    for col in set(df.columns) - set(db.columns) - {"site"}:
+        assert col.startswith("label_") and (df[col] == 0).all(), col
+
+def test_read_sites_with_different_labels (sites, store):
+    assert sites["a"]["label_fish_sum"].dtype == np.uint8 and sites["b"]["label_fish_sum"].dtype == np.uint16
+    df = store.read()
+    assert [c for c in df.columns if c.startswith("label_")] == ["label_boat_sum", "label_eel_sum", "label_fish_sum"]
+    assert df["label_fish_sum"].dtype == np.uint16 and df["label_eel_sum"].dtype == np.uint8
+    for site, db in sites.items():
+        check_site(df[df["site"] == site].reset_index(drop=True), db)
+        check_site(store.read(site), db)
+
+def test_read_labels_of_other_site (sites, store):
+    df = store.read("a", labels=["eel", "fish"])
+    assert [c for c in df.columns if c.startswith("label_")] == ["label_eel_sum", "label_fish_sum"]
+    assert (df["label_eel_sum"] == 0).all() and (df["label_fish_sum"].values == sites["a"]["label_fish_sum"].values).all()
+    assert df["label_fish_sum"].dtype == np.uint8
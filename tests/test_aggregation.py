@@ -0,0 +1,56 @@
+"""
+Aggregation pipelines: events mode against grid mode, sparse against dense counts
+"""
+from DBBuilder import DBBuilder
+import pandas as pd
+import numpy as np
+import pytest
+
+SITES = {
+    "UTC":{"timezone":"UTC"},
+    "Europe/Paris":{"timezone":"Europe/Paris"},
+    "Asia/Kolkata":{"latitude":19.07, "longitude":72.88, "timezone":"Asia/Kolkata"},    # half hour offset
+    "Europe/Oslo":{"latitude":69.65, "longitude":18.96, "timezone":"Europe/Oslo"},      # Tromso
+}
+
+def detections (start:str, days:int, n:int=3000, seed:int=5):
+    """
+    Detections in bursts (most minutes without detection) with a rare label
+    """
+    rng = np.random.default_rng(seed)
+    bursts = rng.integers(0, days * 86400, n // 20)
+    seconds = np.sort(np.clip(bursts.repeat(20) + rng.integers(0, 600, n // 20 * 20), 0, days * 86400 - 1))
+    dates = (pd.Timestamp(start) + pd.to_timedelta(seconds, unit="s")).strftime("%Y-%m-%d %H:%M:%S")
+    labels = rng.choice(["fish", "boat", "eel"], len(dates), p=[0.6, 0.39, 0.01])
+    return pd.Series(dates), labels
+
+def build (site:dict, dates, labels, **attrs):
+    builder = DBBuilder(**site)
+    for name, value in attrs.items():
+        setattr(builder, name, value)
+    return builder.create_acoustic_db(dates, labels)
+
+@pytest.mark.parametrize("site", SITES)
+@pytest.mark.parametrize("start", ["2023-03-24", "2023-10-27", "2023-12-18"])
+def test_events_match_grid (site, start):
+    # spring forward (2023-03-26) and fall back (2023-10-29) in Europe, polar night in Tromso
+    dates, labels = detections(start, days=5)
+    grid = build(SITES[site], dates, labels)
+    events = build(SITES[site], dates, labels, aggregation_mode="events", empty_buckets=True)
+    pd.testing.assert_frame_equal(events, grid)
+    # without empty buckets: rows of the grid with detections
+    label_cols = [c for c in grid.columns if c.startswith("label_")]
+    events = build(SITES[site], dates, labels, aggregation_mode="events")
+    assert len(events) < len(grid)
+    pd.testing.assert_frame_equal(events, grid[grid[label_cols].sum(axis=1) > 0].reset_index(drop=True), check_dtype=False)
+
+@pytest.mark.parametrize("site", ["UTC", "Europe/Paris"])
+def test_sparse_matches_dense (site):
+    dates, labels = detections("2023-03-24", days=5)
+    builder = DBBuilder(**SITES[site])
+    builder.count_sparse_threshold = 0.05
+    counts = builder.count_labels_occurence(dates, labels)
+    assert isinstance(counts["label_eel"].dtype, pd.SparseDtype) and not isinstance(counts["label_fish"].dtype, pd.SparseDtype)
+    dense = DBBuilder(**SITES[site]).count_labels_occurence(dates, labels)
+    pd.testing.assert_frame_equal(counts.astype({c:dense[c].dtype for c in dense.columns}), dense)
+    pd.testing.assert_frame_equal(build(SITES[site], dates, labels, count_sparse_threshold=0.05), build(SITES[site], dates, labels))
@@ -0,0 +1,47 @@
+"""
+Batch infos (`get_infos_batch`) against scalar infos (`get_infos`) on DST days
+"""
+from DBBuilder.astral import Sun, Moon
+import pandas as pd
+import pytest
+
+# spring forward, fall back, and a DST change at midnight (Santiago)
+DST_DAYS = [("Europe/Paris", "2023-03-26"), ("Europe/Paris", "2023-10-29"), ("America/Santiago", "2023-09-03"),
+            ("America/Santiago", "2023-04-02")]
+
+def dst_dates (timezone:str, day:str):
+    """
+    Dates every 20 minutes from the day before to the day after a DST change
+    """
+    day = pd.Timestamp(day, tz="UTC")
+    return pd.Series(pd.date_range(day - pd.Timedelta(days=1), day + pd.Timedelta(days=2), freq="20min").tz_convert(timezone))
+
+def check_equal (scalar:list, batch:pd.DataFrame):
+    """
+    Rows of `get_infos` (dicts) equal to `get_infos_batch` rows (same values, UTC offsets and missing values)
+    """
+    assert len(scalar) == len(batch) and list(scalar[0]) == [c for c in batch.columns if c in scalar[0]]
+    for col in scalar[0]:
+        for infos, value in zip(scalar, batch[col].tolist()):
+            expected = infos[col]
+            if pd.isna(expected):
+                assert pd.isna(value), (col, infos["date"])
+            else:
+                # scalar distances are rounded to the microsecond (`Timedelta.total_seconds`)
+                assert value == (pytest.approx(expected, abs=1e-6) if isinstance(expected, float) else expected), (col, infos["date"])
+                if isinstance(expected, pd.Timestamp):
+                    assert value.utcoffset() == expected.utcoffset(), (col, infos["date"])
+
+@pytest.mark.parametrize("timezone, day", DST_DAYS)
+@pytest.mark.parametrize("backend", Sun.backends)
+def test_sun_batch_matches_scalar (timezone, day, backend):
+    sun = Sun(latitude=-33.45, longitude=-70.67, timezone=timezone, backend=backend) if timezone == "America/Santiago" else \
+          Sun(timezone=timezone, backend=backend)
+    dates = dst_dates(timezone, day)
+    check_equal([sun.get_infos(date) for date in dates], sun.get_infos_batch(dates))
+
+@pytest.mark.parametrize("timezone, day", DST_DAYS)
+def test_moon_batch_matches_scalar (timezone, day):
+    moon = Moon(timezone=timezone, moon_functs=["moon_phase", "moonrise", "moonset"], moon_altitude=True)
+    dates = dst_dates(timezone, day)
+    check_equal([moon.get_infos(date) for date in dates], moon.get_infos_batch(dates))
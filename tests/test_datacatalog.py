@@ -0,0 +1,106 @@
+"""
+Raw data catalog (`DataCatalog`): path patterns and Parquet sidecars
+"""
+from DBBuilder import DBBuilder
+from DBBuilder.storage import DataCatalog
+import DBBuilder.storage.datacatalog as datacatalog
+import pandas as pd
+import numpy as np
+import pytest
+import os
+
+KEYS = ["a.csv", "site/a.csv", "site/yolo/a.csv", "site/yolo/old/b.csv", "other/yolo/c.csv"]
+
+@pytest.fixture
+def catalog (tmp_path):
+    for key in KEYS:
+        (tmp_path / key).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / key).write_text("date;label\n")
+    return DataCatalog(root=str(tmp_path)).scan()
+
+@pytest.mark.parametrize("pattern, expected", [
+    ("*.csv", ["a.csv"]),
+    ("site/*.csv", ["site/a.csv"]),
+    ("site/yolo/*.csv", ["site/yolo/a.csv"]),
+    ("*/yolo/*.csv", ["other/yolo/c.csv", "site/yolo/a.csv"]),
+    ("site/**/*.csv", ["site/a.csv", "site/yolo/a.csv", "site/yolo/old/b.csv"]),
+    ("**/yolo/*.csv", ["other/yolo/c.csv", "site/yolo/a.csv"]),
+    ("**", sorted(KEYS)),
+])
+def test_glob_is_segment_aware (catalog, pattern, expected):
+    assert [catalog.key(path) for path in catalog.glob(pattern)] == expected
+
+def test_read_options_by_pattern (catalog):
+    catalog.set_read_options("site/*.csv", sep=";")
+    catalog.set_read_options("site/yolo/**", encoding="latin-1")
+    assert catalog.get_read_options("site/a.csv") == {"sep":";"}
+    assert catalog.get_read_options("site/yolo/old/b.csv") == {"encoding":"latin-1"}
+    assert catalog.get_read_options("other/yolo/c.csv") == {}
+
+def write_detections (path, n:int=50, labels:list=["fish", "boat"]):
+    dates = pd.date_range("2023-05-01 10:00", periods=n, freq="13s").strftime("%Y-%m-%d %H:%M:%S")
+    pd.DataFrame({"date":dates, "label":np.resize(labels, n)}).to_csv(path, sep=";", index=False)
+    return str(path)
+
+@pytest.fixture
+def conversions (monkeypatch):
+    """
+    Sources converted to sidecars in the current process
+    """
+    calls = []
+    convert = datacatalog._convert
+    def spy (path, f, options, chunksize):
+        calls.append(os.path.basename(path))
+        return convert(path, f, options, chunksize)
+    monkeypatch.setattr(datacatalog, "_convert", spy)
+    return calls
+
+def test_sidecar_is_created_then_reused (conversions, tmp_path):
+    path = write_detections(tmp_path / "a.csv")
+    catalog = DataCatalog(root=str(tmp_path))
+    catalog.set_read_options("*.csv", sep=";")
+    df = catalog.read(path)
+    assert conversions == ["a.csv"] and len(df) == 50 and list(df.columns) == ["date", "label"]
+    reloaded = DataCatalog(root=str(tmp_path))
+    pd.testing.assert_frame_equal(reloaded.read(path), df)
+    assert conversions == ["a.csv"] and reloaded.sources["a.csv"]["sidecar"].startswith("sidecars")
+
+def test_sidecar_is_converted_again_on_content_change (conversions, tmp_path):
+    path = write_detections(tmp_path / "a.csv")
+    catalog = DataCatalog(root=str(tmp_path))
+    catalog.set_read_options("*.csv", sep=";")
+    catalog.read(path)
+    write_detections(tmp_path / "a.csv", n=80)
+    assert len(catalog.read(path)) == 80 and conversions == ["a.csv"] * 2
+    # same content with a new mtime: hashed, not converted
+    os.utime(path, ns=(0, 0))
+    assert len(catalog.read(path)) == 80 and conversions == ["a.csv"] * 2
+
+def test_sidecar_is_converted_again_on_read_options_change (conversions, tmp_path):
+    path = write_detections(tmp_path / "a.csv")
+    catalog = DataCatalog(root=str(tmp_path))
+    catalog.set_read_options("*.csv", sep=";")
+    catalog.read(path)
+    catalog.set_read_options("*.csv", sep=";", nrows=20)
+    assert len(catalog.read(path)) == 20 and conversions == ["a.csv"] * 2
+
+def test_column_types_changing_between_chunks (tmp_path):
+    pd.DataFrame({"value":["1", "2", "a", "b"]}).to_csv(tmp_path / "a.csv", index=False)
+    catalog = DataCatalog(root=str(tmp_path), chunksize=2)
+    with pytest.raises(ValueError, match="change between chunks"):
+        catalog.read(str(tmp_path / "a.csv"))
+    catalog.set_read_options("*.csv", dtype={"value":"str"})
+    assert catalog.read(str(tmp_path / "a.csv"))["value"].tolist() == ["1", "2", "a", "b"]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_files_are_converted_by_workers (workers, conversions, tmp_path):
+    files = [write_detections(tmp_path / f"{i}.csv", n=50 + 10 * i) for i in range(3)]
+    catalog = DataCatalog(root=str(tmp_path))
+    catalog.set_read_options("*.csv", sep=";")
+    db = DBBuilder(timezone="UTC", catalog=catalog).create_acoustic_db_from_files(files, workers=workers)
+    # converted in the worker processes, manifest updated by the parent
+    assert conversions == ([] if workers != 1 else ["0.csv", "1.csv", "2.csv"])
+    reloaded = DataCatalog(root=str(tmp_path))
+    assert all(os.path.exists(reloaded.sidecar(path)) for path in files) and len(conversions) == (0 if workers != 1 else 3)
+    expected = DBBuilder(timezone="UTC").create_acoustic_db_from_files(files, workers=1, sep=";")
+    pd.testing.assert_frame_equal(db, expected)
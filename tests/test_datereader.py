@@ -0,0 +1,33 @@
+"""
+Scalar (`DateReader.read_date`) and vectorized (`read_dates`) date reading
+"""
+from DBBuilder import DBBuilder
+from DBBuilder.astral import Sun
+import pandas as pd
+import pytest
+
+DATES = [
+    pd.Timestamp("2023-03-25 21:00:00", tz="UTC"),    # aware, converted
+    pd.Timestamp("2023-10-28 23:30:00", tz="UTC"),    # aware, 01:30+02:00 (first occurrence)
+    pd.Timestamp("2023-10-29 00:30:00", tz="UTC"),    # aware, 02:30+02:00 (first occurrence)
+    pd.Timestamp("2023-10-29 01:30:00", tz="UTC"),    # aware, 02:30+01:00 (second occurrence)
+    "2023-03-26 02:30:00",                            # naive, nonexistent wall time
+    "2023-10-29 02:30:00",                            # naive, ambiguous wall time
+    "2023-10-29 00:00:00",                            # naive, local midnight of a 25 hours day
+]
+
+@pytest.mark.parametrize("date", DATES)
+def test_read_date_matches_read_dates (date):
+    reader = DBBuilder(timezone="Europe/Paris")
+    scalar, batch = reader.read_date(date), reader.read_dates(pd.Series([date]))[0]
+    assert scalar == batch and scalar.utcoffset() == batch.utcoffset()
+    assert scalar.tzinfo == reader.timezone
+    if isinstance(date, pd.Timestamp):
+        assert scalar == date
+
+@pytest.mark.parametrize("date", DATES)
+def test_get_infos_matches_batch (date):
+    sun = Sun(timezone="Europe/Paris")
+    scalar, batch = sun.get_infos(date), sun.get_infos_batch(pd.Series([date])).iloc[0]
+    assert scalar["date"] == batch["date"] and scalar["date"].utcoffset() == batch["date"].utcoffset()
+    assert (scalar["suncycle_type"], scalar["suncycle_day"]) == (batch["suncycle_type"], batch["suncycle_day"])
@@ -0,0 +1,56 @@
+"""
+Persistent ephemeris cache of `BaseAstral` day tables (`cache_dir`)
+"""
+from DBBuilder.astral import Sun
+import importlib
+import pandas as pd
+import gc
+
+EphemerisCache = importlib.import_module("DBBuilder.astral.__ephemeris_cache").EphemerisCache
+
+def local_days (start:str, end:str):
+    return pd.date_range(start, end, freq="D", tz="Europe/Paris")
+
+def count_writes (monkeypatch):
+    writes = []
+    save_records = EphemerisCache.save_records
+    def spy (self, data):
+        writes.append(len(data))
+        return save_records(self, data)
+    monkeypatch.setattr(EphemerisCache, "save_records", spy)
+    return writes
+
+def test_scalar_misses_are_written_in_batches (monkeypatch, tmp_path):
+    writes = count_writes(monkeypatch)
+    sun = Sun(timezone="Europe/Paris", cache_dir=str(tmp_path))
+    sun.cache_flush_days = 100
+    for day in local_days("2020-01-01", "2020-12-31"):
+        sun.get_day_infos(day)
+    assert writes == [100, 100, 100]
+    sun.save_cache()
+    assert writes == [100, 100, 100, 66]
+    cached = Sun(timezone="Europe/Paris", cache_dir=str(tmp_path))
+    cached.get_days_infos(local_days("2020-01-01", "2020-12-31"))
+    assert cached.cache_stats == {"hits":366, "misses":0}
+
+def test_unsaved_days_are_written_when_collected (monkeypatch, tmp_path):
+    writes = count_writes(monkeypatch)
+    sun = Sun(timezone="Europe/Paris", cache_dir=str(tmp_path))
+    for day in local_days("2020-03-01", "2020-03-10"):
+        sun.get_day_infos(day)
+    assert writes == []
+    del sun
+    gc.collect()
+    assert writes == [10]
+    cached = Sun(timezone="Europe/Paris", cache_dir=str(tmp_path))
+    cached.get_days_infos(local_days("2020-03-01", "2020-03-10"))
+    assert cached.cache_stats == {"hits":10, "misses":0}
+
+def test_evicted_days_are_reloaded (tmp_path):
+    sun = Sun(timezone="Europe/Paris", cache_dir=str(tmp_path), cache_max_days=400)
+    first = sun.get_days_infos(local_days("2020-01-01", "2020-12-31"))
+    sun.get_days_infos(local_days("2021-01-01", "2021-12-31"))
+    assert len(sun.store) <= 400 and 2020 not in sun._cached_years
+    again = sun.get_days_infos(local_days("2020-01-01", "2020-12-31"))
+    assert sun.cache_stats == {"hits":366, "misses":366 + 365}
+    pd.testing.assert_frame_equal(first, again)
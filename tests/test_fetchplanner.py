@@ -0,0 +1,137 @@
+"""
+Chunked meteo fetches (`OpenMeteo(store_dir=...)`) against a local
+stand-in of the archive API
+"""
+from DBBuilder.meteo import OpenMeteo
+from DBBuilder.meteo.__fetchplanner import FetchPlanner
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import flatbuffers
+import threading
+import pandas as pd
+import numpy as np
+import pytest
+import os
+
+def hour_values (times):
+    """
+    Values served for each hour (unix hours, exact in float32)
+    """
+    return (np.asarray(times) // 3600).astype("float32")
+
+def archive_response (start_date:str, end_date:str, timezone:str, n_variables:int):
+    """
+    Hourly archive response of a location (size prefixed flatbuffers
+    `WeatherApiResponse`, as sent with `format=flatbuffers`)
+    """
+    start = pd.Timestamp(start_date).tz_localize(timezone)
+    end = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).tz_localize(timezone)
+    times = np.arange(start.value // 10**9, end.value // 10**9, 3600)
+    builder = flatbuffers.Builder(1024)
+    variables = []
+    for _ in range(n_variables):
+        values = builder.CreateNumpyVector(hour_values(times))
+        builder.StartObject(14)
+        builder.PrependUOffsetTRelativeSlot(3, values, 0)
+        variables.append(builder.EndObject())
+    builder.StartVector(4, len(variables), 4)
+    for variable in reversed(variables):
+        builder.PrependUOffsetTRelative(variable)
+    variables = builder.EndVector()
+    builder.StartObject(4)
+    builder.PrependInt64Slot(0, int(times[0]), 0)
+    builder.PrependInt64Slot(1, int(times[-1]) + 3600, 0)
+    builder.PrependInt32Slot(2, 3600, 0)
+    builder.PrependUOffsetTRelativeSlot(3, variables, 0)
+    hourly = builder.EndObject()
+    builder.StartObject(15)
+    builder.PrependUOffsetTRelativeSlot(11, hourly, 0)
+    builder.FinishSizePrefixed(builder.EndObject())
+    return bytes(builder.Output())
+
+@pytest.fixture
+def archive_api ():
+    """
+    Local archive API (url and list of the query params of each request)
+    """
+    requests = []
+
+    class Handler (BaseHTTPRequestHandler):
+        def do_GET (self):
+            params = {k:v if k == "hourly" else v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            requests.append(params)
+            body = archive_response(params["start_date"], params["end_date"], params["timezone"], len(params["hourly"]))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message (self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1/archive", requests
+    server.shutdown()
+    server.server_close()
+
+def make_meteo (url:str, tmp_path, timezone:str="Europe/Paris"):
+    meteo = OpenMeteo(timezone=timezone, store_dir=str(tmp_path / "store"), cache_path=str(tmp_path / "http_cache"))
+    meteo.url = url
+    return meteo
+
+def check_hours (meteo:pd.DataFrame, date_start:str, date_end:str, timezone:str="Europe/Paris"):
+    start = pd.Timestamp(date_start).tz_localize(timezone)
+    end = (pd.Timestamp(date_end) + pd.Timedelta(days=1)).tz_localize(timezone)
+    hours = pd.date_range(start, end, freq="h", inclusive="left")
+    assert (meteo["date"].values == hours.values).all()
+    for col in OpenMeteo.hourly:
+        assert (meteo[col].values == hour_values(hours.asi8 // 10**9)).all(), col
+
+def test_overlapping_range_fetches_missing_month (archive_api, tmp_path):
+    url, requests = archive_api
+    meteo = make_meteo(url, tmp_path)
+    check_hours(meteo.get_meteo("2023-01-10 00:00:00", "2023-02-20 00:00:00"), "2023-01-10", "2023-02-20")
+    assert sorted((r["start_date"], r["end_date"]) for r in requests) == [("2023-01-01", "2023-01-31"), ("2023-02-01", "2023-02-28")]
+    # March 2023 has a DST change, February is served from the store
+    check_hours(meteo.get_meteo("2023-02-05 00:00:00", "2023-03-31 00:00:00"), "2023-02-05", "2023-03-31")
+    assert [(r["start_date"], r["end_date"]) for r in requests[2:]] == [("2023-03-01", "2023-03-31")]
+    # a new instance reads the store
+    check_hours(make_meteo(url, tmp_path).get_meteo("2023-01-01 00:00:00", "2023-03-31 00:00:00"), "2023-01-01", "2023-03-31")
+    assert len(requests) == 3
+
+def test_recent_chunks_are_not_stored (archive_api, tmp_path):
+    url, _ = archive_api
+    meteo = make_meteo(url, tmp_path)
+    today = pd.Timestamp.now(tz="Europe/Paris").normalize()
+    old_start, recent_end = (today - pd.DateOffset(months=3)).replace(day=1), today - pd.Timedelta(days=1)
+    date_start, date_end = old_start.strftime("%Y-%m-%d"), recent_end.strftime("%Y-%m-%d")
+    check_hours(meteo.get_meteo(old_start, recent_end), date_start, date_end)
+    stored = sorted(os.listdir(meteo.planner.path))
+    chunks = meteo.planner.plan(old_start, recent_end)
+    expected = [os.path.basename(meteo.planner._path_chunk(c)) for c in chunks
+                if c[1] < today - pd.Timedelta(days=meteo.planner.min_age_days)]
+    assert stored == sorted(expected) and len(expected) < len(chunks)
+
+def hours_fetch (timezone:str):
+    """
+    Fetch stub returning every hour of the local days of a chunk
+    """
+    def fetch (chunk_start, chunk_end):
+        end = (chunk_end.tz_localize(None) + pd.Timedelta(days=1)).tz_localize(timezone)
+        hours = pd.date_range(chunk_start, end, freq="h", inclusive="left")
+        return pd.DataFrame({"date":hours, "value":hour_values(hours.asi8 // 10**9)})
+    return fetch
+
+@pytest.mark.parametrize("day", ["2023-10-29", "2023-03-26", "2024-03-31"])
+def test_dst_change_on_last_day (day, tmp_path):
+    planner = FetchPlanner(fetch=hours_fetch("Europe/Paris"), store_dir=str(tmp_path), key_params={}, timezone="Europe/Paris")
+    date = pd.Timestamp(f"{day} 12:00:00", tz="Europe/Paris")
+    for date_start in [date, date.replace(day=1)]:
+        df = planner.get(date_start, date)
+        check_hours(df.assign(**{col:df["value"] for col in OpenMeteo.hourly}), date_start.strftime("%Y-%m-%d"), day)
+    # 2024-03-31 is the last day of its month chunk
+    chunk = planner.plan(date, date)[0]
+    assert chunk[1] == pd.Timestamp(f"{day[:8]}{date.days_in_month}", tz="Europe/Paris")
@@ -0,0 +1,31 @@
+"""
+Import budget of `DBBuilder` (meteo HTTP clients and notebook modules are
+only loaded on first use)
+"""
+import subprocess
+import json
+import sys
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# about 0.3 s and 570 modules here, budgets leave room for slower machines
+TIME_BUDGET_S = 2.0
+MODULES_BUDGET = 800
+LAZY_MODULES = ["openmeteo_requests", "openmeteo_sdk", "requests_cache", "retry_requests", "requests", "flatbuffers", "IPython"]
+
+def import_in_new_interpreter (module:str="DBBuilder"):
+    """
+    Import time, number of newly loaded modules and top level names of
+    loaded modules of an import in a fresh interpreter
+    """
+    code = f"import sys, time, json; n = len(sys.modules); t0 = time.perf_counter(); import {module}; " \
+           f"print(json.dumps([time.perf_counter() - t0, len(sys.modules) - n, sorted({{m.split('.')[0] for m in sys.modules}})]))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT).stdout
+    return json.loads(out)
+
+def test_import_budget ():
+    runs = [import_in_new_interpreter() for _ in range(3)]
+    time_s, n_modules, loaded = min(runs)
+    assert time_s < TIME_BUDGET_S, f"import DBBuilder took {time_s:.3f} s (budget {TIME_BUDGET_S} s)"
+    assert n_modules < MODULES_BUDGET, f"import DBBuilder loaded {n_modules} modules (budget {MODULES_BUDGET})"
+    assert not set(LAZY_MODULES) & set(loaded), f"eagerly loaded: {sorted(set(LAZY_MODULES) & set(loaded))}"
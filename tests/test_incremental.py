@@ -0,0 +1,47 @@
+"""
+Incremental build (`DBBuilder.update_acoustic_db`) against a full build
+"""
+from DBBuilder import DBBuilder
+import pandas as pd
+import numpy as np
+import pytest
+
+def detections (start:str, days:int, n:int=6000, seed:int=3):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, days * 86400, n)), unit="s")
+    df = pd.DataFrame({"date":dates.strftime("%Y-%m-%d %H:%M:%S"), "label":rng.choice(["fish", "boat", "bird"], n)})
+    df.loc[df.index > 4000, "label"] = rng.choice(["fish", "eel"], (df.index > 4000).sum())
+    return df
+
+def check_updates (df:pd.DataFrame, cuts:list, timezone:str, tmp_path):
+    """
+    Grow a file A and add a file B after the first update, each update must
+    give the db of a full build over all detections so far
+    """
+    builder = DBBuilder(timezone=timezone)
+    file_a, file_b, state_dir = tmp_path / "a.csv", tmp_path / "b.csv", tmp_path / "state"
+    part_a, part_b = df.iloc[::2], df.iloc[1::2]
+    for k, cut in enumerate(cuts):
+        part_a[part_a.index < cut].to_csv(file_a, index=False)
+        files = [file_a]
+        if k >= 1:
+            part_b[part_b.index < cut].to_csv(file_b, index=False)
+            files.append(file_b)
+        db = builder.update_acoustic_db(files, state_dir=str(state_dir), chunksize=500)
+        seen = pd.concat([pd.read_csv(f) for f in files]).sort_values("date")
+        expected = DBBuilder(timezone=timezone).create_acoustic_db(seen["date"], seen["label"].values)
+        pd.testing.assert_frame_equal(db, expected, check_dtype=False)
+    pd.testing.assert_frame_equal(builder.update_acoustic_db(files, state_dir=str(state_dir)), expected, check_dtype=False)
+
+@pytest.mark.parametrize("timezone", ["UTC", "Europe/Paris"])
+def test_update_matches_full_build (timezone, tmp_path):
+    # cuts in the middle of a night and mid-hour, spring-forward DST change on 2023-03-26
+    check_updates(detections("2023-03-24", days=6), cuts=[1500, 2600, 3333, 6000], timezone=timezone, tmp_path=tmp_path)
+
+def test_update_after_fall_back_hour (tmp_path):
+    # first update ends in the repeated hour of 2023-10-29 (Europe/Paris)
+    df = detections("2023-10-27", days=4)
+    df = pd.concat([df, pd.DataFrame({"date":["2023-10-29 02:30:00"] * 3, "label":["fish", "boat", "fish"]})])
+    df = df.sort_values("date", kind="stable").reset_index(drop=True)
+    cut = int(np.flatnonzero(df["date"] == "2023-10-29 02:30:00")[-1]) + 1
+    check_updates(df, cuts=[cut, cut + 800, len(df)], timezone="Europe/Paris", tmp_path=tmp_path)
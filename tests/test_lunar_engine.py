@@ -0,0 +1,73 @@
+"""
+Vectorized lunar infos (`Moon(backend="numpy")`) against astral
+"""
+from DBBuilder.astral import Moon
+from astral import Observer, moon
+import importlib
+import pandas as pd
+import numpy as np
+import pytest
+
+lunar_engine = importlib.import_module("DBBuilder.astral.__lunar_engine")
+
+SITES = [(48.886, 2.333, "Europe/Paris"), (69.65, 18.96, "Europe/Oslo"), (-33.9, 151.2, "Australia/Sydney"),
+         (40.7, -74.0, "America/New_York")]
+# days of 2021-2023 where astral raises for an event at 24:00 UTC
+ASTRAL_FAILURES = {"Europe/Paris":0, "Europe/Oslo":3, "Australia/Sydney":2, "America/New_York":6}
+MOON_FUNCTS = ["moon_phase", "moon_illumination", "moonrise", "moonset"]
+
+def local_days (timezone:str):
+    return pd.date_range("2021-01-01", "2023-12-31", freq="D", tz=timezone)
+
+def astral_event (funct, obs:Observer, day:pd.Timestamp, timezone:str):
+    """
+    Astral event of a day (NaT if no event) and the error raised by astral
+    for an event at 24:00 UTC (None otherwise)
+    """
+    try:
+        return pd.Timestamp(funct(obs, day, tzinfo=timezone)), None
+    except ValueError as e:
+        return pd.NaT, (str(e) if "hour must be" in str(e) else None)
+
+@pytest.mark.parametrize("latitude, longitude, timezone", SITES)
+def test_phase_and_illumination_match_astral (latitude, longitude, timezone):
+    days = local_days(timezone)
+    result = Moon(latitude, longitude, timezone=timezone, backend="numpy", moon_functs=MOON_FUNCTS).get_days_infos(days)
+    phase = np.array([moon.phase(day) for day in days])
+    assert np.abs(result["moon_phase"].values - phase).max() < 1e-9
+    # astral phase is truncated to the degree of elongation
+    illumination = (1 - np.cos(np.radians(phase * 360 / 28 - 6.43))) / 2
+    assert np.abs(result["moon_illumination"].values - illumination).max() < 0.01
+
+@pytest.mark.parametrize("latitude, longitude, timezone", SITES)
+def test_elevation_matches_astral (latitude, longitude, timezone):
+    dates = pd.Series(pd.date_range("2021-01-01", "2023-12-31", freq="7h", tz=timezone))
+    obs = Observer(latitude, longitude, 0)
+    result = Moon(latitude, longitude, timezone=timezone, backend="numpy").get_altitudes(dates)
+    expected = [moon.elevation(obs, date.to_pydatetime()) for date in dates.dt.tz_convert("UTC")]
+    assert np.abs(result - np.array(expected)).max() < 1e-9
+
+@pytest.mark.parametrize("latitude, longitude, timezone", SITES)
+def test_rise_set_match_astral (latitude, longitude, timezone):
+    days = local_days(timezone)
+    obs = Observer(latitude, longitude, 0)
+    result = Moon(latitude, longitude, timezone=timezone, backend="numpy", moon_functs=MOON_FUNCTS).get_days_infos(days)
+    # events at 24:00 UTC of the UTC days around each local day
+    utc_days = pd.date_range(days[0].tz_localize(None) - pd.Timedelta(days=1), days[-1].tz_localize(None) + pd.Timedelta(days=1))
+    rise, set = lunar_engine.riseset(utc_days, latitude, longitude)
+    at_24h = utc_days[(rise == 1440) | (set == 1440)]
+    n_failures = 0
+    for name, funct in [("moonrise", moon.moonrise), ("moonset", moon.moonset)]:
+        for day, value in zip(days, result[name]):
+            assert pd.isna(value) or value.tz_localize(None).normalize() == day.tz_localize(None), (name, day)
+            expected, error = astral_event(funct, obs, day, timezone)
+            if error is not None:
+                # astral fails for the whole day (documented in the engine)
+                n_failures += 1
+                assert (abs(at_24h - day.tz_localize(None)) <= pd.Timedelta(days=1)).any(), (name, day)
+            elif pd.isna(expected) or expected.tz_convert(timezone).date() != day.date():
+                # no event, or astral returns the event of another day
+                assert pd.isna(value), (name, day)
+            else:
+                assert value == expected, (name, day)
+    assert n_failures == ASTRAL_FAILURES[timezone]
@@ -0,0 +1,47 @@
+"""
+Meteo providers (`RainGauge`, `MeteoMerge`) and their join to acoustic dbs
+"""
+from DBBuilder import DBBuilder
+from DBBuilder.meteo import MeteoProvider, MeteoMerge, RainGauge
+import pandas as pd
+import numpy as np
+import pytest
+
+def write_gauge (path, records:list):
+    pd.DataFrame(records, columns=["date", "rain"]).to_csv(path, sep=";", index=False)
+    return str(path)
+
+def test_provider_is_abstract ():
+    with pytest.raises(TypeError):
+        MeteoProvider(timezone="UTC")
+
+def test_gauge_overlapping_exports (tmp_path):
+    # two tips in the same second in the first export, the second export repeats one of them
+    first = write_gauge(tmp_path / "gauge_1.csv", [("2023-05-01 10:15:00", 0.2), ("2023-05-01 10:15:00", 0.2),
+                                                   ("2023-05-01 11:40:00", 0.2)])
+    second = write_gauge(tmp_path / "gauge_2.csv", [("2023-05-01 10:15:00", 0.2), ("2023-05-01 11:40:00", 0.2),
+                                                    ("2023-05-01 12:05:00", 0.4), ("2023-05-01 12:05:00", 0.4)])
+    gauge = RainGauge([first, second], timezone="UTC")
+    assert len(gauge.read_records()) == 5
+    rain = gauge.get_meteo("2023-05-01 00:00:00", "2023-05-01 00:00:00").set_index("date")["rain"]
+    assert np.allclose(rain.loc["2023-05-01 10:00":"2023-05-01 12:00"].values, [0.4, 0.2, 0.8])
+
+def test_meteo_in_builder_timezone (tmp_path):
+    gauge = write_gauge(tmp_path / "gauge.csv", [("2023-05-01 08:00:00", 0.0), ("2023-05-01 10:15:00", 0.2),
+                                                 ("2023-05-01 12:00:00", 0.0)])
+    meteo = MeteoMerge([RainGauge(gauge, timezone="UTC")])
+    builder = DBBuilder(timezone="Europe/Paris", meteo=meteo)
+    df = pd.DataFrame({"date_":pd.date_range("2023-05-01 11:00", "2023-05-01 13:00", freq="h", tz="Europe/Paris")})
+    df = builder.add_meteo_infos(df)
+    assert df["date_meteo"].dt.tz == df["date_"].dt.tz
+    assert (df["date_meteo"] == df["date_"]).all()
+    # 10:15 UTC is 12:15 in Paris
+    assert np.allclose(df["rain"].values, [0.0, 0.2, 0.0])
+
+@pytest.mark.parametrize("day, n_hours", [("2023-10-29", 25), ("2023-03-26", 23), ("2023-05-01", 24)])
+def test_hours_of_dst_days (day, n_hours):
+    meteo = MeteoMerge([], timezone="Europe/Paris")
+    hours = meteo.hours(f"{day} 12:00:00", f"{day} 12:00:00")
+    assert len(hours) == n_hours
+    assert (hours.tz_localize(None).normalize() == pd.Timestamp(day)).all()
+    assert hours[0] == pd.Timestamp(day, tz="Europe/Paris") and (hours[1:] - hours[:-1] == pd.Timedelta("1h")).all()
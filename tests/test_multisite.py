@@ -0,0 +1,46 @@
+"""
+Multi-site builds (`MultiSiteDBBuilder`)
+"""
+from DBBuilder import DBBuilder
+from DBBuilder.multisite import MultiSiteDBBuilder
+import pandas as pd
+import numpy as np
+import pytest
+
+PARIS = {"latitude":48.886, "longitude":2.333, "timezone":"Europe/Paris"}
+
+def write_detections (path, start:str, n:int=300, seed:int=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, 2 * 86400, n)), unit="s")
+    pd.DataFrame({"date":dates.strftime("%Y-%m-%d %H:%M:%S"), "label":rng.choice(["fish", "boat"], n)}).to_csv(path, index=False)
+    return str(path)
+
+@pytest.fixture
+def spy_file_workers (monkeypatch):
+    """
+    `workers` passed to `DBBuilder.create_acoustic_db_from_files` (in process builds)
+    """
+    calls = []
+    build = DBBuilder.create_acoustic_db_from_files
+    def spy (self, files, workers:int=None, **kargs):
+        calls.append(workers)
+        return build(self, files, workers=workers, **kargs)
+    monkeypatch.setattr(DBBuilder, "create_acoustic_db_from_files", spy)
+    return calls
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_single_observer_reads_files_in_parallel (workers, spy_file_workers, tmp_path):
+    files = {"a":[write_detections(tmp_path / "a1.csv", "2023-05-01"), write_detections(tmp_path / "a2.csv", "2023-05-02", seed=1)],
+             "b":[write_detections(tmp_path / "b1.csv", "2023-05-01", seed=2)]}
+    sites = {"a":PARIS, "b":PARIS}
+    db = MultiSiteDBBuilder(sites, timezone="UTC", workers=workers).create_acoustic_db_from_files(files)
+    # one observer: no process pool, files of each site are read by a pool of `workers`
+    assert spy_file_workers == [workers, workers]
+    expected = MultiSiteDBBuilder(sites, timezone="UTC", workers=1).create_acoustic_db_from_files(files)
+    assert spy_file_workers[2:] == [1, 1]
+    pd.testing.assert_frame_equal(db, expected)
+
+def test_parallel_observers ():
+    builder = MultiSiteDBBuilder({"a":PARIS}, workers=None)
+    assert not builder.parallel_observers(1) and builder.parallel_observers(2)
+    assert not MultiSiteDBBuilder({"a":PARIS}, workers=1).parallel_observers(2)
@@ -0,0 +1,76 @@
+"""
+Vectorized solar events (`Sun(backend="numpy")`) and solar angles against astral
+"""
+from DBBuilder.astral import Sun
+from astral import sun as astral_sun
+import pandas as pd
+import numpy as np
+import pytest
+
+SITES = [(48.886, 2.333, "Europe/Paris"), (40.7, -74.0, "America/New_York"), (-33.9, 151.2, "Australia/Sydney"),
+         (69.65, 18.96, "Europe/Oslo")]
+TOLERANCE = pd.Timedelta("1us")
+
+def local_days (start:str, end:str, timezone:str, freq:str="D"):
+    return pd.date_range(start, end, freq=freq).tz_localize(timezone, ambiguous=True, nonexistent="shift_forward")
+
+def days_infos (days, **kargs):
+    return [Sun(backend=backend, **kargs).get_days_infos(days) for backend in ["astral", "numpy"]]
+
+def after_short_day (days):
+    """
+    Days following a 23 hours day (astral midnight may be the one of the previous day)
+    """
+    return ((days - pd.Timedelta(hours=24)).day != (days.tz_localize(None) - pd.Timedelta(days=1)).day)
+
+@pytest.mark.parametrize("latitude, longitude, timezone", SITES)
+def test_events_match_astral (latitude, longitude, timezone):
+    days = local_days("1980-01-01", "2030-12-31", timezone, freq="5D")
+    expected, result = days_infos(days, latitude=latitude, longitude=longitude, timezone=timezone)
+    for col in expected.columns:
+        assert (expected[col].isna() == result[col].isna()).all(), col
+        diff = (expected[col] - result[col]).abs()
+        if col == "midnight":
+            diff = diff[~after_short_day(days)]
+        assert diff.max() <= TOLERANCE, col
+
+def test_midnight_after_spring_forward ():
+    days = local_days("1980-01-01", "2030-12-31", "Europe/Paris")
+    days = days[after_short_day(days) | after_short_day(days + pd.Timedelta(days=1))]
+    expected, result = days_infos(days, timezone="Europe/Paris")
+    diff = result["midnight"] - expected["midnight"]
+    assert (diff[after_short_day(days)] == pd.Timedelta(days=1)).all()
+    assert (diff[~after_short_day(days)].abs() <= TOLERANCE).all()
+    assert (result["midnight"].dt.tz_localize(None).dt.normalize() == days.tz_localize(None)).all()
+
+def test_ambiguous_local_midnight ():
+    # Europe/Paris 1976-09-26 00:00 happens twice
+    dates = pd.Series(pd.date_range("1976-09-25 00:30", "1976-09-27 22:00", freq="30min", tz="Europe/Paris"))
+    expected, result = [Sun(backend=backend, timezone="Europe/Paris").get_infos_batch(dates) for backend in ["astral", "numpy"]]
+    pd.testing.assert_series_equal(expected["suncycle_type"], result["suncycle_type"])
+    pd.testing.assert_series_equal(expected["suncycle_day"], result["suncycle_day"])
+
+def test_cached_days_infos ():
+    sun = Sun(backend="numpy", timezone="Europe/Paris")
+    days = local_days("1980-01-01", "2030-12-31", "Europe/Paris")
+    first = sun.get_days_infos(days)
+    second = sun.get_days_infos(days[::-1])
+    assert sun.cache_stats == {"hits":len(days), "misses":len(days)}
+    pd.testing.assert_frame_equal(first.iloc[::-1], second)
+    assert all(isinstance(dtype, pd.DatetimeTZDtype) for dtype in second.dtypes)
+    assert np.array_equal(sun.data.index, first.index)
+
+@pytest.mark.parametrize("latitude, longitude, timezone", SITES)
+def test_solar_angles_match_astral (latitude, longitude, timezone):
+    sun = Sun(latitude=latitude, longitude=longitude, timezone=timezone)
+    dates = pd.Series(pd.date_range("2015-01-01", "2025-12-31", freq="7h17min", tz=timezone))
+    angles = sun.get_solar_angles(dates)
+    utc_dates = [date.to_pydatetime() for date in dates.dt.tz_convert("UTC")]
+    elevation = np.array([astral_sun.elevation(sun.obs, date) for date in utc_dates])
+    azimuth = np.array([astral_sun.azimuth(sun.obs, date) for date in utc_dates])
+    assert np.abs(angles["sun_elevation"].values - elevation).max() < 1e-7
+    assert np.abs((angles["sun_azimuth"].values - azimuth + 180) % 360 - 180).max() < 1e-7
+    # float32 output keeps the same angles at single precision
+    compact = Sun(latitude=latitude, longitude=longitude, timezone=timezone, angles_dtype="float32").get_solar_angles(dates)
+    assert (compact.dtypes == np.float32).all()
+    assert np.abs(compact["sun_elevation"].values - elevation).max() < 1e-4
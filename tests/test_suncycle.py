@@ -0,0 +1,79 @@
+"""
+Suncycle classification by binary search in the per-day boundaries
+(`Sun.get_suncycle_boundaries`, `Sun.get_suncycle`)
+"""
+from DBBuilder.astral import Sun
+import pandas as pd
+import pytest
+
+PARIS = {"latitude":48.886, "longitude":2.333, "timezone":"Europe/Paris"}
+TROMSO = {"latitude":69.65, "longitude":18.96, "timezone":"Europe/Oslo"}
+LONGYEARBYEN = {"latitude":78.22, "longitude":15.65, "timezone":"Arctic/Longyearbyen"}
+
+def day_dates (sun:Sun, day:str, freq:str="10min"):
+    start, end = [sun.read_date(pd.Timestamp(day) + pd.Timedelta(days=i)) for i in [0, 1]]
+    return pd.Series(pd.date_range(start, end, freq=freq, inclusive="left"))
+
+def suncycles (sun:Sun, dates:pd.Series):
+    infos = sun.get_infos_batch(dates)
+    return infos["suncycle_type"].tolist(), infos["suncycle_day"].dt.strftime("%Y-%m-%d").tolist()
+
+def segments (types:list):
+    return [t for i, t in enumerate(types) if i == 0 or types[i - 1] != t]
+
+@pytest.mark.parametrize("site", [TROMSO, LONGYEARBYEN])
+def test_polar_day (site):
+    sun = Sun(**site)
+    types, days = suncycles(sun, day_dates(sun, "2023-06-21"))
+    assert set(types) == {"daylight"} and set(days) == {"2023-06-21"}
+
+def test_polar_night ():
+    sun = Sun(**LONGYEARBYEN)
+    types, days = suncycles(sun, day_dates(sun, "2023-12-21"))
+    # no twilight at all: night of the day itself
+    assert set(types) == {"night"} and set(days) == {"2023-12-21"}
+
+def test_polar_night_with_twilights ():
+    sun = Sun(**TROMSO)
+    dates = day_dates(sun, "2023-12-21")
+    types, days = suncycles(sun, dates)
+    # the sun stays below the horizon: twilight zones but no daylight
+    assert segments(types) == ["night", "rising", "night", "setting", "night"]
+    rising = types.index("rising")
+    assert set(days[:rising]) == {"2023-12-20"} and set(days[rising:]) == {"2023-12-21"}
+
+@pytest.mark.parametrize("day, expected", [
+    ("2023-05-13", [("daylight", "2023-05-13"), ("setting", "2023-05-13")]),    # sunset only
+    ("2023-05-16", [("rising", "2023-05-16"), ("daylight", "2023-05-16")]),     # sunrise only
+    ("2023-11-29", [("night", "2023-11-28"), ("rising", "2023-11-29"), ("night", "2023-11-29"), ("setting", "2023-11-29"), 
+                    ("night", "2023-11-29")]),                                  # civil twilights only
+])
+def test_high_latitude_transitions (day, expected):
+    sun = Sun(**TROMSO)
+    dates = day_dates(sun, day, freq="min")
+    types, days = suncycles(sun, dates)
+    assert segments(list(zip(types, days))) == expected
+    # scalar search in the boundaries of the day only
+    for i in range(0, len(dates), 37):
+        suncycle_type, suncycle_day = sun.get_suncycle(dates[i])
+        assert (suncycle_type, suncycle_day.strftime("%Y-%m-%d")) == (types[i], days[i])
+
+@pytest.mark.parametrize("day", ["2023-06-21", "2023-03-26", "2023-10-29"])
+def test_day_edges (day):
+    sun = Sun(**PARIS)
+    start, end = [sun.read_date(pd.Timestamp(day) + pd.Timedelta(days=i)) for i in [0, 1]]
+    ns, W = pd.Timedelta(1, "ns"), pd.Timedelta(seconds=sun.timeAroundTW)
+    previous = (pd.Timestamp(day) - pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    mid_tw_rising, mid_tw_setting = [mid.iloc[0] for mid in sun.get_twilight_mids(sun.get_days_infos([start]))]
+    expected = {
+        start - ns:("night", previous), start:("night", previous),
+        mid_tw_rising - W - ns:("night", previous), mid_tw_rising - W:("rising", day), 
+        mid_tw_rising + W:("rising", day), mid_tw_rising + W + ns:("daylight", day),
+        mid_tw_setting - W - ns:("daylight", day), mid_tw_setting - W:("setting", day),
+        mid_tw_setting + W:("setting", day), mid_tw_setting + W + ns:("night", day),
+        end - ns:("night", day), end:("night", day),
+    }
+    dates = pd.Series(list(expected))
+    types, days = suncycles(sun, dates)
+    assert list(zip(types, days)) == list(expected.values())
+    assert [(t, d.strftime("%Y-%m-%d")) for t, d in map(sun.get_suncycle, dates)] == list(expected.values())